@@ -0,0 +1,254 @@
+"""
+Almacén persistente de modelos entrenados para el sistema de predicción
+
+Guarda en disco el modelo de ML junto con su StandardScaler, identificados por
+una clave que depende de la versión de los datos (último NumeroExtraido.id),
+del tamaño de ventana y de los hiperparámetros. Como los archivos viven en
+disco, todos los workers de gunicorn comparten los mismos modelos; cada proceso
+los carga de forma perezosa y los mantiene en memoria.
+
+El proceso de entrenamiento publica el modelo vigente reemplazando de forma
+atómica el archivo `actual.json`; la web solo lee ese puntero y sirve el modelo
+publicado, aunque haya un reentrenamiento en curso. La web nunca entrena: si
+hace falta un modelo deja el archivo `reentrenar.solicitud`, que el worker
+(clock.py o el scheduler integrado) atiende en su próxima revisión.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+DIRECTORIO_MODELOS = os.getenv(
+    'MODELOS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modelos')
+)
+
+# Cuántos modelos antiguos conservar en disco
+MODELOS_A_CONSERVAR = int(os.getenv('MODELOS_A_CONSERVAR', 5))
+
+ARCHIVO_PUBLICADO = 'actual.json'
+
+# Mejor configuración encontrada por la búsqueda de hiperparámetros
+ARCHIVO_CONFIGURACION = 'configuracion.json'
+
+# Reentrenamiento pedido por la web, pendiente de que lo atienda el worker
+ARCHIVO_SOLICITUD = 'reentrenar.solicitud'
+
+# Caché en memoria compartida por todas las instancias del proceso
+_cache_memoria = {}
+_lock_cache = threading.Lock()
+
+# Último puntero leído: (ruta, mtime, clave)
+_publicado = (None, None, None)
+
+
+def _recordar(clave, contenido):
+    """Guardar un modelo en la caché en memoria, descartando los más antiguos"""
+    with _lock_cache:
+        _cache_memoria.pop(clave, None)
+        _cache_memoria[clave] = contenido
+        while len(_cache_memoria) > MODELOS_A_CONSERVAR:
+            _cache_memoria.pop(next(iter(_cache_memoria)))
+
+
+class AlmacenModelos:
+    """Clase para guardar y recuperar modelos entrenados"""
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or DIRECTORIO_MODELOS
+
+    @staticmethod
+    def clave(ultimo_id, ventana, hiperparametros):
+        """
+        Construir la clave de un modelo
+
+        Args:
+            ultimo_id: Id del último NumeroExtraido usado en el entrenamiento
+            ventana: Tamaño de la ventana de features
+            hiperparametros: dict con los hiperparámetros del modelo
+
+        Returns:
+            str con la clave del modelo
+        """
+        huella = hashlib.sha1(
+            json.dumps(hiperparametros, sort_keys=True).encode('utf-8')
+        ).hexdigest()[:10]
+        return f"{ultimo_id or 0}-v{ventana}-{huella}"
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.joblib")
+
+    def cargar(self, clave):
+        """
+        Cargar un modelo guardado
+
+        Returns:
+            dict con 'modelo', 'scaler' y 'metadatos', o None si no existe
+        """
+        with _lock_cache:
+            if clave in _cache_memoria:
+                return _cache_memoria[clave]
+
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+
+        try:
+            import joblib
+            contenido = joblib.load(ruta)
+        except Exception as e:
+            print(f"Error al cargar modelo {clave}: {e}")
+            return None
+
+        _recordar(clave, contenido)
+        return contenido
+
+    def _escribir_atomico(self, ruta, escribir):
+        """Escribir un archivo en un temporal y renombrarlo sobre el destino"""
+        os.makedirs(self.directorio, exist_ok=True)
+        descriptor, ruta_tmp = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                escribir(f)
+            os.replace(ruta_tmp, ruta)
+        except Exception:
+            if os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+            raise
+
+    def guardar(self, clave, modelo, scaler, metadatos=None):
+        """Guardar un modelo de forma atómica (escritura a temporal + rename)"""
+        contenido = {
+            'modelo': modelo,
+            'scaler': scaler,
+            'metadatos': metadatos or {},
+        }
+        import joblib
+        self._escribir_atomico(self._ruta(clave), lambda f: joblib.dump(contenido, f))
+
+        _recordar(clave, contenido)
+        self._limpiar_antiguos()
+        return True
+
+    def publicar(self, clave):
+        """Marcar un modelo guardado como el modelo vigente"""
+        puntero = json.dumps({
+            'clave': clave,
+            'fecha_publicacion': datetime.utcnow().isoformat(),
+        }).encode('utf-8')
+        self._escribir_atomico(
+            os.path.join(self.directorio, ARCHIVO_PUBLICADO),
+            lambda f: f.write(puntero)
+        )
+        print(f"✓ Modelo publicado: {clave}")
+
+    def guardar_configuracion(self, configuracion):
+        """Registrar la configuración ganadora de la búsqueda de hiperparámetros"""
+        contenido = json.dumps(configuracion, indent=2).encode('utf-8')
+        self._escribir_atomico(
+            os.path.join(self.directorio, ARCHIVO_CONFIGURACION),
+            lambda f: f.write(contenido)
+        )
+
+    def cargar_configuracion(self):
+        """
+        Leer la configuración registrada
+
+        Returns:
+            dict con 'ventana', 'hiperparametros' y 'puntaje', o None si no hay
+        """
+        try:
+            with open(os.path.join(self.directorio, ARCHIVO_CONFIGURACION), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def solicitar_entrenamiento(self):
+        """
+        Pedir al worker que actualice el modelo
+
+        Returns:
+            True si se dejó la solicitud, False si ya había una pendiente
+        """
+        ruta = os.path.join(self.directorio, ARCHIVO_SOLICITUD)
+        if os.path.exists(ruta):
+            return False
+        fecha = datetime.utcnow().isoformat().encode('utf-8')
+        self._escribir_atomico(ruta, lambda f: f.write(fecha))
+        return True
+
+    def tomar_solicitud(self):
+        """
+        Consumir la solicitud pendiente (solo un proceso la obtiene)
+
+        Returns:
+            True si había una solicitud
+        """
+        try:
+            os.remove(os.path.join(self.directorio, ARCHIVO_SOLICITUD))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def clave_publicada(self):
+        """Leer la clave del modelo vigente (solo relee el puntero si cambió)"""
+        global _publicado
+        ruta = os.path.join(self.directorio, ARCHIVO_PUBLICADO)
+        try:
+            mtime = os.stat(ruta).st_mtime_ns
+        except OSError:
+            return None
+
+        ruta_cache, mtime_cache, clave_cache = _publicado
+        if ruta_cache == ruta and mtime_cache == mtime:
+            return clave_cache
+
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                clave = json.load(f)['clave']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠ No se pudo leer el modelo publicado: {e}")
+            return clave_cache
+
+        _publicado = (ruta, mtime, clave)
+        return clave
+
+    def antiguedad_publicado(self):
+        """Segundos desde que se publicó el modelo vigente (None si no hay)"""
+        try:
+            return time.time() - os.stat(os.path.join(self.directorio, ARCHIVO_PUBLICADO)).st_mtime
+        except OSError:
+            return None
+
+    def cargar_publicado(self):
+        """
+        Cargar el modelo vigente
+
+        Returns:
+            (clave, contenido) o (None, None) si todavía no hay modelo publicado
+        """
+        clave = self.clave_publicada()
+        if clave is None:
+            return None, None
+        contenido = self.cargar(clave)
+        if contenido is None:
+            return None, None
+        return clave, contenido
+
+    def _limpiar_antiguos(self):
+        """Eliminar los modelos más antiguos del directorio"""
+        publicado = self.clave_publicada()
+        try:
+            archivos = [
+                os.path.join(self.directorio, nombre)
+                for nombre in os.listdir(self.directorio)
+                if nombre.endswith('.joblib') and nombre != f"{publicado}.joblib"
+            ]
+            archivos.sort(key=os.path.getmtime, reverse=True)
+            for ruta in archivos[MODELOS_A_CONSERVAR:]:
+                os.remove(ruta)
+        except OSError as e:
+            print(f"⚠ No se pudieron limpiar modelos antiguos: {e}")
@@ -1,54 +1,146 @@
 """
 Aplicación web Flask para el sistema de predicción
 """
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from database import init_db, get_session, NumeroExtraido, Prediccion, ConfiguracionScraper
-from scraper import WebScraper, ejecutar_scraping_automatico
-from predictor import PredictorNumeros
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, stream_with_context
+from sqlalchemy import and_, or_
+from database import init_db, get_session, insertar_numeros, NumeroExtraido, Prediccion, ConfiguracionScraper
+from scraper import ejecutar_scraping_automatico, extraer_numeros_configuracion, guardar_resultado
+from predictor import PredictorNumeros, solicitar_reentrenamiento
+from estadisticas import total_numeros
+from resumen_predicciones import total_predicciones
+from tareas import atender_solicitud_reentrenamiento, buscar_y_reentrenar, procesar_numeros_nuevos
+from busqueda_modelos import BUSQUEDA_HORAS
+from cache import cachear_respuesta
+from metricas import instrumentar_app
+import exportacion
+from ingesta import leer_registros, ingerir_registros, FUENTE_CARGA_MASIVA
 from datetime import datetime, timedelta
+import base64
 import json
 import os
 import logging
+import multiprocessing
 from apscheduler.schedulers.background import BackgroundScheduler
 
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'clave-secreta-desarrollo')
 
-# Inicializar base de datos
-init_db()
+# Máximo de filas por página en las consultas paginadas
+LIMITE_MAXIMO_PAGINA = 500
+
+# Latencia por ruta y /metrics (solo con METRICAS_ACTIVAS=true)
+instrumentar_app(app)
 
 # Configurar logs
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configurar Scheduler (opcionalmente integrado para ahorrar recursos en el servidor)
-if os.getenv('RUN_SCHEDULER', 'False').lower() == 'true':
+# Configurar Scheduler (opcionalmente integrado para ahorrar recursos en el servidor).
+# Los procesos hijos de la búsqueda (spawn) reimportan este módulo y no lo inician.
+if os.getenv('RUN_SCHEDULER', 'False').lower() == 'true' and multiprocessing.parent_process() is None:
     scheduler = BackgroundScheduler()
-    @scheduler.scheduled_job('interval', minutes=int(os.getenv('SCRAPER_INTERVAL', 30)))
+    # Cada revisión solo ejecuta las configuraciones que cumplieron su intervalo_minutos
+    @scheduler.scheduled_job('interval', minutes=int(os.getenv('SCRAPER_TICK_MINUTOS', 1)),
+                             coalesce=True, max_instances=1)
     def timed_job():
-        logger.info("🚀 Ejecutando scraping programado desde el proceso web")
         try:
-            ejecutar_scraping_automatico()
-            logger.info("✅ Scraping programado completado")
+            guardados = ejecutar_scraping_automatico()
         except Exception as e:
             logger.error(f"❌ Error en scraping programado: {e}")
+            return
+        
+        if not guardados:
+            atender_solicitud_reentrenamiento()
+            return
+        logger.info(f"✅ Scraping programado: {guardados} números nuevos")
+        
+        # Cada paso registra y absorbe sus propios errores
+        procesar_numeros_nuevos()
+    
+    if BUSQUEDA_HORAS > 0:
+        scheduler.add_job(buscar_y_reentrenar, 'interval', hours=BUSQUEDA_HORAS,
+                          coalesce=True, max_instances=1)
     
     scheduler.start()
     logger.info("⏰ Scheduler integrado iniciado correctamente")
 
 
+def codificar_cursor(registro):
+    """Cursor opaco con la posición (fecha_extraccion, id) de un número"""
+    datos = json.dumps([registro.fecha_extraccion.isoformat(), registro.id])
+    return base64.urlsafe_b64encode(datos.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Inverso de codificar_cursor. Lanza ValueError si el cursor no es válido."""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha, id_numero = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return datetime.fromisoformat(fecha), int(id_numero)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def paginar_numeros(session, limite, despues=None, antes=None):
+    """
+    Paginación por cursor (keyset) sobre (fecha_extraccion, id), de más nuevo a
+    más antiguo. Cuesta lo mismo en la primera página que en la página 10.000.
+    
+    Args:
+        limite: Filas por página
+        despues: Cursor de la última fila de la página anterior (avanzar)
+        antes: Cursor de la primera fila de la página siguiente (retroceder)
+        
+    Returns:
+        (numeros, cursor_anterior, cursor_siguiente); los cursores son None
+        cuando no hay más páginas en esa dirección
+    """
+    fecha = NumeroExtraido.fecha_extraccion
+    query = session.query(NumeroExtraido)
+    
+    if antes:
+        fecha_cursor, id_cursor = decodificar_cursor(antes)
+        filas = query.filter(or_(
+                fecha > fecha_cursor,
+                and_(fecha == fecha_cursor, NumeroExtraido.id > id_cursor)
+            ))\
+            .order_by(fecha.asc(), NumeroExtraido.id.asc())\
+            .limit(limite + 1)\
+            .all()
+        hay_mas = len(filas) > limite
+        numeros = list(reversed(filas[:limite]))
+        cursor_anterior = codificar_cursor(numeros[0]) if hay_mas else None
+        cursor_siguiente = codificar_cursor(numeros[-1]) if numeros else None
+        return numeros, cursor_anterior, cursor_siguiente
+    
+    if despues:
+        fecha_cursor, id_cursor = decodificar_cursor(despues)
+        query = query.filter(or_(
+            fecha < fecha_cursor,
+            and_(fecha == fecha_cursor, NumeroExtraido.id < id_cursor)
+        ))
+    
+    filas = query.order_by(fecha.desc(), NumeroExtraido.id.desc())\
+        .limit(limite + 1)\
+        .all()
+    numeros = filas[:limite]
+    cursor_anterior = codificar_cursor(numeros[0]) if despues and numeros else None
+    cursor_siguiente = codificar_cursor(numeros[-1]) if len(filas) > limite else None
+    return numeros, cursor_anterior, cursor_siguiente
+
+
 @app.route('/')
 def index():
     """Página principal"""
     session = get_session()
     try:
-        # Obtener estadísticas rápidas
-        total_numeros = session.query(NumeroExtraido).count()
-        total_predicciones = session.query(Prediccion).count()
+        # Contadores desde los agregados precalculados (sin COUNT(*) por visita)
+        contador_numeros = total_numeros()
+        contador_predicciones = total_predicciones()
         
-        # Últimos números extraídos
+        # Últimos números extraídos (índice fecha_extraccion, id)
         ultimos_numeros = session.query(NumeroExtraido)\
-            .order_by(NumeroExtraido.fecha_extraccion.desc())\
+            .order_by(NumeroExtraido.fecha_extraccion.desc(), NumeroExtraido.id.desc())\
             .limit(10)\
             .all()
         
@@ -58,8 +150,8 @@ def index():
             .first()
         
         return render_template('index.html',
-            total_numeros=total_numeros,
-            total_predicciones=total_predicciones,
+            total_numeros=contador_numeros,
+            total_predicciones=contador_predicciones,
             ultimos_numeros=ultimos_numeros,
             ultima_prediccion=ultima_prediccion
         )
@@ -68,6 +160,7 @@ def index():
 
 
 @app.route('/dashboard')
+@cachear_respuesta('dashboard')
 def dashboard():
     """Dashboard con análisis completo"""
     session = get_session()
@@ -79,12 +172,12 @@ def dashboard():
         predicciones = {}
         
         if len(numeros) >= predictor.min_samples:
-            stats = predictor.analisis_estadistico(numeros)
+            stats = predictor.analisis_estadistico()
             predicciones = predictor.predecir_proximo_numero(metodo='combinado')
         
         return render_template('dashboard.html',
             numeros=numeros,
-            fechas=[f.isoformat() for f in fechas],
+            fechas=[f.isoformat() for f in fechas.tolist()],
             stats=stats,
             predicciones=predicciones
         )
@@ -131,46 +224,49 @@ def agregar_scraper():
 
 @app.route('/api/scraper/ejecutar/<int:config_id>', methods=['POST'])
 def ejecutar_scraper_manual(config_id):
-    """Ejecutar scraping manualmente"""
+    """Ejecutar scraping manualmente (mismo camino que el scraping programado)"""
     session = get_session()
     
     try:
-        config = session.query(ConfiguracionScraper).get(config_id)
+        config = session.get(ConfiguracionScraper, config_id)
         if not config:
             return jsonify({'success': False, 'error': 'Configuración no encontrada'}), 404
         
-        use_selenium = config.selector_xpath is not None
-        
-        with WebScraper(use_selenium=use_selenium) as scraper:
-            if use_selenium:
-                numeros = scraper.extraer_numeros_selenium(
-                    config.url_objetivo,
-                    selector_css=config.selector_css,
-                    selector_xpath=config.selector_xpath
-                )
-            else:
-                numeros = scraper.extraer_numeros_simple(
-                    config.url_objetivo,
-                    selector_css=config.selector_css
-                )
-            
-            if numeros:
-                scraper.guardar_numeros(numeros, config.url_objetivo)
-                config.ultima_ejecucion = datetime.utcnow()
-                session.commit()
-                
-                return jsonify({
-                    'success': True,
-                    'numeros_encontrados': len(numeros),
-                    'numeros': numeros[:20]  # Primeros 20
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'No se encontraron números'
-                })
+        resultado = extraer_numeros_configuracion(
+            config.url_objetivo,
+            config.selector_css,
+            config.selector_xpath,
+            {'etag': config.etag, 'ultima_modificacion': config.ultima_modificacion}
+        )
+        insertados = guardar_resultado(config, resultado)
+        if insertados is None:
+            session.rollback()
+            return jsonify({'success': False, 'error': 'No se pudieron guardar los números'}), 500
+        
+        config.ultima_ejecucion = datetime.utcnow()
+        session.commit()
+        
+        numeros = resultado['numeros']
+        if not numeros and not resultado['no_modificado']:
+            return jsonify({
+                'success': False,
+                'error': 'No se encontraron números'
+            })
+        
+        # Estadísticas, instantánea y predicciones al día; el modelo lo actualiza el worker
+        if insertados:
+            procesar_numeros_nuevos(entrenar=False)
+        
+        return jsonify({
+            'success': True,
+            'numeros_encontrados': len(numeros),
+            'insertados': insertados,
+            'no_modificado': resultado['no_modificado'],
+            'numeros': numeros[:20]  # Primeros 20
+        })
                 
     except Exception as e:
+        session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
     finally:
         session.close()
@@ -189,18 +285,24 @@ def generar_prediccion():
         if 'error' in predicciones:
             return jsonify({'success': False, 'error': predicciones['error']})
         
-        # Guardar la predicción principal
-        pred_principal = predicciones.get(metodo, predicciones.get('combinado'))
-        if pred_principal:
-            predictor.guardar_prediccion(
-                pred_principal['numero'],
-                pred_principal['confianza'],
-                metodo
-            )
+        # Guardar la predicción principal con el método realmente usado: sin
+        # modelo publicado, 'ml' responde con la estadística
+        metodo_usado = metodo if metodo in predicciones else 'estadistico'
+        pred_principal = predicciones.get(metodo_usado)
+        if not pred_principal:
+            return jsonify({'success': False, 'error': f'Método no disponible: {metodo}'}), 400
+        
+        predictor.guardar_prediccion(
+            pred_principal['numero'],
+            pred_principal['confianza'],
+            metodo_usado
+        )
         
         return jsonify({
             'success': True,
-            'predicciones': predicciones
+            'predicciones': predicciones,
+            'metodo_usado': metodo_usado,
+            'modelo_pendiente': metodo in ('ml', 'combinado') and 'ml' not in predicciones
         })
         
     except Exception as e:
@@ -208,21 +310,20 @@ def generar_prediccion():
 
 
 @app.route('/api/estadisticas')
+@cachear_respuesta('estadisticas')
 def obtener_estadisticas():
     """Obtener estadísticas del sistema"""
     try:
         predictor = PredictorNumeros()
-        numeros, fechas = predictor.obtener_datos_historicos(limite=500)
+        stats = predictor.analisis_estadistico()
         
-        if len(numeros) < predictor.min_samples:
+        if 'error' in stats:
             return jsonify({
                 'error': 'Datos insuficientes',
-                'disponibles': len(numeros),
+                'disponibles': stats['disponibles'],
                 'necesarios': predictor.min_samples
             })
         
-        stats = predictor.analisis_estadistico(numeros)
-        
         return jsonify({
             'success': True,
             'estadisticas': stats
@@ -232,17 +333,30 @@ def obtener_estadisticas():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/predicciones/evaluacion')
+@cachear_respuesta('evaluacion')
+def evaluar_predicciones():
+    """Precisión de las predicciones por método y por día (?dias=7)"""
+    dias = min(max(request.args.get('dias', 7, type=int), 1), 365)
+    try:
+        evaluacion = PredictorNumeros().evaluar_predicciones(dias)
+        return jsonify({'success': True, 'evaluacion': evaluacion})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/numeros/recientes')
 def obtener_numeros_recientes():
-    """Obtener los números más recientes"""
-    limite = request.args.get('limite', 50, type=int)
+    """Obtener los números más recientes (paginado con ?cursor=)"""
+    limite = min(max(request.args.get('limite', 50, type=int), 1), LIMITE_MAXIMO_PAGINA)
+    cursor = request.args.get('cursor')
     session = get_session()
     
     try:
-        numeros = session.query(NumeroExtraido)\
-            .order_by(NumeroExtraido.fecha_extraccion.desc())\
-            .limit(limite)\
-            .all()
+        try:
+            numeros, _, siguiente_cursor = paginar_numeros(session, limite, despues=cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
         datos = [
             {
@@ -254,7 +368,7 @@ def obtener_numeros_recientes():
             for n in numeros
         ]
         
-        return jsonify({'success': True, 'numeros': datos})
+        return jsonify({'success': True, 'numeros': datos, 'siguiente_cursor': siguiente_cursor})
         
     finally:
         session.close()
@@ -271,23 +385,102 @@ def agregar_numero_manual():
     if numero is None:
         return jsonify({'success': False, 'error': 'Número no proporcionado'}), 400
         
-    session = get_session()
     try:
-        nuevo = NumeroExtraido(
-            numero=int(numero),
-            nombre_sorteo=sorteo,
-            hora_sorteo=hora,
-            fuente='Entrada Manual',
-            fecha_extraccion=datetime.now()
-        )
-        session.add(nuevo)
-        session.commit()
+        # Por insertar_numeros: las inserciones de números van serializadas
+        insertar_numeros([{
+            'numero': int(numero),
+            'nombre_sorteo': sorteo,
+            'hora_sorteo': hora,
+            'fuente': 'Entrada Manual',
+            'fecha_extraccion': datetime.now(),
+        }])
+        procesar_numeros_nuevos(entrenar=False)
         return jsonify({'success': True, 'mensaje': 'Número agregado correctamente'})
     except Exception as e:
-        session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
-    finally:
-        session.close()
+
+
+def _respuesta_exportacion(nombre, crear_consulta, filtro):
+    """Validar los parámetros de exportación y devolver la respuesta en streaming"""
+    formato = request.args.get('formato', 'csv').lower()
+    if formato not in exportacion.FORMATOS:
+        return jsonify({
+            'success': False,
+            'error': f"Formato no soportado. Opciones: {', '.join(exportacion.FORMATOS)}"
+        }), 400
+    if formato == 'parquet' and not exportacion.pyarrow_disponible():
+        return jsonify({'success': False, 'error': 'Parquet requiere instalar pyarrow'}), 400
+    
+    try:
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        consulta = crear_consulta(
+            datetime.fromisoformat(desde) if desde else None,
+            datetime.fromisoformat(hasta) if hasta else None,
+            request.args.get(filtro)
+        )
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Fechas inválidas (formato ISO: AAAA-MM-DD)'}), 400
+    
+    return Response(
+        stream_with_context(exportacion.exportar(consulta, formato)),
+        mimetype=exportacion.FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename={nombre}.{formato}'}
+    )
+
+
+@app.route('/api/export/numeros')
+def exportar_numeros():
+    """Exportar números extraídos (?formato=csv|ndjson|parquet&desde=&hasta=&fuente=)"""
+    return _respuesta_exportacion('numeros', exportacion.consulta_numeros, 'fuente')
+
+
+@app.route('/api/export/predicciones')
+def exportar_predicciones():
+    """Exportar predicciones (?formato=csv|ndjson|parquet&desde=&hasta=&modelo=)"""
+    return _respuesta_exportacion('predicciones', exportacion.consulta_predicciones, 'modelo')
+
+
+@app.route('/api/numeros/lote', methods=['POST'])
+def agregar_numeros_lote():
+    """
+    Agregar números en bloque: arreglo JSON, NDJSON o CSV con campos
+    numero, sorteo, hora y fecha, en el cuerpo o como archivo 'archivo'
+    """
+    formatos = {
+        'application/json': 'json',
+        'application/x-ndjson': 'ndjson',
+        'text/csv': 'csv',
+    }
+    archivo = request.files.get('archivo')
+    if archivo:
+        extension = archivo.filename.rsplit('.', 1)[-1].lower() if archivo.filename else ''
+        formato = extension if extension in formatos.values() else formatos.get(archivo.mimetype)
+        contenido = archivo.read() if formato == 'json' else archivo.stream
+    else:
+        formato = formatos.get(request.mimetype)
+        contenido = request.get_data() if formato == 'json' else request.stream
+    
+    if formato is None:
+        return jsonify({
+            'success': False,
+            'error': 'Formato no soportado. Usa JSON, NDJSON o CSV'
+        }), 400
+    
+    try:
+        resultado = ingerir_registros(
+            leer_registros(contenido, formato),
+            fuente=request.args.get('fuente', FUENTE_CARGA_MASIVA)
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    
+    if resultado['total_insertados']:
+        procesar_numeros_nuevos(entrenar=False)
+    
+    return jsonify({'success': True, **resultado})
 
 
 @app.route('/historial')
@@ -308,24 +501,43 @@ def historial():
 @app.route('/historial-resultados')
 def historial_resultados():
     """Página de historial de números extraídos"""
-    pagina = request.args.get('pagina', 1, type=int)
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
     por_pagina = 50
+    despues = request.args.get('despues')
+    antes = request.args.get('antes')
     session = get_session()
     try:
-        total_numeros = session.query(NumeroExtraido).count()
-        total_paginas = (total_numeros + por_pagina - 1) // por_pagina
+        if pagina > 1 and not despues and not antes:
+            # Enlaces anteriores a la paginación por cursor (?pagina=N): se
+            # busca la última fila de la página N-1 y se redirige a su cursor
+            anterior = session.query(NumeroExtraido)\
+                .order_by(NumeroExtraido.fecha_extraccion.desc(), NumeroExtraido.id.desc())\
+                .offset((pagina - 1) * por_pagina - 1)\
+                .first()
+            if anterior is None:
+                return redirect(url_for('historial_resultados'))
+            return redirect(url_for(
+                'historial_resultados', despues=codificar_cursor(anterior), pagina=pagina
+            ))
         
-        numeros = session.query(NumeroExtraido)\
-            .order_by(NumeroExtraido.fecha_extraccion.desc())\
-            .offset((pagina - 1) * por_pagina)\
-            .limit(por_pagina)\
-            .all()
+        # Total según los agregados incrementales: no se hace COUNT(*) por visita
+        total = total_numeros()
+        total_paginas = (total + por_pagina - 1) // por_pagina
+        
+        try:
+            numeros, cursor_anterior, cursor_siguiente = paginar_numeros(
+                session, por_pagina, despues=despues, antes=antes
+            )
+        except ValueError:
+            return redirect(url_for('historial_resultados'))
         
         return render_template('historial_resultados.html', 
                              numeros=numeros, 
                              pagina=pagina, 
                              total_paginas=total_paginas,
-                             total_numeros=total_numeros)
+                             total_numeros=total,
+                             cursor_anterior=cursor_anterior,
+                             cursor_siguiente=cursor_siguiente)
     finally:
         session.close()
 
@@ -347,4 +559,6 @@ if __name__ == '__main__':
     print(f"\n📍 Servidor: http://127.0.0.1:5000")
     print(f"⏰ Iniciado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
+    # En desarrollo se inicializa aquí; en producción es un paso aparte (python database.py)
+    init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
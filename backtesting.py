@@ -0,0 +1,211 @@
+"""
+Backtesting walk-forward de los métodos de predicción
+
+Recorre el historial y en cada paso t predice numeros[t] usando solo los
+números anteriores, igual que lo haría predecir_proximo_numero en ese momento:
+
+    - 'estadistico': el más frecuente de los últimos N números. Los conteos
+      de la ventana móvil se calculan en bloque con NumPy (sumas acumuladas
+      de +1/-1 por paso), sin recorrer cada ventana. Los empates se resuelven
+      como Counter.most_common: gana el que aparece primero en la ventana.
+    - 'ml': Random Forest reentrenado cada `paso_reentreno` pasos con los
+      datos anteriores al bloque; todo el bloque se predice con un solo
+      predict_proba.
+    - 'combinado': en cada paso, el método con mayor confianza.
+
+Para cada método se informa la tasa de acierto y de acierto en el top-k,
+global y por ventana de evaluación.
+"""
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from predictor import PredictorNumeros, HIPERPARAMETROS_ML, ML_N_JOBS
+
+# Pasos procesados a la vez en los conteos móviles
+TAMANO_BLOQUE_CONTEOS = 4096
+
+
+def _top_k(puntajes, k):
+    """Índices de las k columnas con mayor puntaje por fila (la primera es la mejor)"""
+    k = min(k, puntajes.shape[1])
+    candidatos = np.argpartition(-puntajes, k - 1, axis=1)[:, :k]
+    orden = np.argsort(-np.take_along_axis(puntajes, candidatos, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(candidatos, orden, axis=1)
+
+
+def predicciones_estadisticas(numeros, inicio, ventana_frecuencia=50, top_k=5):
+    """
+    Predicción por frecuencia para cada paso t >= inicio
+
+    Returns:
+        (numeros_predichos, confianzas, top_k_predichos) con una fila por paso
+    """
+    numeros = np.asarray(numeros)
+    valores, indices = np.unique(numeros, return_inverse=True)
+    n_clases = len(valores)
+    w = ventana_frecuencia
+
+    predichos, confianzas, tops = [], [], []
+    for a in range(inicio, len(numeros), TAMANO_BLOQUE_CONTEOS):
+        b = min(a + TAMANO_BLOQUE_CONTEOS, len(numeros))
+        pasos = np.arange(a, b)
+
+        # Conteos de la ventana [a-w, a) y, desde ahí, +1 al entrar y -1 al salir
+        base = np.bincount(indices[max(a - w, 0):a], minlength=n_clases)
+        delta = np.zeros((b - a, n_clases), dtype=np.int32)
+        delta[1:][np.arange(b - a - 1), indices[pasos[:-1]]] += 1
+        salen = pasos[:-1] - w
+        validos = salen >= 0
+        delta[1:][np.flatnonzero(validos), indices[salen[validos]]] -= 1
+        conteos = base + np.cumsum(delta, axis=0)
+
+        # Primera aparición de cada número desde cada posición del tramo
+        # [inicio_tramo, b): mínimo acumulado de atrás hacia adelante
+        inicio_tramo = max(a - w, 0)
+        largo = b - inicio_tramo
+        siguiente = np.full((largo, n_clases), largo, dtype=np.int64)
+        siguiente[np.arange(largo), indices[inicio_tramo:b]] = np.arange(largo)
+        siguiente = np.minimum.accumulate(siguiente[::-1], axis=0)[::-1]
+        desde = np.maximum(pasos - w, 0) - inicio_tramo
+        primera = siguiente[desde] - desde[:, np.newaxis]
+
+        # A igual conteo, más puntaje cuanto antes aparece en la ventana
+        # (el desempate, entre 1 y w, nunca supera un conteo de diferencia)
+        desempate = np.where(conteos > 0, w - primera, 0)
+        mejores = _top_k(conteos.astype(np.int64) * (w + 1) + desempate, top_k)
+        predichos.append(valores[mejores[:, 0]])
+        tamano = np.minimum(pasos, w)
+        confianzas.append(conteos[np.arange(b - a), mejores[:, 0]] / tamano)
+        tops.append(valores[mejores])
+
+    return np.concatenate(predichos), np.concatenate(confianzas), np.concatenate(tops)
+
+
+def predicciones_ml(numeros, inicio, ventana=10, top_k=5, paso_reentreno=2000,
+                    max_entrenamiento=5000, hiperparametros=None):
+    """
+    Predicción ML para cada paso t >= inicio, reentrenando cada `paso_reentreno`
+
+    Returns:
+        (numeros_predichos, confianzas, top_k_predichos) con una fila por paso
+    """
+    numeros = np.asarray(numeros)
+    predictor = PredictorNumeros(ventana=ventana)
+    # X[i] son las features de la ventana que precede a numeros[i + ventana]
+    X, y = predictor.crear_features(numeros, ventana)
+    parametros = dict(hiperparametros or HIPERPARAMETROS_ML)
+    parametros.setdefault('n_jobs', ML_N_JOBS)
+
+    predichos, confianzas, tops = [], [], []
+    for a in range(inicio, len(numeros), paso_reentreno):
+        b = min(a + paso_reentreno, len(numeros))
+        fin_entrenamiento = a - ventana
+        X_train = X[max(fin_entrenamiento - max_entrenamiento, 0):fin_entrenamiento]
+        y_train = y[max(fin_entrenamiento - max_entrenamiento, 0):fin_entrenamiento]
+
+        scaler = StandardScaler()
+        modelo = RandomForestClassifier(**parametros)
+        modelo.fit(scaler.fit_transform(X_train), y_train)
+
+        probabilidades = modelo.predict_proba(scaler.transform(X[a - ventana:b - ventana]))
+        mejores = _top_k(probabilidades, top_k)
+        predichos.append(modelo.classes_[mejores[:, 0]])
+        confianzas.append(probabilidades[np.arange(b - a), mejores[:, 0]])
+        tops.append(modelo.classes_[mejores])
+
+    return np.concatenate(predichos), np.concatenate(confianzas), np.concatenate(tops)
+
+
+def _resumen(reales, predichos, tops, tamano_ventana):
+    """Tasas de acierto globales y por ventana de evaluación"""
+    aciertos = predichos == reales
+    aciertos_top = (tops == reales[:, np.newaxis]).any(axis=1)
+
+    ventanas = []
+    for a in range(0, len(reales), tamano_ventana):
+        b = min(a + tamano_ventana, len(reales))
+        ventanas.append({
+            'desde': a,
+            'hasta': b,
+            'tasa_acierto': float(aciertos[a:b].mean()),
+            'tasa_top_k': float(aciertos_top[a:b].mean()),
+        })
+
+    return {
+        'aciertos': int(aciertos.sum()),
+        'tasa_acierto': float(aciertos.mean()),
+        'tasa_top_k': float(aciertos_top.mean()),
+        'ventanas': ventanas,
+    }
+
+
+def backtest(numeros, metodos=('estadistico', 'ml', 'combinado'), ventana=10,
+             ventana_frecuencia=50, top_k=5, inicio=None, paso_reentreno=2000,
+             max_entrenamiento=5000, tamano_ventana_reporte=1000, hiperparametros=None):
+    """
+    Backtest walk-forward sobre una secuencia de números
+
+    Args:
+        numeros: Historial en orden cronológico
+        metodos: Métodos a evaluar
+        inicio: Primer paso evaluado (default: cuando hay datos para entrenar)
+        paso_reentreno: Pasos entre reentrenamientos del modelo ML
+        max_entrenamiento: Máximo de ejemplos (los más recientes) por entrenamiento
+        tamano_ventana_reporte: Pasos por ventana en el informe
+
+    Returns:
+        dict con el resumen de cada método
+    """
+    numeros = np.asarray(numeros)
+    if inicio is None:
+        inicio = max(ventana_frecuencia, ventana + PredictorNumeros().min_samples)
+    if len(numeros) <= inicio:
+        return {'error': f'Se necesitan más de {inicio} números para el backtest'}
+
+    metodos = set(metodos)
+    reales = numeros[inicio:]
+    resultados = {}
+
+    if metodos & {'estadistico', 'combinado'}:
+        est = predicciones_estadisticas(numeros, inicio, ventana_frecuencia, top_k)
+    if metodos & {'ml', 'combinado'}:
+        ml = predicciones_ml(numeros, inicio, ventana, top_k, paso_reentreno,
+                             max_entrenamiento, hiperparametros)
+
+    if 'estadistico' in metodos:
+        resultados['estadistico'] = _resumen(reales, est[0], est[2], tamano_ventana_reporte)
+    if 'ml' in metodos:
+        resultados['ml'] = _resumen(reales, ml[0], ml[2], tamano_ventana_reporte)
+    if 'combinado' in metodos:
+        usar_ml = ml[1] >= est[1]
+        predichos = np.where(usar_ml, ml[0], est[0])
+        tops = np.where(usar_ml[:, np.newaxis], ml[2], est[2])
+        resultados['combinado'] = _resumen(reales, predichos, tops, tamano_ventana_reporte)
+
+    return {
+        'pasos': int(len(reales)),
+        'inicio': int(inicio),
+        'top_k': top_k,
+        'metodos': resultados,
+    }
+
+
+def ejecutar_backtest(limite=100000, **kwargs):
+    """Backtest sobre los últimos `limite` números de la base de datos"""
+    numeros, _ = PredictorNumeros().obtener_datos_historicos(limite=limite)
+    return backtest(numeros, **kwargs)
+
+
+if __name__ == "__main__":
+    print("=== Backtesting de predicciones ===\n")
+
+    resultado = ejecutar_backtest()
+    if 'error' in resultado:
+        print(f"⚠ {resultado['error']}")
+    else:
+        print(f"Pasos evaluados: {resultado['pasos']}\n")
+        for metodo, resumen in resultado['metodos'].items():
+            print(f"Método {metodo.upper()}:")
+            print(f"  Acierto: {resumen['tasa_acierto']:.2%}")
+            print(f"  Acierto top-{resultado['top_k']}: {resumen['tasa_top_k']:.2%}\n")
@@ -0,0 +1,142 @@
+"""
+Búsqueda de hiperparámetros del modelo de ML con validación temporal
+
+Evalúa cada combinación de ventana, profundidad y cantidad de árboles con
+validación cruzada para series de tiempo (TimeSeriesSplit: siempre se entrena
+con el pasado y se valida con lo que viene después) y reparte las
+combinaciones entre procesos, uno por núcleo. La combinación con mejor
+puntaje promedio queda registrada en el almacén de modelos, y
+reentrenar_y_publicar la usa desde entonces.
+
+Los procesos se crean con 'spawn' y no con fork: la búsqueda corre dentro de
+procesos con hilos (el scheduler, el pool de conexiones, los workers de
+gunicorn) y un fork copiaría locks tomados y conexiones abiertas.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+
+from almacen_modelos import AlmacenModelos
+from predictor import PredictorNumeros, HIPERPARAMETROS_ML
+
+# Valores que se prueban
+VENTANAS = (5, 10, 20)
+PROFUNDIDADES = (5, 10, 20)
+ARBOLES = (100, 200)
+
+# Divisiones de la validación temporal
+N_DIVISIONES = 4
+
+# Procesos de la búsqueda (default: uno por núcleo)
+BUSQUEDA_PROCESOS = int(os.getenv('BUSQUEDA_PROCESOS', 0)) or os.cpu_count() or 1
+
+# Cada cuántas horas la repiten los schedulers (0: nunca)
+BUSQUEDA_HORAS = int(os.getenv('BUSQUEDA_HORAS', 24))
+
+
+def evaluar_configuracion(numeros, ventana, max_depth, n_estimators, n_divisiones=N_DIVISIONES):
+    """
+    Puntaje de una configuración con validación cruzada temporal
+
+    Cada proceso entrena con un solo hilo: el paralelismo está en repartir
+    las configuraciones, no dentro de cada bosque.
+
+    Returns:
+        dict con la configuración y el puntaje de cada división
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.model_selection import TimeSeriesSplit
+    from sklearn.preprocessing import StandardScaler
+
+    X, y = PredictorNumeros().crear_features(numeros, ventana)
+    hiperparametros = {
+        **HIPERPARAMETROS_ML,
+        'max_depth': max_depth,
+        'n_estimators': n_estimators,
+    }
+
+    puntajes = []
+    for indices_train, indices_test in TimeSeriesSplit(n_splits=n_divisiones).split(X):
+        scaler = StandardScaler()
+        modelo = RandomForestClassifier(**hiperparametros, n_jobs=1)
+        modelo.fit(scaler.fit_transform(X[indices_train]), y[indices_train])
+        puntajes.append(float(modelo.score(scaler.transform(X[indices_test]), y[indices_test])))
+
+    return {
+        'ventana': ventana,
+        'hiperparametros': hiperparametros,
+        'puntaje': float(np.mean(puntajes)),
+        'puntajes_divisiones': puntajes,
+    }
+
+
+def buscar_hiperparametros(numeros, ventanas=VENTANAS, profundidades=PROFUNDIDADES,
+                           arboles=ARBOLES, n_divisiones=N_DIVISIONES, procesos=None):
+    """
+    Evaluar todas las combinaciones en paralelo
+
+    Returns:
+        Lista de resultados de evaluar_configuracion, del mejor al peor
+    """
+    numeros = np.array(numeros)
+    combinaciones = list(product(ventanas, profundidades, arboles))
+    procesos = min(procesos or BUSQUEDA_PROCESOS, len(combinaciones))
+
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as executor:
+        futuros = [
+            executor.submit(evaluar_configuracion, numeros, ventana, profundidad, n_arboles, n_divisiones)
+            for ventana, profundidad, n_arboles in combinaciones
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    # Empates: la configuración más barata (menos árboles, menos profundidad)
+    resultados.sort(key=lambda r: (
+        -r['puntaje'],
+        r['hiperparametros']['n_estimators'],
+        r['hiperparametros']['max_depth'] or 0,
+        r['ventana'],
+    ))
+    return resultados
+
+
+def ejecutar_busqueda(limite=5000, almacen=None, **kwargs):
+    """
+    Buscar la mejor configuración sobre los últimos `limite` números y registrarla
+
+    Returns:
+        dict con la configuración ganadora, o None si no hay datos suficientes
+    """
+    almacen = almacen or AlmacenModelos()
+    numeros, _ = PredictorNumeros().obtener_datos_historicos(limite=limite)
+    divisiones = kwargs.get('n_divisiones', N_DIVISIONES)
+    ventanas = kwargs.get('ventanas', VENTANAS)
+    # Cada división necesita ejemplos de entrenamiento para la ventana más grande
+    if len(numeros) < max(ventanas) + 20 * (divisiones + 1):
+        print(f"⚠ Datos insuficientes para la búsqueda: {len(numeros)}")
+        return None
+
+    resultados = buscar_hiperparametros(numeros, **kwargs)
+    ganadora = dict(resultados[0])
+    ganadora['muestras'] = int(len(numeros))
+    ganadora['combinaciones_evaluadas'] = len(resultados)
+    ganadora['fecha_busqueda'] = datetime.utcnow().isoformat()
+
+    almacen.guardar_configuracion(ganadora)
+    print(
+        f"✓ Mejor configuración: ventana={ganadora['ventana']}, "
+        f"max_depth={ganadora['hiperparametros']['max_depth']}, "
+        f"n_estimators={ganadora['hiperparametros']['n_estimators']} "
+        f"(puntaje {ganadora['puntaje']:.2%})"
+    )
+    return ganadora
+
+
+if __name__ == "__main__":
+    print("=== Búsqueda de hiperparámetros ===\n")
+    print(f"Procesos: {BUSQUEDA_PROCESOS}\n")
+    ejecutar_busqueda()
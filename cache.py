@@ -0,0 +1,183 @@
+"""
+Caché de respuestas para las vistas más consultadas
+
+Las claves incluyen la versión de los datos (último NumeroExtraido.id, último
+Prediccion.id y modelo publicado), así que cualquier número o predicción nueva
+invalida las entradas anteriores sin tener que borrarlas. Además cada entrada
+tiene un TTL y el tamaño de la caché está acotado (se descarta la menos usada).
+
+Backends:
+    - 'memoria': diccionario LRU dentro de cada proceso
+    - 'sqlite': archivo SQLite local compartido por todos los workers
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+from sqlalchemy import func
+
+from database import get_session, NumeroExtraido, Prediccion
+from almacen_modelos import AlmacenModelos
+from metricas import CACHE_CONSULTAS
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memoria')
+CACHE_TTL = int(os.getenv('CACHE_TTL', 300))
+CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS', 256))
+CACHE_RUTA = os.getenv(
+    'CACHE_RUTA',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_respuestas.db')
+)
+
+
+class CacheMemoria:
+    """Caché LRU con TTL dentro del proceso"""
+
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.time():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.time() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+class CacheSQLite:
+    """Caché LRU con TTL en un archivo SQLite compartido entre procesos"""
+
+    def __init__(self, ruta=CACHE_RUTA, max_entradas=CACHE_MAX_ENTRADAS, ttl=CACHE_TTL):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'clave TEXT PRIMARY KEY, valor BLOB, expira REAL, ultimo_uso REAL)'
+            )
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def obtener(self, clave):
+        try:
+            conn = self._conexion()
+            fila = conn.execute(
+                'SELECT valor, expira FROM cache WHERE clave = ?', (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            valor, expira = fila
+            ahora = time.time()
+            with conn:
+                if expira < ahora:
+                    conn.execute('DELETE FROM cache WHERE clave = ?', (clave,))
+                    return None
+                conn.execute('UPDATE cache SET ultimo_uso = ? WHERE clave = ?', (ahora, clave))
+            return pickle.loads(valor)
+        except sqlite3.Error as e:
+            print(f"⚠ Error al leer la caché: {e}")
+            return None
+
+    def guardar(self, clave, valor):
+        ahora = time.time()
+        try:
+            with self._conexion() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO cache (clave, valor, expira, ultimo_uso) VALUES (?, ?, ?, ?)',
+                    (clave, pickle.dumps(valor), ahora + self.ttl, ahora)
+                )
+                conn.execute('DELETE FROM cache WHERE expira < ?', (ahora,))
+                conn.execute(
+                    'DELETE FROM cache WHERE clave NOT IN '
+                    '(SELECT clave FROM cache ORDER BY ultimo_uso DESC LIMIT ?)',
+                    (self.max_entradas,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠ Error al escribir la caché: {e}")
+
+    def limpiar(self):
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM cache')
+
+
+def crear_cache(backend=CACHE_BACKEND):
+    """Crear la caché del backend configurado"""
+    if backend == 'sqlite':
+        return CacheSQLite()
+    return CacheMemoria()
+
+
+cache_respuestas = crear_cache()
+
+
+def version_datos():
+    """Versión de los datos que alimentan las vistas cacheadas"""
+    session = get_session()
+    try:
+        ultimo_numero = session.query(func.max(NumeroExtraido.id)).scalar() or 0
+        ultima_prediccion = session.query(func.max(Prediccion.id)).scalar() or 0
+    finally:
+        session.close()
+    return f"{ultimo_numero}-{ultima_prediccion}-{AlmacenModelos().clave_publicada()}"
+
+
+def cachear_respuesta(prefijo, cache=None):
+    """
+    Decorador para vistas de Flask: guarda la respuesta (solo si es 200) bajo
+    una clave con la ruta, los parámetros y la versión de los datos.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            almacen = cache or cache_respuestas
+            clave = f"{prefijo}:{request.full_path}:{version_datos()}"
+
+            guardado = almacen.obtener(clave)
+            CACHE_CONSULTAS.incrementar(prefijo=prefijo, resultado='hit' if guardado is not None else 'miss')
+            if guardado is not None:
+                cuerpo, estado, tipo = guardado
+                respuesta = make_response(cuerpo, estado)
+                respuesta.mimetype = tipo
+                respuesta.headers['X-Cache'] = 'HIT'
+                return respuesta
+
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code == 200 and not respuesta.is_streamed:
+                almacen.guardar(clave, (respuesta.get_data(), respuesta.status_code, respuesta.mimetype))
+            respuesta.headers['X-Cache'] = 'MISS'
+            return respuesta
+        return envoltura
+    return decorador
@@ -3,25 +3,50 @@ Script de tareas programadas (Scheduler) para ejecución autónoma en el servido
 """
 from apscheduler.schedulers.blocking import BlockingScheduler
 from scraper import ejecutar_scraping_automatico
+from tareas import atender_solicitud_reentrenamiento, buscar_y_reentrenar, procesar_numeros_nuevos
+from busqueda_modelos import BUSQUEDA_HORAS
+from metricas import METRICAS_PUERTO, iniciar_servidor_metricas
 from datetime import datetime
 import logging
+import os
 
-# Configurar logs
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-sched = BlockingScheduler()
+# Cada cuánto se revisa qué configuraciones ya cumplieron su intervalo_minutos
+TICK_MINUTOS = int(os.getenv('SCRAPER_TICK_MINUTOS', 1))
+
 
-@sched.scheduled_job('interval', minutes=30)
 def timed_job():
-    """Ejecuta el scraping cada 30 minutos"""
-    logger.info(f"🚀 Iniciando tarea programada: {datetime.now()}")
+    """Ejecuta las configuraciones pendientes y actualiza el modelo si hubo datos nuevos"""
     try:
-        ejecutar_scraping_automatico()
-        logger.info("✅ Tarea completada con éxito")
+        guardados = ejecutar_scraping_automatico()
     except Exception as e:
         logger.error(f"❌ Error en la tarea: {e}")
+        return
+    
+    if not guardados:
+        atender_solicitud_reentrenamiento()
+        return
+    logger.info(f"✅ {guardados} números nuevos: {datetime.now()}")
+    
+    # El entrenamiento vive en este worker: la web solo carga el modelo publicado
+    procesar_numeros_nuevos()
+
 
+# El scheduler, los logs y el servidor de métricas solo se crean al ejecutar el
+# script: los procesos de la búsqueda (spawn) reimportan este módulo
 if __name__ == "__main__":
-    logger.info("⏰ Scheduler iniciado. El sistema revisará el sitio cada 30 minutos.")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
+    sched = BlockingScheduler()
+    sched.add_job(timed_job, 'interval', minutes=TICK_MINUTOS, coalesce=True, max_instances=1)
+    if BUSQUEDA_HORAS > 0:
+        # Busca la mejor configuración del modelo y reentrena con ella
+        sched.add_job(buscar_y_reentrenar, 'interval', hours=BUSQUEDA_HORAS, coalesce=True, max_instances=1)
+    
+    # Los contadores del worker (ingesta, 304, reentrenamientos) se exponen aparte
+    if iniciar_servidor_metricas(METRICAS_PUERTO):
+        logger.info(f"📈 Métricas del worker en :{METRICAS_PUERTO}/metrics")
+    
+    logger.info(f"⏰ Scheduler iniciado. Revisando configuraciones pendientes cada {TICK_MINUTOS} minuto(s).")
     sched.start()
@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean
+from sqlalchemy import create_engine, event, insert, inspect, text, Index, Column, Integer, String, Date, DateTime, Float, Boolean
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import csv
+import hashlib
+import io
 import os
 from dotenv import load_dotenv
+from metricas import NUMEROS_INGERIDOS
 
 load_dotenv()
 
@@ -13,18 +18,27 @@ class NumeroExtraido(Base):
     __tablename__ = 'numeros_extraidos'
     id = Column(Integer, primary_key=True)
     numero = Column(Integer, nullable=False)
+    # Sin índice propio: lo cubre ix_numeros_extraidos_fecha_id_numero
     fecha_extraccion = Column(DateTime, default=datetime.utcnow)
-    nombre_sorteo = Column(String(100))
+    nombre_sorteo = Column(String(100), index=True)
     hora_sorteo = Column(String(20))
-    fuente = Column(String(255))
+    fuente = Column(String(255), index=True)
     metadata_extra = Column(String(500))
+    # Identidad del número (fuente + sorteo + posición) para ingestas idempotentes
+    clave_ingesta = Column(String(40), index=True, unique=True)
+    
+    __table_args__ = (
+        # Paginación por cursor (ORDER BY fecha_extraccion DESC, id DESC); con
+        # numero incluido también cubre la carga del historial (historial.py)
+        Index('ix_numeros_extraidos_fecha_id_numero', 'fecha_extraccion', 'id', 'numero'),
+    )
 
 class Prediccion(Base):
     __tablename__ = 'predicciones'
     id = Column(Integer, primary_key=True)
     numero_predicho = Column(Integer, nullable=False)
     confianza = Column(Float)
-    fecha_prediccion = Column(DateTime, default=datetime.utcnow)
+    fecha_prediccion = Column(DateTime, default=datetime.utcnow, index=True)
     modelo_usado = Column(String(100))
     acertado = Column(Boolean, default=None)
     numero_real = Column(Integer, default=None)
@@ -38,6 +52,47 @@ class ConfiguracionScraper(Base):
     intervalo_minutos = Column(Integer, default=60)
     activo = Column(Boolean, default=True)
     ultima_ejecucion = Column(DateTime)
+    # Validadores HTTP de la última descarga (GET condicional)
+    etag = Column(String(255))
+    ultima_modificacion = Column(String(100))
+    # Huella de los números de la última extracción guardada
+    hash_contenido = Column(String(40))
+
+class EstadisticaAgregada(Base):
+    """Agregados incrementales de numeros_extraidos (una sola fila, id=1)"""
+    __tablename__ = 'estadisticas_agregadas'
+    id = Column(Integer, primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    media = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    minimo = Column(Integer)
+    maximo = Column(Integer)
+    pares = Column(Integer, nullable=False, default=0)
+    ultimo_numero = Column(Integer)
+    racha_actual = Column(Integer, nullable=False, default=0)
+    racha_maxima = Column(Integer, nullable=False, default=0)
+    total_diferencias = Column(Integer, nullable=False, default=0)
+    media_diferencias = Column(Float, nullable=False, default=0.0)
+    m2_diferencias = Column(Float, nullable=False, default=0.0)
+    # fecha_extraccion del último número agregado (orden cronológico)
+    ultima_fecha = Column(DateTime)
+    fecha_actualizacion = Column(DateTime)
+
+class FrecuenciaNumero(Base):
+    """Cantidad de apariciones de cada número"""
+    __tablename__ = 'frecuencias_numeros'
+    numero = Column(Integer, primary_key=True, autoincrement=False)
+    frecuencia = Column(Integer, nullable=False, default=0)
+
+class ResumenPrediccion(Base):
+    """Conteos de predicciones por día y método (ver resumen_predicciones.py)"""
+    __tablename__ = 'resumen_predicciones'
+    dia = Column(Date, primary_key=True)
+    modelo_usado = Column(String(100), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    resueltas = Column(Integer, nullable=False, default=0)
+    acertadas = Column(Integer, nullable=False, default=0)
 
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///prediccion.db')
 
@@ -45,12 +100,222 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///prediccion.db')
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+# Pool de conexiones (PostgreSQL): por proceso, así que el total es
+# (DB_POOL_SIZE + DB_MAX_OVERFLOW) x workers de gunicorn + el worker de clock.py
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+
+# SQLite: WAL deja leer mientras clock.py escribe; busy_timeout espera al
+# escritor en lugar de fallar con "database is locked"
+SQLITE_WAL = os.getenv('SQLITE_WAL', 'True').lower() == 'true'
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_MB = int(os.getenv('SQLITE_MMAP_MB', 64))
+
+def _opciones_motor(url):
+    """Argumentos de create_engine según el motor de la URL"""
+    if url.startswith('sqlite'):
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **_opciones_motor(DATABASE_URL))
 Session = sessionmaker(bind=engine)
 
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _configurar_sqlite(conexion_dbapi, _registro):
+        """PRAGMAs por conexión (journal_mode=WAL queda guardado en el archivo)"""
+        cursor = conexion_dbapi.cursor()
+        if SQLITE_WAL:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}')
+        cursor.close()
+
+# Índices reemplazados por otros: migrar_db los borra de las bases existentes
+INDICES_OBSOLETOS = {
+    'numeros_extraidos': (
+        'ix_numeros_extraidos_fecha_id',          # -> ix_numeros_extraidos_fecha_id_numero
+        'ix_numeros_extraidos_fecha_extraccion',  # cubierto por el índice compuesto
+    ),
+}
+
+# Filas por lote en las inserciones masivas
+TAMANO_LOTE_INSERCION = int(os.getenv('TAMANO_LOTE_INSERCION', 1000))
+
+# Clave del bloqueo consultivo que serializa las inserciones en PostgreSQL
+BLOQUEO_INGESTA = 74007001
+
 def init_db():
+    """
+    Crear y migrar las tablas y poner al día estadísticas e instantánea.
+    
+    Es un paso explícito (`python database.py`, fase release del Procfile o
+    antes de gunicorn en el Dockerfile): importar app o clock no lo ejecuta,
+    así cada worker no corre DDL por su cuenta al arrancar.
+    """
+    resumen_nuevo = not inspect(engine).has_table(ResumenPrediccion.__tablename__)
     Base.metadata.create_all(engine)
+    migrar_db()
+    if resumen_nuevo:
+        # Bases existentes: llenar el resumen con las predicciones que ya hay
+        from resumen_predicciones import reconstruir_resumen
+        reconstruir_resumen()
+    # Al arrancar se agregan los números pendientes; después lo hacen las tareas
+    # de cada ingesta, así ninguna petición de lectura escribe
+    from estadisticas import actualizar_estadisticas
+    actualizar_estadisticas()
+    import instantanea
+    if instantanea.INSTANTANEA_ACTIVA:
+        instantanea.actualizar_instantanea()
     print("[OK] Base de datos inicializada")
 
+def migrar_db():
+    """
+    Migración ligera para bases existentes: create_all no modifica tablas ya
+    creadas, así que se agregan las columnas e índices que falten en ellas y
+    se borran los índices reemplazados (INDICES_OBSOLETOS).
+    """
+    inspector = inspect(engine)
+    for tabla in Base.metadata.sorted_tables:
+        if not inspector.has_table(tabla.name):
+            continue
+        
+        columnas = {c['name'] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name not in columnas:
+                tipo = columna.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}'))
+                print(f"[OK] Columna agregada: {tabla.name}.{columna.name}")
+        
+        indices = {i['name'] for i in inspector.get_indexes(tabla.name)}
+        for nombre in INDICES_OBSOLETOS.get(tabla.name, ()):
+            if nombre in indices:
+                with engine.begin() as conn:
+                    conn.execute(text(f'DROP INDEX {nombre}'))
+                print(f"[OK] Índice obsoleto borrado: {nombre}")
+        
+        for indice in tabla.indexes:
+            if indice.name not in indices:
+                indice.create(bind=engine)
+                print(f"[OK] Índice creado: {indice.name}")
+
 def get_session():
     return Session()
+
+def clave_ingesta(fuente, sorteo, posicion):
+    """
+    Calcular la clave de ingesta de un número
+    
+    Args:
+        fuente: URL u origen del número
+        sorteo: Identidad del sorteo (nombre/hora o huella de la página)
+        posicion: Posición del número dentro del sorteo
+    """
+    return hashlib.sha1(f"{fuente}|{sorteo}|{posicion}".encode('utf-8')).hexdigest()
+
+def insertar_numeros(registros, tamano_lote=None):
+    """
+    Insertar muchos NumeroExtraido en bloque, sin crear objetos ORM.
+    
+    Usa COPY en PostgreSQL (psycopg2) y executemany en el resto, con un
+    viaje a la base de datos por lote. Las filas cuya clave_ingesta ya
+    existe se ignoran (ON CONFLICT DO NOTHING / INSERT OR IGNORE).
+    
+    Todas las inserciones de números pasan por aquí y se serializan (ver
+    _serializar_ingesta), así que los ids se confirman en orden.
+    
+    Args:
+        registros: Lista de dicts con las columnas de NumeroExtraido
+        tamano_lote: Filas por lote (default: TAMANO_LOTE_INSERCION)
+        
+    Returns:
+        Cantidad de filas insertadas
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_INSERCION
+    tabla = NumeroExtraido.__table__
+    insertados = 0
+    
+    with engine.begin() as conn:
+        _serializar_ingesta(conn)
+        for inicio in range(0, len(registros), tamano_lote):
+            lote = registros[inicio:inicio + tamano_lote]
+            if engine.dialect.name == 'postgresql' and engine.dialect.driver == 'psycopg2':
+                insertados += _copiar_lote(conn, tabla, lote)
+            else:
+                resultado = conn.execute(_insert_ignorando_duplicados(tabla), lote)
+                insertados += resultado.rowcount
+    
+    NUMEROS_INGERIDOS.incrementar(insertados)
+    return insertados
+
+def _serializar_ingesta(conn):
+    """
+    Una sola transacción de inserción de números a la vez.
+    
+    En PostgreSQL los ids salen de una secuencia: sin serializar, una
+    transacción con ids menores puede confirmarse después de otra con ids
+    mayores, y quien avanza con "id > último procesado" (estadisticas.py,
+    instantanea.py) se saltearía esas filas para siempre. El bloqueo
+    consultivo se toma antes de pedir ids y se suelta al confirmar.
+    SQLite ya admite un solo escritor a la vez.
+    """
+    if engine.dialect.name == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:clave)'), {'clave': BLOQUEO_INGESTA})
+
+def _insert_ignorando_duplicados(tabla):
+    """INSERT que ignora las filas con clave_ingesta repetida"""
+    if engine.dialect.name == 'postgresql':
+        return postgresql.insert(tabla).on_conflict_do_nothing(index_elements=['clave_ingesta'])
+    if engine.dialect.name == 'sqlite':
+        return sqlite.insert(tabla).on_conflict_do_nothing(index_elements=['clave_ingesta'])
+    return insert(tabla)
+
+def _copiar_lote(conn, tabla, lote):
+    """
+    Cargar un lote con COPY ... FROM STDIN dentro de la transacción actual.
+    COPY no admite ON CONFLICT, así que se copia a una tabla temporal y de
+    ahí se inserta ignorando duplicados.
+    """
+    columnas = sorted({columna for registro in lote for columna in registro})
+    lista_columnas = ', '.join(columnas)
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for registro in lote:
+        escritor.writerow([
+            '' if registro.get(c) is None else registro.get(c) for c in columnas
+        ])
+    buffer.seek(0)
+    
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS tmp_{tabla.name}")
+        cursor.execute(
+            f"CREATE TEMP TABLE tmp_{tabla.name} ON COMMIT DROP AS "
+            f"SELECT {lista_columnas} FROM {tabla.name} WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY tmp_{tabla.name} ({lista_columnas}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cursor.execute(
+            f"INSERT INTO {tabla.name} ({lista_columnas}) "
+            f"SELECT {lista_columnas} FROM tmp_{tabla.name} "
+            f"ON CONFLICT (clave_ingesta) DO NOTHING"
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+if __name__ == "__main__":
+    init_db()
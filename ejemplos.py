@@ -66,7 +66,7 @@ def ejemplo_prediccion():
         
         # Generar predicción
         print("\n🔮 Generando predicción...")
-        predicciones = predictor.predecir_proximo_numero(metodo='combinado')
+        predicciones = predictor.predecir_proximo_numero(metodo='combinado', entrenar_si_falta=True)
         
         print("\n✨ PREDICCIONES:")
         for metodo, pred in predicciones.items():
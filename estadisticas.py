@@ -0,0 +1,381 @@
+"""
+Motor de estadísticas incrementales sobre numeros_extraidos
+
+Mantiene en la base de datos los agregados de todo el historial (conteos,
+media y varianza con el algoritmo de Welford, pares, rachas y diferencias)
+y en cada actualización solo procesa las filas con id mayor al último
+agregado. Consultar las estadísticas no depende del tamaño del historial.
+
+Las lecturas solo leen la fila persistida: ponerse al día es una escritura y
+lo hacen init_db y las tareas posteriores a cada ingesta (tareas.py), nunca
+una petición de lectura.
+
+Las filas se agregan en orden cronológico (fecha_extraccion, id), el mismo
+del predictor y de la instantánea. Los números nuevos se buscan por "id >
+último agregado", que no saltea filas porque las inserciones se serializan
+(database.insertar_numeros): nunca se confirma un id menor a uno ya visible.
+Si los nuevos no van después del último agregado en el tiempo (p. ej. una
+carga de históricos), rachas y diferencias ya no se pueden continuar y se
+recalcula todo en orden cronológico, como hace instantanea.py.
+"""
+import math
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import engine, NumeroExtraido, EstadisticaAgregada, FrecuenciaNumero
+
+# Filas procesadas por transacción al ponerse al día
+TAMANO_BLOQUE = 50000
+
+ID_AGREGADO = 1
+
+ESTADO_INICIAL = {
+    'ultimo_id': 0,
+    'total': 0,
+    'media': 0.0,
+    'm2': 0.0,
+    'minimo': None,
+    'maximo': None,
+    'pares': 0,
+    'ultimo_numero': None,
+    'racha_actual': 0,
+    'racha_maxima': 0,
+    'total_diferencias': 0,
+    'media_diferencias': 0.0,
+    'm2_diferencias': 0.0,
+    'ultima_fecha': None,
+}
+
+
+class _ConflictoActualizacion(Exception):
+    """Otro proceso agregó las mismas filas primero"""
+
+
+def _en_orden(estado, fechas):
+    """Si los números nuevos (en orden de id) continúan el orden cronológico"""
+    if estado['total'] and fechas[0] < estado['ultima_fecha']:
+        return False
+    return all(anterior <= siguiente for anterior, siguiente in zip(fechas, fechas[1:]))
+
+
+def _insert_dialecto(tabla):
+    """INSERT con soporte de ON CONFLICT, si el motor lo tiene"""
+    if engine.dialect.name == 'postgresql':
+        return postgresql.insert(tabla)
+    if engine.dialect.name == 'sqlite':
+        return sqlite.insert(tabla)
+    return None
+
+
+def _combinar_momentos(n_a, media_a, m2_a, valores):
+    """Combinar (n, media, M2) con un bloque de valores (Welford en paralelo, Chan et al.)"""
+    n_b = len(valores)
+    if n_b == 0:
+        return n_a, media_a, m2_a
+
+    media_b = float(valores.mean())
+    m2_b = float(((valores - media_b) ** 2).sum())
+    n = n_a + n_b
+    delta = media_b - media_a
+    media = media_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta * delta * n_a * n_b / n
+    return n, media, m2
+
+
+def _acumular(estado, numeros):
+    """
+    Agregar un bloque de números (en orden de llegada) al estado
+
+    Returns:
+        dict con el estado nuevo
+    """
+    nuevo = dict(estado)
+    valores = numeros.astype(np.float64)
+
+    nuevo['total'], nuevo['media'], nuevo['m2'] = _combinar_momentos(
+        estado['total'], estado['media'], estado['m2'], valores
+    )
+
+    minimo, maximo = int(numeros.min()), int(numeros.max())
+    nuevo['minimo'] = minimo if estado['minimo'] is None else min(estado['minimo'], minimo)
+    nuevo['maximo'] = maximo if estado['maximo'] is None else max(estado['maximo'], maximo)
+    nuevo['pares'] = estado['pares'] + int(np.count_nonzero(numeros % 2 == 0))
+
+    # Diferencias y rachas continúan desde el último número agregado
+    hay_anterior = estado['ultimo_numero'] is not None
+    if hay_anterior:
+        secuencia = np.concatenate(([estado['ultimo_numero']], numeros))
+    else:
+        secuencia = numeros
+
+    (nuevo['total_diferencias'],
+     nuevo['media_diferencias'],
+     nuevo['m2_diferencias']) = _combinar_momentos(
+        estado['total_diferencias'],
+        estado['media_diferencias'],
+        estado['m2_diferencias'],
+        np.diff(secuencia).astype(np.float64)
+    )
+
+    # Largo de cada racha de números iguales consecutivos
+    inicios = np.concatenate(([0], np.flatnonzero(secuencia[1:] != secuencia[:-1]) + 1))
+    largos = np.diff(np.concatenate((inicios, [len(secuencia)])))
+    if hay_anterior:
+        # La primera racha incluye al número anterior, que ya tenía su racha contada
+        largos[0] += estado['racha_actual'] - 1
+
+    nuevo['racha_actual'] = int(largos[-1])
+    nuevo['racha_maxima'] = max(estado['racha_maxima'], int(largos.max()))
+    nuevo['ultimo_numero'] = int(numeros[-1])
+    return nuevo
+
+
+def _leer_estado(conn):
+    fila = conn.execute(
+        select(EstadisticaAgregada.__table__).where(EstadisticaAgregada.id == ID_AGREGADO)
+    ).mappings().first()
+    if fila is None:
+        return dict(ESTADO_INICIAL)
+    return {clave: fila[clave] for clave in ESTADO_INICIAL}
+
+
+def _asegurar_fila(conn):
+    """Crear la fila de agregados si todavía no existe"""
+    tabla = EstadisticaAgregada.__table__
+    insercion = _insert_dialecto(tabla)
+    if insercion is not None:
+        conn.execute(
+            insercion.values(id=ID_AGREGADO, **ESTADO_INICIAL).on_conflict_do_nothing(index_elements=['id'])
+        )
+    elif conn.execute(select(tabla.c.id).where(tabla.c.id == ID_AGREGADO)).first() is None:
+        conn.execute(tabla.insert().values(id=ID_AGREGADO, **ESTADO_INICIAL))
+
+
+def _sumar_frecuencias(conn, numeros):
+    """Sumar las apariciones de un bloque a frecuencias_numeros"""
+    tabla = FrecuenciaNumero.__table__
+    valores, conteos = np.unique(numeros, return_counts=True)
+    filas = [
+        {'numero': int(valor), 'frecuencia': int(conteo)}
+        for valor, conteo in zip(valores, conteos)
+    ]
+
+    insercion = _insert_dialecto(tabla)
+    if insercion is not None:
+        conn.execute(
+            insercion.on_conflict_do_update(
+                index_elements=['numero'],
+                set_={'frecuencia': tabla.c.frecuencia + insercion.excluded.frecuencia}
+            ),
+            filas
+        )
+        return
+
+    for fila in filas:
+        resultado = conn.execute(
+            update(tabla)
+            .where(tabla.c.numero == fila['numero'])
+            .values(frecuencia=tabla.c.frecuencia + fila['frecuencia'])
+        )
+        if resultado.rowcount == 0:
+            conn.execute(tabla.insert().values(**fila))
+
+
+def actualizar_estadisticas(tamano_bloque=TAMANO_BLOQUE):
+    """
+    Agregar los números nuevos desde la última actualización.
+
+    Es seguro llamarla desde varios procesos: el estado se reclama con un
+    UPDATE condicionado al último id leído y, si otro proceso se adelantó,
+    la transacción se descarta.
+
+    Si los números nuevos tienen fechas anteriores a los ya agregados, se
+    recalcula todo (reconstruir_estadisticas).
+
+    Returns:
+        Cantidad de números agregados
+    """
+    tabla = EstadisticaAgregada.__table__
+    procesados = 0
+    fuera_de_orden = False
+
+    with engine.begin() as conn:
+        _asegurar_fila(conn)
+
+    while True:
+        try:
+            with engine.begin() as conn:
+                estado = _leer_estado(conn)
+                if estado['total'] and estado['ultima_fecha'] is None:
+                    # Agregados de antes de ordenar por fecha: se recalculan una vez
+                    fuera_de_orden = True
+                    break
+                filas = conn.execute(
+                    select(NumeroExtraido.id, NumeroExtraido.numero, NumeroExtraido.fecha_extraccion)
+                    .where(NumeroExtraido.id > estado['ultimo_id'])
+                    .order_by(NumeroExtraido.id)
+                    .limit(tamano_bloque)
+                ).all()
+                if not filas:
+                    break
+                if not _en_orden(estado, [fila.fecha_extraccion for fila in filas]):
+                    fuera_de_orden = True
+                    break
+
+                numeros = np.array([fila.numero for fila in filas], dtype=np.int64)
+                nuevo = _acumular(estado, numeros)
+                nuevo['ultimo_id'] = filas[-1].id
+                nuevo['ultima_fecha'] = filas[-1].fecha_extraccion
+                nuevo['fecha_actualizacion'] = datetime.utcnow()
+
+                resultado = conn.execute(
+                    update(tabla)
+                    .where(tabla.c.id == ID_AGREGADO, tabla.c.ultimo_id == estado['ultimo_id'])
+                    .values(**nuevo)
+                )
+                if resultado.rowcount == 0:
+                    raise _ConflictoActualizacion()
+
+                _sumar_frecuencias(conn, numeros)
+        except _ConflictoActualizacion:
+            break
+
+        procesados += len(filas)
+        if len(filas) < tamano_bloque:
+            break
+
+    if fuera_de_orden:
+        print("⚠ Números con fechas anteriores a las ya agregadas: se recalculan las estadísticas")
+        return reconstruir_estadisticas(tamano_bloque)
+    return procesados
+
+
+def reconstruir_estadisticas(tamano_bloque=TAMANO_BLOQUE):
+    """
+    Recalcular los agregados desde cero en orden cronológico (p. ej. tras
+    borrar filas o cargar históricos), en una sola transacción
+
+    Returns:
+        Cantidad de números agregados
+    """
+    tabla = EstadisticaAgregada.__table__
+    fecha = NumeroExtraido.fecha_extraccion
+
+    with engine.begin() as conn:
+        _asegurar_fila(conn)
+        # Las actualizaciones concurrentes esperan esta fila y después se descartan
+        conn.execute(select(tabla.c.id).where(tabla.c.id == ID_AGREGADO).with_for_update())
+        conn.execute(FrecuenciaNumero.__table__.delete())
+
+        estado = dict(ESTADO_INICIAL)
+        # Cursor (fecha_extraccion, id) de la última fila leída
+        cursor = None
+        while True:
+            consulta = select(NumeroExtraido.id, NumeroExtraido.numero, fecha)\
+                .order_by(fecha, NumeroExtraido.id)\
+                .limit(tamano_bloque)
+            if cursor is not None:
+                consulta = consulta.where(or_(
+                    fecha > cursor[0],
+                    and_(fecha == cursor[0], NumeroExtraido.id > cursor[1])
+                ))
+            filas = conn.execute(consulta).all()
+            if not filas:
+                break
+
+            numeros = np.array([fila.numero for fila in filas], dtype=np.int64)
+            ultimo_id = max(estado['ultimo_id'], max(fila.id for fila in filas))
+            estado = _acumular(estado, numeros)
+            # El id más alto (para seguir por "id >"), no el de la última fila
+            estado['ultimo_id'] = ultimo_id
+            estado['ultima_fecha'] = filas[-1].fecha_extraccion
+            cursor = (filas[-1].fecha_extraccion, filas[-1].id)
+            _sumar_frecuencias(conn, numeros)
+            if len(filas) < tamano_bloque:
+                break
+
+        conn.execute(
+            update(tabla)
+            .where(tabla.c.id == ID_AGREGADO)
+            .values(**estado, fecha_actualizacion=datetime.utcnow())
+        )
+
+    return estado['total']
+
+
+def total_numeros(actualizar=False):
+    """Cantidad de números del historial según los agregados (sin COUNT(*))"""
+    if actualizar:
+        actualizar_estadisticas()
+    with engine.connect() as conn:
+        return _leer_estado(conn)['total']
+
+
+def _valor_en_posicion(valores, acumulado, posicion):
+    """Valor en la posición k (desde 0) del historial ordenado"""
+    return valores[int(np.searchsorted(acumulado, posicion, side='right'))]
+
+
+def obtener_estadisticas(min_samples=50, actualizar=False):
+    """
+    Obtener las estadísticas de todo el historial (hasta la última actualización)
+
+    Returns:
+        dict con las mismas claves que PredictorNumeros.analisis_estadistico
+    """
+    if actualizar:
+        actualizar_estadisticas()
+
+    with engine.connect() as conn:
+        estado = _leer_estado(conn)
+        total = estado['total']
+        if total < min_samples:
+            return {
+                'error': f'Se necesitan al menos {min_samples} muestras. Actualmente: {total}',
+                'disponibles': total
+            }
+
+        frecuencias = conn.execute(
+            select(FrecuenciaNumero.numero, FrecuenciaNumero.frecuencia)
+            .order_by(FrecuenciaNumero.numero)
+        ).all()
+        recientes = conn.execute(
+            select(NumeroExtraido.numero)
+            .where(NumeroExtraido.id <= estado['ultimo_id'])
+            .order_by(NumeroExtraido.fecha_extraccion.desc(), NumeroExtraido.id.desc())
+            .limit(10)
+        ).scalars().all()
+
+    valores = np.array([f.numero for f in frecuencias])
+    acumulado = np.cumsum([f.frecuencia for f in frecuencias])
+    if total % 2:
+        mediana = float(_valor_en_posicion(valores, acumulado, total // 2))
+    else:
+        mediana = (
+            _valor_en_posicion(valores, acumulado, total // 2 - 1) +
+            _valor_en_posicion(valores, acumulado, total // 2)
+        ) / 2
+
+    top_10 = sorted(frecuencias, key=lambda f: (-f.frecuencia, f.numero))[:10]
+    diferencias = estado['total_diferencias']
+
+    return {
+        'total_muestras': total,
+        'media': estado['media'],
+        'mediana': float(mediana),
+        'moda': top_10[0].numero,
+        'desviacion_estandar': math.sqrt(estado['m2'] / total),
+        'minimo': estado['minimo'],
+        'maximo': estado['maximo'],
+        'rango': estado['maximo'] - estado['minimo'],
+        'frecuencias_top_10': [(f.numero, f.frecuencia) for f in top_10],
+        'numeros_recientes': list(reversed(recientes)),
+        'diferencia_promedio': estado['media_diferencias'],
+        'diferencia_std': math.sqrt(estado['m2_diferencias'] / diferencias) if diferencias else 0.0,
+        'racha_maxima': estado['racha_maxima'],
+        'porcentaje_pares': estado['pares'] / total * 100,
+        'porcentaje_impares': (total - estado['pares']) / total * 100,
+    }
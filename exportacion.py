@@ -0,0 +1,185 @@
+"""
+Exportación masiva en streaming de números extraídos y predicciones
+
+Las filas se leen con un cursor del lado del servidor (yield_per) y se
+serializan por bloques, así que la memoria usada no depende del tamaño
+de la tabla. Formatos: CSV, NDJSON y Parquet (este último requiere pyarrow).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import get_session, NumeroExtraido, Prediccion
+
+# Filas por bloque leído de la base de datos (y por row group en Parquet)
+TAMANO_BLOQUE_EXPORTACION = 5000
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+COLUMNAS_NUMEROS = [
+    NumeroExtraido.id,
+    NumeroExtraido.numero,
+    NumeroExtraido.fecha_extraccion,
+    NumeroExtraido.nombre_sorteo,
+    NumeroExtraido.hora_sorteo,
+    NumeroExtraido.fuente,
+]
+
+COLUMNAS_PREDICCIONES = [
+    Prediccion.id,
+    Prediccion.numero_predicho,
+    Prediccion.confianza,
+    Prediccion.fecha_prediccion,
+    Prediccion.modelo_usado,
+    Prediccion.acertado,
+    Prediccion.numero_real,
+]
+
+
+def consulta_numeros(desde=None, hasta=None, fuente=None):
+    """SELECT de numeros_extraidos con filtros de fecha y fuente"""
+    consulta = select(*COLUMNAS_NUMEROS).order_by(NumeroExtraido.id)
+    if desde:
+        consulta = consulta.where(NumeroExtraido.fecha_extraccion >= desde)
+    if hasta:
+        consulta = consulta.where(NumeroExtraido.fecha_extraccion < hasta)
+    if fuente:
+        consulta = consulta.where(NumeroExtraido.fuente == fuente)
+    return consulta
+
+
+def consulta_predicciones(desde=None, hasta=None, modelo=None):
+    """SELECT de predicciones con filtros de fecha y método"""
+    consulta = select(*COLUMNAS_PREDICCIONES).order_by(Prediccion.id)
+    if desde:
+        consulta = consulta.where(Prediccion.fecha_prediccion >= desde)
+    if hasta:
+        consulta = consulta.where(Prediccion.fecha_prediccion < hasta)
+    if modelo:
+        consulta = consulta.where(Prediccion.modelo_usado == modelo)
+    return consulta
+
+
+def _bloques(consulta, tamano_bloque):
+    """Recorrer la consulta por bloques con un cursor del lado del servidor"""
+    session = get_session()
+    try:
+        resultado = session.execute(
+            consulta.execution_options(yield_per=tamano_bloque)
+        )
+        for bloque in resultado.partitions():
+            yield bloque
+    finally:
+        session.close()
+
+
+def _valor_texto(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def _generar_csv(columnas, bloques):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for bloque in bloques:
+        escritor.writerows([_valor_texto(v) for v in fila] for fila in bloque)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _generar_ndjson(columnas, bloques):
+    for bloque in bloques:
+        yield ''.join(
+            json.dumps(dict(zip(columnas, map(_valor_texto, fila))), ensure_ascii=False) + '\n'
+            for fila in bloque
+        )
+
+
+class _SalidaParcial(io.RawIOBase):
+    """Archivo de solo escritura que entrega lo escrito hasta el momento"""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def _generar_parquet(columnas, bloques, tipos):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([(columna, tipos[columna]) for columna in columnas])
+    salida = _SalidaParcial()
+    with pq.ParquetWriter(salida, esquema) as escritor:
+        for bloque in bloques:
+            valores = list(zip(*bloque)) if bloque else [[] for _ in columnas]
+            escritor.write_table(pa.Table.from_arrays(
+                [pa.array(list(col), type=tipos[nombre]) for nombre, col in zip(columnas, valores)],
+                schema=esquema
+            ))
+            yield salida.vaciar()
+    yield salida.vaciar()
+
+
+def _tipos_arrow(consulta):
+    """Tipos de pyarrow equivalentes a las columnas de la consulta"""
+    import pyarrow as pa
+
+    equivalencias = {
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        datetime: pa.timestamp('us'),
+        str: pa.string(),
+    }
+    return {
+        columna.name: equivalencias.get(columna.type.python_type, pa.string())
+        for columna in consulta.selected_columns
+    }
+
+
+def pyarrow_disponible():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def exportar(consulta, formato, tamano_bloque=TAMANO_BLOQUE_EXPORTACION):
+    """
+    Generador con el contenido exportado en el formato pedido
+
+    Args:
+        consulta: SELECT de consulta_numeros / consulta_predicciones
+        formato: 'csv', 'ndjson' o 'parquet'
+    """
+    columnas = [columna.name for columna in consulta.selected_columns]
+    bloques = _bloques(consulta, tamano_bloque)
+
+    if formato == 'csv':
+        return _generar_csv(columnas, bloques)
+    if formato == 'ndjson':
+        return _generar_ndjson(columnas, bloques)
+    if formato == 'parquet':
+        return _generar_parquet(columnas, bloques, _tipos_arrow(consulta))
+    raise ValueError(f'Formato no soportado: {formato}')
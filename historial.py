@@ -0,0 +1,63 @@
+"""
+Carga rápida del historial de números para el análisis
+
+Se lee de la instantánea columnar (instantanea.py) si está activa y al día:
+vistas de numpy.memmap sin copiar. Si no, se leen solo las columnas numero y
+fecha_extraccion de la base de datos, sin entidades ORM ni conversión fila por
+fila a datetime. En ambos casos se devuelven arreglos de NumPy en orden
+cronológico.
+"""
+import numpy as np
+
+from database import engine
+import instantanea
+
+# Se ejecuta con el cursor del driver: los valores llegan tal cual, sin el
+# procesamiento por fila de SQLAlchemy (en SQLite las fechas son texto ISO que
+# NumPy convierte en bloque). El índice (fecha_extraccion, id, numero) la cubre.
+CONSULTA_HISTORIAL = (
+    'SELECT numero, fecha_extraccion FROM numeros_extraidos '
+    'ORDER BY fecha_extraccion DESC, id DESC LIMIT {limite:d}'
+)
+
+
+def cargar_historial(limite=1000):
+    """
+    Obtener los últimos `limite` números
+
+    Returns:
+        (numeros, fechas): arreglo de enteros y arreglo datetime64[us], del más
+        antiguo al más reciente
+    """
+    if instantanea.INSTANTANEA_ACTIVA:
+        try:
+            resultado = instantanea.historial(limite)
+        except Exception as e:
+            print(f"⚠ No se pudo leer la instantánea del historial: {e}")
+        else:
+            # Atrasada (todavía no corrió la tarea posterior a la ingesta)
+            if resultado is not None:
+                return resultado
+    
+    return cargar_historial_bd(limite)
+
+
+def cargar_historial_bd(limite=1000):
+    """Como cargar_historial, pero siempre desde la base de datos"""
+    with engine.connect() as conn:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(CONSULTA_HISTORIAL.format(limite=int(limite)))
+            filas = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    if not filas:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[us]')
+
+    numeros, fechas = zip(*filas)
+    # La consulta viene de la más reciente a la más antigua
+    return (
+        np.array(numeros[::-1], dtype=np.int64),
+        np.array(fechas[::-1], dtype='datetime64[us]'),
+    )
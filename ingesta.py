@@ -0,0 +1,195 @@
+"""
+Ingesta masiva de números (carga de históricos)
+
+Acepta registros {numero, sorteo, hora, fecha, id} desde un arreglo JSON,
+NDJSON o CSV, los valida por lotes y los inserta con una sola sentencia por
+lote. Los registros que se pueden identificar llevan una clave de ingesta, así
+que volver a subir el mismo archivo no duplica filas:
+
+    - con `id`: fuente + id
+    - con fecha y hora (campo hora o fecha con hora): fuente + sorteo + fecha
+      y hora + posición dentro de ese sorteo
+
+Sin id ni hora del sorteo no hay identidad: el registro se inserta siempre.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from database import insertar_numeros, clave_ingesta, TAMANO_LOTE_INSERCION
+
+FUENTE_CARGA_MASIVA = 'Carga Masiva'
+
+# Máximo de filas rechazadas que se detallan en la respuesta
+MAX_RECHAZADOS_DETALLE = 100
+
+
+def leer_registros(contenido, formato):
+    """
+    Recorrer los registros de una carga
+
+    Args:
+        contenido: bytes/str (JSON) o flujo binario (NDJSON/CSV, se lee por líneas)
+        formato: 'json', 'ndjson' o 'csv'
+
+    Yields:
+        dicts tal cual vienen en la carga (o ValueError si una línea no se puede leer)
+    """
+    if formato == 'json':
+        datos = json.loads(contenido)
+        if not isinstance(datos, list):
+            raise ValueError('Se esperaba un arreglo JSON de registros')
+        yield from datos
+        return
+
+    lineas = io.TextIOWrapper(contenido, encoding='utf-8') if not isinstance(contenido, str) \
+        else io.StringIO(contenido)
+
+    if formato == 'ndjson':
+        for linea in lineas:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                yield json.loads(linea)
+            except ValueError as e:
+                yield ValueError(f'JSON inválido: {e}')
+    elif formato == 'csv':
+        yield from csv.DictReader(lineas)
+    else:
+        raise ValueError(f'Formato no soportado: {formato}')
+
+
+def identidad_registro(registro, valido):
+    """
+    Identidad de un registro válido para la clave de ingesta
+
+    Returns:
+        (identidad, por_posicion) o (None, False) si el registro no trae id ni
+        fecha y hora. Con por_posicion, varios números del mismo sorteo se
+        distinguen por su orden en la carga.
+    """
+    identificador = str(registro.get('id') or '').strip()
+    if identificador:
+        return f"id|{identificador}", False
+
+    fecha_texto = str(registro.get('fecha') or '').strip()
+    if fecha_texto and (valido['hora_sorteo'] or len(fecha_texto) > 10):
+        identidad = (
+            f"{valido['nombre_sorteo']}|{valido['fecha_extraccion'].isoformat()}"
+            f"|{valido['hora_sorteo'] or ''}"
+        )
+        return identidad, True
+    return None, False
+
+
+def validar_registro(registro, fuente):
+    """
+    Validar un registro y convertirlo a las columnas de NumeroExtraido
+
+    Returns:
+        dict listo para insertar (sin clave de ingesta)
+
+    Raises:
+        ValueError con el motivo del rechazo
+    """
+    if isinstance(registro, Exception):
+        raise registro
+    if not isinstance(registro, dict):
+        raise ValueError('El registro debe ser un objeto')
+
+    numero = registro.get('numero')
+    if numero is None or str(numero).strip() == '':
+        raise ValueError('Número no proporcionado')
+    try:
+        numero = int(str(numero).strip())
+    except ValueError:
+        raise ValueError(f'Número inválido: {numero}')
+
+    sorteo = str(registro.get('sorteo') or 'Manual').strip()
+    hora = str(registro.get('hora') or '').strip() or None
+
+    fecha_texto = str(registro.get('fecha') or '').strip()
+    if fecha_texto:
+        try:
+            fecha = datetime.fromisoformat(fecha_texto)
+        except ValueError:
+            raise ValueError(f'Fecha inválida: {fecha_texto}')
+        # Solo día: se completa con la hora del sorteo para ordenar el historial
+        if len(fecha_texto) == 10 and hora:
+            try:
+                hora_sorteo = datetime.strptime(hora, '%H:%M')
+                fecha = fecha.replace(hour=hora_sorteo.hour, minute=hora_sorteo.minute)
+            except ValueError:
+                pass
+    else:
+        fecha = datetime.utcnow()
+
+    return {
+        'numero': numero,
+        'nombre_sorteo': sorteo,
+        'hora_sorteo': hora,
+        'fuente': fuente,
+        'fecha_extraccion': fecha,
+    }
+
+
+def ingerir_registros(registros, fuente=FUENTE_CARGA_MASIVA, tamano_lote=None):
+    """
+    Validar e insertar registros por lotes
+
+    Returns:
+        dict con los conteos por lote, el total insertado y las filas rechazadas
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_INSERCION
+    lotes = []
+    rechazados = []
+    total_rechazados = 0
+    pendientes = []
+    # Posición de cada número dentro de su sorteo, para la clave de ingesta
+    posiciones = {}
+
+    def insertar_pendientes():
+        insertados = insertar_numeros(pendientes, tamano_lote)
+        lotes.append({
+            'lote': len(lotes) + 1,
+            'recibidos': len(pendientes),
+            'insertados': insertados,
+            'duplicados': len(pendientes) - insertados,
+        })
+        pendientes.clear()
+
+    for fila, registro in enumerate(registros, start=1):
+        try:
+            valido = validar_registro(registro, fuente)
+        except ValueError as e:
+            total_rechazados += 1
+            if len(rechazados) < MAX_RECHAZADOS_DETALLE:
+                rechazados.append({
+                    'fila': fila,
+                    'error': str(e),
+                    'registro': registro if isinstance(registro, dict) else None,
+                })
+            continue
+
+        identidad, por_posicion = identidad_registro(registro, valido)
+        valido['clave_ingesta'] = None
+        if identidad is not None:
+            posicion = posiciones.get(identidad, 0) if por_posicion else 0
+            posiciones[identidad] = posicion + 1
+            valido['clave_ingesta'] = clave_ingesta(fuente, identidad, posicion)
+
+        pendientes.append(valido)
+        if len(pendientes) >= tamano_lote:
+            insertar_pendientes()
+
+    if pendientes:
+        insertar_pendientes()
+
+    return {
+        'lotes': lotes,
+        'total_insertados': sum(lote['insertados'] for lote in lotes),
+        'total_rechazados': total_rechazados,
+        'rechazados': rechazados,
+    }
@@ -102,7 +102,6 @@ def verificar_dependencias():
         'requests',
         'bs4',
         'selenium',
-        'pandas',
         'sklearn',
         'sqlalchemy'
     ]
@@ -0,0 +1,343 @@
+"""
+Instantánea columnar del historial de números, leída con numpy.memmap
+
+Copia en disco de numeros_extraidos en columnas binarias, ordenada igual que
+el historial (fecha_extraccion, id). Se actualiza de forma incremental: solo
+se agregan las filas con id mayor al último copiado. Si llegan filas con
+fechas anteriores a las ya copiadas (p. ej. una carga de históricos) se
+reescribe ordenada en una generación nueva.
+
+Los lectores abren las columnas con numpy.memmap y devuelven vistas sin
+copiar, así que todos los workers comparten las mismas páginas de la caché
+del sistema operativo.
+
+Archivos en INSTANTANEA_DIR:
+    actual.json         generación vigente, filas, último id y diccionario de fuentes
+    g<N>/ids.i64        id de cada fila
+    g<N>/numeros.i32    número
+    g<N>/fechas.i64     fecha_extraccion en microsegundos desde 1970
+    g<N>/fuentes.i32    posición de la fuente en el diccionario (-1 si no tiene)
+
+Los lectores solo miran las `filas` que indica actual.json, que se reemplaza
+de forma atómica después de escribir las columnas. Los lectores no escriben:
+la ponen al día init_db y las tareas posteriores a cada ingesta (tareas.py).
+Mientras está atrasada respecto de la base de datos, historial() devuelve
+None y se lee de la base de datos.
+
+Como en estadisticas.py, avanzar por "id > último copiado" es exacto porque
+database.insertar_numeros serializa las inserciones.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from sqlalchemy import func, select
+
+from database import engine, NumeroExtraido
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+INSTANTANEA_ACTIVA = os.getenv('INSTANTANEA_ACTIVA', 'True').lower() == 'true'
+INSTANTANEA_DIR = os.getenv(
+    'INSTANTANEA_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instantanea')
+)
+
+ARCHIVO_ACTUAL = 'actual.json'
+
+# Filas leídas de la base de datos por consulta al ponerse al día
+TAMANO_BLOQUE = 50000
+
+COLUMNAS = {
+    'ids': ('ids.i64', np.int64),
+    'numeros': ('numeros.i32', np.int32),
+    'fechas': ('fechas.i64', np.int64),
+    'fuentes': ('fuentes.i32', np.int32),
+}
+
+_lock_escritura = threading.Lock()
+
+# Última instantánea abierta: (ruta, (generación, filas, último id), Instantanea)
+_abierta = (None, None, None)
+
+
+class Instantanea:
+    """Columnas de una instantánea abierta (vistas de solo lectura)"""
+
+    def __init__(self, ids, numeros, fechas, fuentes, diccionario_fuentes, ultimo_id):
+        self.ids = ids
+        self.numeros = numeros
+        self.fechas = fechas.view('datetime64[us]')
+        self.fuentes = fuentes
+        self.diccionario_fuentes = diccionario_fuentes
+        self.ultimo_id = ultimo_id
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _ruta_actual(directorio):
+    return os.path.join(directorio, ARCHIVO_ACTUAL)
+
+
+def _ruta_columna(directorio, generacion, columna):
+    return os.path.join(directorio, f"g{generacion}", COLUMNAS[columna][0])
+
+
+def _leer_meta(directorio):
+    try:
+        with open(_ruta_actual(directorio), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_meta(directorio, meta):
+    """Reemplazar actual.json de forma atómica"""
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporal, _ruta_actual(directorio))
+    except Exception:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+@contextmanager
+def _bloqueo(directorio):
+    """Un solo escritor a la vez, entre hilos y entre procesos"""
+    os.makedirs(directorio, exist_ok=True)
+    with _lock_escritura:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directorio, '.lock'), 'w') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def _abrir_columna(directorio, generacion, columna, filas):
+    dtype = COLUMNAS[columna][1]
+    if filas == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(
+        _ruta_columna(directorio, generacion, columna), dtype=dtype, mode='r', shape=(filas,)
+    )
+
+
+def _abrir_meta(directorio, meta):
+    columnas = {
+        columna: _abrir_columna(directorio, meta['generacion'], columna, meta['filas'])
+        for columna in COLUMNAS
+    }
+    return Instantanea(
+        diccionario_fuentes=meta['fuentes'], ultimo_id=meta['ultimo_id'], **columnas
+    )
+
+
+def abrir(directorio=None):
+    """
+    Abrir la instantánea vigente (solo se vuelve a mapear si cambió)
+
+    Returns:
+        Instantanea o None si todavía no existe
+    """
+    global _abierta
+    directorio = directorio or INSTANTANEA_DIR
+    meta = _leer_meta(directorio)
+    if meta is None:
+        return None
+
+    version = (meta['generacion'], meta['filas'], meta['ultimo_id'])
+    ruta_cache, version_cache, instantanea = _abierta
+    if ruta_cache == directorio and version_cache == version:
+        return instantanea
+
+    instantanea = _abrir_meta(directorio, meta)
+    _abierta = (directorio, version, instantanea)
+    return instantanea
+
+
+def _columnas_desde_filas(filas, diccionario):
+    """Convertir filas (id, numero, fecha, fuente) a columnas ordenadas por (fecha, id)"""
+    posiciones = {fuente: i for i, fuente in enumerate(diccionario)}
+    codigos = []
+    for fila in filas:
+        if fila.fuente is None:
+            codigos.append(-1)
+            continue
+        if fila.fuente not in posiciones:
+            posiciones[fila.fuente] = len(diccionario)
+            diccionario.append(fila.fuente)
+        codigos.append(posiciones[fila.fuente])
+
+    numeros = np.array([fila.numero for fila in filas], dtype=np.int64)
+    if len(numeros) and (numeros.min() < np.iinfo(np.int32).min or numeros.max() > np.iinfo(np.int32).max):
+        raise ValueError('Hay números fuera del rango de int32')
+
+    columnas = {
+        'ids': np.array([fila.id for fila in filas], dtype=np.int64),
+        'numeros': numeros.astype(np.int32),
+        'fechas': np.array(
+            [fila.fecha_extraccion for fila in filas], dtype='datetime64[us]'
+        ).view(np.int64),
+        'fuentes': np.array(codigos, dtype=np.int32),
+    }
+    orden = np.lexsort((columnas['ids'], columnas['fechas']))
+    return {columna: valores[orden] for columna, valores in columnas.items()}
+
+
+def _escribir_generacion(directorio, generacion, columnas):
+    carpeta = os.path.join(directorio, f"g{generacion}")
+    os.makedirs(carpeta, exist_ok=True)
+    for columna, valores in columnas.items():
+        with open(_ruta_columna(directorio, generacion, columna), 'wb') as f:
+            f.write(np.ascontiguousarray(valores).tobytes())
+
+
+def _agregar(directorio, generacion, filas_previas, columnas):
+    """Agregar al final de cada columna (descarta restos de una escritura interrumpida)"""
+    for columna, valores in columnas.items():
+        tamano = filas_previas * np.dtype(COLUMNAS[columna][1]).itemsize
+        with open(_ruta_columna(directorio, generacion, columna), 'r+b') as f:
+            f.truncate(tamano)
+            f.seek(tamano)
+            f.write(np.ascontiguousarray(valores).tobytes())
+
+
+def _limpiar_generaciones(directorio, vigente):
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('g') and nombre[1:].isdigit() and int(nombre[1:]) != vigente:
+            # En Windows falla si algún proceso todavía la tiene mapeada
+            shutil.rmtree(os.path.join(directorio, nombre), ignore_errors=True)
+
+
+def actualizar_instantanea(tamano_bloque=TAMANO_BLOQUE, directorio=None, reconstruir=False):
+    """
+    Copiar a la instantánea los números nuevos desde la última actualización
+
+    Args:
+        reconstruir: Empezar una generación vacía y copiar todo el historial
+
+    Returns:
+        Cantidad de filas agregadas
+    """
+    directorio = directorio or INSTANTANEA_DIR
+    agregadas = 0
+
+    with _bloqueo(directorio):
+        meta = _leer_meta(directorio)
+        if meta is not None and meta['ultimo_id'] > _ultimo_id_bd():
+            # La base de datos tiene menos filas que la copia (otra base o filas borradas)
+            reconstruir = True
+        if meta is None or reconstruir:
+            generacion = meta['generacion'] + 1 if meta else 0
+            meta = {'generacion': generacion, 'filas': 0, 'ultimo_id': 0, 'fuentes': []}
+            _escribir_generacion(directorio, generacion, {
+                columna: np.empty(0, dtype=dtype) for columna, (_, dtype) in COLUMNAS.items()
+            })
+            _escribir_meta(directorio, meta)
+
+        while True:
+            with engine.connect() as conn:
+                filas = conn.execute(
+                    select(
+                        NumeroExtraido.id,
+                        NumeroExtraido.numero,
+                        NumeroExtraido.fecha_extraccion,
+                        NumeroExtraido.fuente,
+                    )
+                    .where(NumeroExtraido.id > meta['ultimo_id'])
+                    .order_by(NumeroExtraido.id)
+                    .limit(tamano_bloque)
+                ).all()
+            if not filas:
+                break
+
+            nuevas = _columnas_desde_filas(filas, meta['fuentes'])
+            actual = _abrir_meta(directorio, meta) if meta['filas'] else None
+            en_orden = actual is None or (
+                (nuevas['fechas'][0], nuevas['ids'][0]) >
+                (int(actual.fechas[-1].view(np.int64)), int(actual.ids[-1]))
+            )
+
+            if en_orden:
+                _agregar(directorio, meta['generacion'], meta['filas'], nuevas)
+            else:
+                # Fechas anteriores a las ya copiadas: se reescribe todo ordenado
+                previas = {
+                    'ids': actual.ids,
+                    'numeros': actual.numeros,
+                    'fechas': actual.fechas.view(np.int64),
+                    'fuentes': actual.fuentes,
+                }
+                todas = {c: np.concatenate((previas[c], nuevas[c])) for c in COLUMNAS}
+                orden = np.lexsort((todas['ids'], todas['fechas']))
+                meta['generacion'] += 1
+                _escribir_generacion(
+                    directorio, meta['generacion'], {c: v[orden] for c, v in todas.items()}
+                )
+
+            meta['filas'] += len(filas)
+            meta['ultimo_id'] = filas[-1].id
+            _escribir_meta(directorio, meta)
+            agregadas += len(filas)
+            if len(filas) < tamano_bloque:
+                break
+
+        _limpiar_generaciones(directorio, meta['generacion'])
+
+    if agregadas:
+        print(f"✓ Instantánea del historial: {agregadas} filas agregadas")
+    return agregadas
+
+
+def reconstruir_instantanea(directorio=None):
+    """Volver a copiar todo el historial (p. ej. tras borrar filas)"""
+    return actualizar_instantanea(directorio=directorio, reconstruir=True)
+
+
+def _ultimo_id_bd():
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(NumeroExtraido.id))).scalar() or 0
+
+
+def abrir_al_dia(directorio=None):
+    """
+    Abrir la instantánea solo si está al día con la base de datos (sin
+    escribir: ponerla al día es tarea de init_db y de tareas.py)
+
+    Returns:
+        Instantanea, o None si no existe o no coincide con la base de datos
+    """
+    instantanea = abrir(directorio)
+    if instantanea is None or instantanea.ultimo_id != _ultimo_id_bd():
+        return None
+    return instantanea
+
+
+def historial(limite=1000, directorio=None):
+    """
+    Últimos `limite` números y fechas, como vistas de la instantánea
+
+    Returns:
+        (numeros, fechas): arreglos int32 y datetime64[us] en orden
+        cronológico, o None si la instantánea no está al día
+    """
+    instantanea = abrir_al_dia(directorio)
+    if instantanea is None:
+        return None
+    inicio = max(len(instantanea) - max(limite, 0), 0)
+    return instantanea.numeros[inicio:], instantanea.fechas[inicio:]
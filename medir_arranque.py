@@ -0,0 +1,76 @@
+"""
+Medición del arranque en frío de la web (app) y del worker (clock)
+
+Importa cada módulo en un proceso nuevo, igual que `gunicorn app:app` y
+`python clock.py`, y mide el tiempo de importación y la memoria residente
+máxima. Termina con código 1 si se supera el presupuesto o si se cargó alguna
+dependencia pesada que debería importarse recién al usarla.
+
+    python medir_arranque.py [app] [clock]
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Presupuesto por proceso
+ARRANQUE_MAX_SEG = float(os.getenv('ARRANQUE_MAX_SEG', 1.5))
+ARRANQUE_MAX_MB = float(os.getenv('ARRANQUE_MAX_MB', 120))
+
+# Se importan al entrenar, cargar un modelo o abrir un navegador
+DEPENDENCIAS_PESADAS = ('sklearn', 'scipy', 'joblib', 'pandas', 'selenium', 'webdriver_manager')
+
+MEDICION = '''
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - inicio
+try:
+    import resource
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if sys.platform == 'darwin':
+        rss_mb /= 1024
+except ImportError:
+    rss_mb = None
+pesadas = [m for m in {pesadas!r} if m in sys.modules]
+print(json.dumps({{'segundos': segundos, 'rss_mb': rss_mb, 'pesadas': pesadas}}))
+'''
+
+
+def medir(modulo):
+    """Importar `modulo` en un intérprete nuevo y devolver la medición"""
+    entorno = dict(os.environ, RUN_SCHEDULER='False')
+    resultado = subprocess.run(
+        [sys.executable, '-c', MEDICION.format(modulo=modulo, pesadas=DEPENDENCIAS_PESADAS)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=entorno,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main(modulos):
+    dentro = True
+    for modulo in modulos:
+        medicion = medir(modulo)
+        rss = medicion['rss_mb']
+        problemas = []
+        if medicion['segundos'] > ARRANQUE_MAX_SEG:
+            problemas.append(f"tiempo > {ARRANQUE_MAX_SEG}s")
+        if rss is not None and rss > ARRANQUE_MAX_MB:
+            problemas.append(f"memoria > {ARRANQUE_MAX_MB} MB")
+        if medicion['pesadas']:
+            problemas.append(f"importó {', '.join(medicion['pesadas'])}")
+
+        texto_rss = f"{rss:.0f} MB" if rss is not None else "memoria no disponible"
+        simbolo = '⚠' if problemas else '✓'
+        print(f"{simbolo} {modulo}: {medicion['segundos']:.2f}s, {texto_rss}"
+              + (f" ({'; '.join(problemas)})" if problemas else ''))
+        dentro = dentro and not problemas
+    return dentro
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:] or ['app', 'clock']) else 1)
@@ -0,0 +1,323 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus
+
+Histogramas de latencia (rutas de Flask, funciones del predictor y etapas del
+scraper), contadores (números ingeridos, respuestas 304, aciertos de la caché,
+reentrenamientos) y medidores (antigüedad del modelo publicado, conexiones del
+pool). Se exponen en /metrics: en la web, como ruta de Flask; en el worker
+(clock.py), con un servidor HTTP propio en METRICAS_PUERTO.
+
+Se activan con METRICAS_ACTIVAS=true. Desactivadas, los decoradores devuelven
+la función original y el resto de las llamadas vuelven de inmediato, así que
+el costo es despreciable.
+
+Los valores son por proceso: con varios workers de gunicorn cada uno expone
+los suyos (Prometheus los distingue por instancia).
+"""
+import os
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', 'False').lower() == 'true'
+# Puerto del servidor de métricas de los procesos sin Flask (clock.py)
+METRICAS_PUERTO = int(os.getenv('METRICAS_PUERTO', 9100))
+
+PREFIJO = 'prediccion_'
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4'
+
+# Límites de los histogramas de latencia, en segundos
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registro = []
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatear_etiquetas(nombres, valores, extra=None):
+    pares = list(zip(nombres, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in pares) + '}'
+
+
+def _formatear_valor(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, descripcion, etiquetas=()):
+        self.nombre = PREFIJO + nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _registro.append(self)
+
+    def _clave(self, etiquetas):
+        return tuple(etiquetas.get(nombre, '') for nombre in self.etiquetas)
+
+    def _muestras(self):
+        """Lista de (sufijo, valores de etiquetas, etiqueta extra, valor)"""
+        with self._lock:
+            return [('', clave, None, valor) for clave, valor in self._valores.items()]
+
+    def exponer(self):
+        lineas = [
+            f'# HELP {self.nombre} {self.descripcion}',
+            f'# TYPE {self.nombre} {self.tipo}',
+        ]
+        for sufijo, clave, extra, valor in self._muestras():
+            lineas.append(
+                f'{self.nombre}{sufijo}{_formatear_etiquetas(self.etiquetas, clave, extra)} '
+                f'{_formatear_valor(valor)}'
+            )
+        return '\n'.join(lineas)
+
+
+class Contador(_Metrica):
+    """Valor que solo aumenta"""
+    tipo = 'counter'
+
+    def incrementar(self, cantidad=1, **etiquetas):
+        if not METRICAS_ACTIVAS:
+            return
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + cantidad
+
+
+class Medidor(_Metrica):
+    """
+    Valor que sube y baja. Con `funcion` se calcula al exponer las métricas:
+    debe devolver un número o un dict {valores de etiquetas: número}.
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nombre, descripcion, etiquetas=(), funcion=None):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.funcion = funcion
+
+    def fijar(self, valor, **etiquetas):
+        if not METRICAS_ACTIVAS:
+            return
+        with self._lock:
+            self._valores[self._clave(etiquetas)] = valor
+
+    def _muestras(self):
+        if self.funcion is None:
+            return super()._muestras()
+        try:
+            valores = self.funcion()
+        except Exception as e:
+            print(f"⚠ Error al calcular {self.nombre}: {e}")
+            return []
+        if valores is None:
+            return []
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        return [
+            ('', clave if isinstance(clave, tuple) else (clave,), None, valor)
+            for clave, valor in valores.items()
+        ]
+
+
+class Histograma(_Metrica):
+    """Distribución de valores en intervalos acumulados (p. ej. latencias)"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, descripcion, etiquetas=(), limites=LIMITES_LATENCIA):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.limites = tuple(limites) + (float('inf'),)
+
+    def observar(self, valor, **etiquetas):
+        if not METRICAS_ACTIVAS:
+            return
+        clave = self._clave(etiquetas)
+        with self._lock:
+            conteos, suma = self._valores.get(clave) or ([0] * len(self.limites), 0.0)
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    conteos[i] += 1
+                    break
+            self._valores[clave] = (conteos, suma + valor)
+
+    def _muestras(self):
+        with self._lock:
+            valores = {clave: (list(conteos), suma) for clave, (conteos, suma) in self._valores.items()}
+        muestras = []
+        for clave, (conteos, suma) in valores.items():
+            acumulado = 0
+            for limite, conteo in zip(self.limites, conteos):
+                acumulado += conteo
+                muestras.append(('_bucket', clave, ('le', _formatear_valor(limite)), acumulado))
+            muestras.append(('_sum', clave, None, suma))
+            muestras.append(('_count', clave, None, acumulado))
+        return muestras
+
+
+class cronometro:
+    """Context manager que observa la duración del bloque en un histograma"""
+
+    def __init__(self, histograma, **etiquetas):
+        self.histograma = histograma
+        self.etiquetas = etiquetas
+        self._inicio = None
+
+    def __enter__(self):
+        if METRICAS_ACTIVAS:
+            self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._inicio is not None:
+            self.histograma.observar(time.perf_counter() - self._inicio, **self.etiquetas)
+        return False
+
+
+def medir_tiempo(histograma, **etiquetas):
+    """Decorador que observa la duración de cada llamada (sin efecto si están desactivadas)"""
+    def decorador(funcion):
+        if not METRICAS_ACTIVAS:
+            return funcion
+
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                histograma.observar(time.perf_counter() - inicio, **etiquetas)
+        return envoltura
+    return decorador
+
+
+def exponer_metricas():
+    """Texto con todas las métricas registradas"""
+    return '\n'.join(metrica.exponer() for metrica in _registro) + '\n'
+
+
+def _antiguedad_modelo():
+    from almacen_modelos import AlmacenModelos
+    return AlmacenModelos().antiguedad_publicado()
+
+
+def _uso_pool():
+    from database import engine
+    pool = engine.pool
+    if not hasattr(pool, 'checkedout'):
+        return None
+    return {
+        'ocupadas': pool.checkedout(),
+        'libres': pool.checkedin(),
+        'desbordadas': max(pool.overflow(), 0),
+    }
+
+
+DURACION_PETICION = Histograma(
+    'peticion_duracion_segundos', 'Duración de las peticiones HTTP por ruta',
+    etiquetas=('ruta', 'metodo')
+)
+PETICIONES = Contador(
+    'peticiones_total', 'Peticiones HTTP atendidas por ruta y estado',
+    etiquetas=('ruta', 'metodo', 'estado')
+)
+DURACION_FUNCION = Histograma(
+    'funcion_duracion_segundos', 'Duración de las funciones del predictor',
+    etiquetas=('funcion',)
+)
+DURACION_SCRAPING = Histograma(
+    'scraping_duracion_segundos', 'Duración de cada etapa del scraping',
+    etiquetas=('etapa',)
+)
+NUMEROS_INGERIDOS = Contador(
+    'numeros_ingeridos_total', 'Números nuevos insertados en la base de datos'
+)
+RESPUESTAS_NO_MODIFICADO = Contador(
+    'scraping_no_modificado_total', 'Descargas respondidas con 304 Not Modified'
+)
+CACHE_CONSULTAS = Contador(
+    'cache_consultas_total', 'Consultas a la caché de respuestas',
+    etiquetas=('prefijo', 'resultado')
+)
+REENTRENAMIENTOS = Contador(
+    'reentrenamientos_total', 'Modelos de ML entrenados'
+)
+ACTUALIZACIONES_INCREMENTALES = Contador(
+    'actualizaciones_incrementales_total', 'Modelos de ML actualizados solo con los números recientes'
+)
+ANTIGUEDAD_MODELO = Medidor(
+    'modelo_antiguedad_segundos', 'Segundos desde la publicación del modelo vigente',
+    funcion=_antiguedad_modelo
+)
+CONEXIONES_POOL = Medidor(
+    'pool_conexiones', 'Conexiones del pool de la base de datos',
+    etiquetas=('estado',), funcion=_uso_pool
+)
+
+
+def instrumentar_app(app):
+    """Medir cada ruta de Flask y registrar /metrics (solo si están activas)"""
+    if not METRICAS_ACTIVAS:
+        return
+
+    from flask import Response, g, request
+
+    @app.before_request
+    def _iniciar_cronometro():
+        g.inicio_peticion = time.perf_counter()
+
+    @app.after_request
+    def _registrar_peticion(respuesta):
+        inicio = g.pop('inicio_peticion', None)
+        if inicio is not None:
+            ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+            DURACION_PETICION.observar(time.perf_counter() - inicio, ruta=ruta, metodo=request.method)
+            PETICIONES.incrementar(ruta=ruta, metodo=request.method, estado=respuesta.status_code)
+        return respuesta
+
+    @app.route('/metrics')
+    def metricas():
+        return Response(exponer_metricas(), mimetype=TIPO_CONTENIDO)
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        cuerpo = exponer_metricas().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', f'{TIPO_CONTENIDO}; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        # Sin una línea de log por cada scrape de Prometheus
+        pass
+
+
+def iniciar_servidor_metricas(puerto=METRICAS_PUERTO, host='0.0.0.0'):
+    """
+    Exponer /metrics en un hilo aparte, para procesos sin Flask (clock.py)
+
+    Returns:
+        El servidor, o None si las métricas están desactivadas
+    """
+    if not METRICAS_ACTIVAS:
+        return None
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='servidor-metricas', daemon=True).start()
+    return servidor
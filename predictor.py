@@ -1,50 +1,98 @@
 """
 Sistema de predicción de números usando análisis estadístico y Machine Learning
+
+scikit-learn se importa al entrenar o al cargar un modelo, no al importar el
+módulo: la web y el worker arrancan sin él.
 """
+import copy
 import numpy as np
-import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from collections import Counter
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from datetime import datetime, timedelta
-from database import get_session, NumeroExtraido, Prediccion
+import os
+from datetime import datetime
+from sqlalchemy import exists, func, select, update
+from database import engine, get_session, NumeroExtraido, Prediccion
+from almacen_modelos import AlmacenModelos
+from resumen_predicciones import evaluar_resumen, sumar_nueva, sumar_resueltas
+from estadisticas import obtener_estadisticas
+from historial import cargar_historial
+from metricas import medir_tiempo, DURACION_FUNCION, REENTRENAMIENTOS, ACTUALIZACIONES_INCREMENTALES
 import warnings
 warnings.filterwarnings('ignore')
 
 
+# Hiperparámetros por defecto del Random Forest
+HIPERPARAMETROS_ML = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'random_state': 42,
+}
+
+# Núcleos usados al entrenar (-1: todos). No forma parte de la clave del modelo
+ML_N_JOBS = int(os.getenv('ML_N_JOBS', -1))
+
+# Fracción final del historial (la más reciente) que se reserva para validar
+FRACCION_VALIDACION = 0.2
+
+# Actualización incremental tras cada ingesta: se agregan árboles entrenados
+# con los números recientes y se descartan los más antiguos
+ML_INCREMENTAL = os.getenv('ML_INCREMENTAL', 'True').lower() == 'true'
+ML_ARBOLES_INCREMENTO = int(os.getenv('ML_ARBOLES_INCREMENTO', 10))
+# Ejemplos (los más recientes) con los que se entrenan los árboles nuevos
+ML_EJEMPLOS_INCREMENTO = int(os.getenv('ML_EJEMPLOS_INCREMENTO', 500))
+# Actualizaciones seguidas antes de volver a entrenar con todo el historial
+ML_MAX_ACTUALIZACIONES = int(os.getenv('ML_MAX_ACTUALIZACIONES', 48))
+
+
 class PredictorNumeros:
     """Clase para predecir el próximo número basado en datos históricos"""
     
-    def __init__(self, min_samples=50):
+    def __init__(self, min_samples=50, ventana=10, hiperparametros=None, almacen=None):
         self.min_samples = min_samples
+        self.ventana = ventana
+        self.hiperparametros = dict(hiperparametros or HIPERPARAMETROS_ML)
+        self.almacen = almacen or AlmacenModelos()
         self.modelo_ml = None
-        self.scaler = StandardScaler()
+        self.version_modelo = None
+        self.score_ml = None
+        self.scaler = None
         
-    def obtener_datos_historicos(self, limite=1000):
-        """Obtener datos históricos de la base de datos"""
+    def obtener_version_datos(self):
+        """Obtener la versión de los datos (id del último número extraído)"""
         session = get_session()
         try:
-            registros = session.query(NumeroExtraido)\
-                .order_by(NumeroExtraido.fecha_extraccion.desc())\
-                .limit(limite)\
-                .all()
-            
-            numeros = [r.numero for r in reversed(registros)]
-            fechas = [r.fecha_extraccion for r in reversed(registros)]
-            
-            return numeros, fechas
-            
+            return session.query(func.max(NumeroExtraido.id)).scalar() or 0
         finally:
             session.close()
     
-    def analisis_estadistico(self, numeros):
+    @medir_tiempo(DURACION_FUNCION, funcion='obtener_datos_historicos')
+    def obtener_datos_historicos(self, limite=1000):
+        """
+        Obtener datos históricos de la base de datos
+        
+        Returns:
+            (numeros, fechas) como arreglos de NumPy (int64 y datetime64),
+            en orden cronológico
+        """
+        return cargar_historial(limite)
+    
+    def analisis_estadistico(self, numeros=None):
         """
         Realizar análisis estadístico de los números
         
+        Args:
+            numeros: Lista de números a analizar. Si se omite, se devuelven las
+                estadísticas incrementales de todo el historial (sin recorrerlo).
+        
         Returns:
             dict con estadísticas y predicciones básicas
         """
+        if numeros is None:
+            return obtener_estadisticas(self.min_samples)
+        
+        # Valores de Python en el resultado (se serializa a JSON)
+        numeros = np.asarray(numeros).tolist()
+        
         if len(numeros) < self.min_samples:
             return {
                 'error': f'Se necesitan al menos {self.min_samples} muestras. Actualmente: {len(numeros)}'
@@ -103,6 +151,26 @@ class PredictorNumeros:
             'porcentaje_impares': (impares / len(numeros)) * 100,
         }
     
+    @staticmethod
+    def features_de_ventanas(ventanas):
+        """
+        Calcular las features de una matriz de ventanas (una ventana por fila)
+        
+        Returns:
+            Matriz con los N números de cada ventana seguidos de media,
+            desviación estándar, máximo, mínimo y cantidad de pares
+        """
+        ventanas = np.asarray(ventanas)
+        return np.column_stack([
+            ventanas,
+            ventanas.mean(axis=1),
+            ventanas.std(axis=1),
+            ventanas.max(axis=1),
+            ventanas.min(axis=1),
+            np.count_nonzero(ventanas % 2 == 0, axis=1),  # Cantidad de pares
+        ])
+    
+    @medir_tiempo(DURACION_FUNCION, funcion='crear_features')
     def crear_features(self, numeros, ventana=10):
         """
         Crear características para el modelo de ML
@@ -114,29 +182,23 @@ class PredictorNumeros:
         Returns:
             X (features), y (targets)
         """
-        X = []
-        y = []
-        
-        for i in range(ventana, len(numeros)):
-            # Features: últimos N números
-            features = numeros[i-ventana:i]
-            
-            # Features adicionales
-            features_extra = [
-                np.mean(features),
-                np.std(features),
-                max(features),
-                min(features),
-                sum(1 for n in features if n % 2 == 0),  # Cantidad de pares
-            ]
-            
-            X.append(features + features_extra)
-            y.append(numeros[i])
+        numeros = np.asarray(numeros)
+        if len(numeros) <= ventana:
+            return np.empty((0, ventana + 5)), np.empty(0, dtype=numeros.dtype)
         
-        return np.array(X), np.array(y)
+        # Vista sin copia: la fila i contiene numeros[i:i+ventana]
+        ventanas = sliding_window_view(numeros[:-1], ventana)
+        return self.features_de_ventanas(ventanas), numeros[ventana:]
     
-    def entrenar_modelo_ml(self, numeros, ventana=10):
+    def features_prediccion(self, numeros, ventana=10):
+        """Crear las features de la última ventana para predecir el próximo número"""
+        ultimos = np.asarray(numeros[-ventana:])
+        return self.features_de_ventanas(ultimos[np.newaxis, :])
+    
+    @medir_tiempo(DURACION_FUNCION, funcion='entrenar_modelo_ml')
+    def entrenar_modelo_ml(self, numeros, ventana=None):
         """Entrenar un modelo de Machine Learning"""
+        ventana = ventana or self.ventana
         if len(numeros) < self.min_samples:
             return False
         
@@ -146,39 +208,166 @@ class PredictorNumeros:
             print("⚠ Datos insuficientes para entrenar el modelo ML")
             return False
         
-        # Dividir en train/test
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.preprocessing import StandardScaler
         
-        # Escalar features
+        # Dividir en train/test respetando el orden temporal: se valida con
+        # los números más recientes, como se usará el modelo
+        corte = int(len(X) * (1 - FRACCION_VALIDACION))
+        X_train, X_test = X[:corte], X[corte:]
+        y_train, y_test = y[:corte], y[corte:]
+        
+        # Escalar features (scaler nuevo: el anterior puede estar compartido en caché)
+        self.scaler = StandardScaler()
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
-        # Entrenar Random Forest
-        self.modelo_ml = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
+        # Entrenar Random Forest con todos los núcleos
+        parametros = {'n_jobs': ML_N_JOBS, **self.hiperparametros}
+        self.modelo_ml = RandomForestClassifier(**parametros)
         self.modelo_ml.fit(X_train_scaled, y_train)
+        REENTRENAMIENTOS.incrementar()
         
         # Evaluar
         score = self.modelo_ml.score(X_test_scaled, y_test)
+        self.score_ml = score
         print(f"✓ Modelo entrenado. Precisión: {score:.2%}")
         
+        # La web predice de a una fila: sin hilos de joblib en cada predicción
+        self.modelo_ml.set_params(n_jobs=1)
+        
+        return True
+    
+    @medir_tiempo(DURACION_FUNCION, funcion='actualizar_modelo_ml')
+    def actualizar_modelo_ml(self, numeros, arboles=None, semilla=None):
+        """
+        Actualizar el modelo cargado con los números recientes, sin entrenar
+        con todo el historial
+        
+        Se agregan `arboles` árboles entrenados con las ventanas de `numeros`
+        (warm start) y se descartan los más antiguos, así el bosque mantiene
+        n_estimators árboles. El scaler no se vuelve a ajustar.
+        
+        Args:
+            numeros: Números más recientes, en orden cronológico
+            semilla: random_state de los árboles nuevos (con la misma semilla
+                cada actualización repetiría los mismos sorteos)
+        
+        Returns:
+            True si se actualizó; False si hace falta un entrenamiento completo
+        """
+        arboles = arboles or ML_ARBOLES_INCREMENTO
+        if self.modelo_ml is None:
+            return False
+        
+        X, y = self.crear_features(numeros, self.ventana)
+        if len(X) == 0:
+            return False
+        
+        clases = self.modelo_ml.classes_
+        if not np.isin(y, clases).all():
+            # Un número que el modelo nunca vio: los árboles anteriores no lo conocen
+            return False
+        
+        # Una fila de peso cero por clase: los árboles nuevos quedan con las
+        # mismas clases (y en el mismo orden) que los anteriores
+        X = np.vstack([X, np.repeat(X[-1:], len(clases), axis=0)])
+        pesos = np.concatenate([np.ones(len(y)), np.zeros(len(clases))])
+        y = np.concatenate([y, clases])
+        
+        # Copia: el modelo anterior puede estar compartido en caché
+        modelo = copy.copy(self.modelo_ml)
+        modelo.estimators_ = list(self.modelo_ml.estimators_)
+        modelo.set_params(
+            warm_start=True,
+            n_estimators=len(modelo.estimators_) + arboles,
+            n_jobs=ML_N_JOBS,
+            random_state=semilla,
+        )
+        modelo.fit(self.scaler.transform(X), y, sample_weight=pesos)
+        
+        # Poda: se descartan los árboles más antiguos
+        sobrantes = len(modelo.estimators_) - self.hiperparametros.get('n_estimators', 100)
+        if sobrantes > 0:
+            del modelo.estimators_[:sobrantes]
+        modelo.set_params(
+            warm_start=False,
+            n_estimators=len(modelo.estimators_),
+            n_jobs=1,
+            random_state=self.hiperparametros.get('random_state'),
+        )
+        
+        self.modelo_ml = modelo
+        ACTUALIZACIONES_INCREMENTALES.incrementar()
+        print(f"✓ Modelo actualizado con {len(X) - len(clases)} ejemplos recientes ({arboles} árboles nuevos)")
         return True
     
-    def predecir_proximo_numero(self, metodo='combinado'):
+    def cargar_o_entrenar_modelo(self, numeros, ultimo_id=None):
+        """
+        Cargar el modelo correspondiente a la versión actual de los datos.
+        Solo se reentrena (y se guarda en el almacén) si no existe.
+        """
+        if ultimo_id is None:
+            ultimo_id = self.obtener_version_datos()
+        clave = self.almacen.clave(ultimo_id, self.ventana, self.hiperparametros)
+        
+        guardado = self.almacen.cargar(clave)
+        if guardado:
+            self._usar_modelo(clave, guardado)
+            return True
+        
+        if not self.entrenar_modelo_ml(numeros):
+            return False
+        
+        try:
+            self.almacen.guardar(clave, self.modelo_ml, self.scaler, {
+                'ultimo_id': ultimo_id,
+                'ventana': self.ventana,
+                'hiperparametros': self.hiperparametros,
+                'precision': self.score_ml,
+                'fecha_entrenamiento': datetime.utcnow().isoformat(),
+            })
+        except Exception as e:
+            print(f"⚠ No se pudo guardar el modelo: {e}")
+        
+        self.version_modelo = clave
+        return True
+    
+    def cargar_modelo_publicado(self):
+        """Cargar el modelo publicado por el proceso de entrenamiento"""
+        clave, contenido = self.almacen.cargar_publicado()
+        if contenido is None:
+            return False
+        
+        self._usar_modelo(clave, contenido)
+        return True
+    
+    def _usar_modelo(self, clave, contenido):
+        """Tomar un modelo del almacén, con la ventana con la que se entrenó"""
+        self.modelo_ml = contenido['modelo']
+        self.scaler = contenido['scaler']
+        self.ventana = contenido.get('metadatos', {}).get('ventana', self.ventana)
+        self.version_modelo = clave
+    
+    @medir_tiempo(DURACION_FUNCION, funcion='predecir_proximo_numero')
+    def predecir_proximo_numero(self, metodo='combinado', entrenar_si_falta=False):
         """
         Predecir el próximo número
         
         Args:
             metodo: 'estadistico', 'ml', o 'combinado'
+            entrenar_si_falta: Entrenar en el momento si no hay modelo publicado
+                (solo para scripts). Por defecto se deja la solicitud al worker
+                y se responde sin la predicción ML: con metodo='ml' se devuelve
+                la predicción 'estadistico' en su lugar.
             
         Returns:
-            dict con predicción y confianza
+            dict con predicción y confianza por método (las claves son los
+            métodos realmente usados)
         """
+        # La versión se lee antes que los datos: el modelo nunca queda
+        # etiquetado con una versión más nueva que la de su entrenamiento
+        ultimo_id = self.obtener_version_datos() if entrenar_si_falta else None
         numeros, fechas = self.obtener_datos_historicos()
         
         if len(numeros) < self.min_samples:
@@ -191,33 +380,20 @@ class PredictorNumeros:
         
         # Método estadístico: número más frecuente reciente
         if metodo in ['estadistico', 'combinado']:
-            numeros_recientes = numeros[-50:]
-            frecuencias = Counter(numeros_recientes)
-            prediccion_estadistica = frecuencias.most_common(1)[0][0]
-            confianza_estadistica = frecuencias.most_common(1)[0][1] / len(numeros_recientes)
-            
-            predicciones['estadistico'] = {
-                'numero': prediccion_estadistica,
-                'confianza': confianza_estadistica,
-                'metodo': 'Análisis de frecuencias'
-            }
+            predicciones['estadistico'] = self._prediccion_estadistica(numeros)
         
-        # Método Machine Learning
+        # Método Machine Learning: se sirve el último modelo publicado,
+        # aunque haya un reentrenamiento en curso
         if metodo in ['ml', 'combinado']:
-            if self.modelo_ml is None:
-                self.entrenar_modelo_ml(numeros)
+            if self.modelo_ml is None and not self.cargar_modelo_publicado():
+                if entrenar_si_falta:
+                    if self.cargar_o_entrenar_modelo(numeros, ultimo_id):
+                        self.almacen.publicar(self.version_modelo)
+                else:
+                    solicitar_reentrenamiento()
             
             if self.modelo_ml:
-                ventana = 10
-                ultimos = numeros[-ventana:]
-                features_extra = [
-                    np.mean(ultimos),
-                    np.std(ultimos),
-                    max(ultimos),
-                    min(ultimos),
-                    sum(1 for n in ultimos if n % 2 == 0),
-                ]
-                X_pred = np.array([ultimos + features_extra])
+                X_pred = self.features_prediccion(numeros, self.ventana)
                 X_pred_scaled = self.scaler.transform(X_pred)
                 
                 prediccion_ml = self.modelo_ml.predict(X_pred_scaled)[0]
@@ -227,31 +403,53 @@ class PredictorNumeros:
                 predicciones['ml'] = {
                     'numero': int(prediccion_ml),
                     'confianza': float(confianza_ml),
-                    'metodo': 'Random Forest'
+                    'metodo': 'Random Forest',
+                    'version_modelo': self.version_modelo
                 }
+            elif metodo == 'ml':
+                # Modelo pendiente: se responde con la predicción estadística
+                predicciones['estadistico'] = self._prediccion_estadistica(numeros)
         
+        if metodo == 'combinado':
             # En lugar de promediar números (que no tiene sentido para lotería),
             # usamos el que tenga mayor confianza o una combinación lógica
             pred_est = predicciones['estadistico']
-            pred_ml = predicciones['ml']
+            pred_ml = predicciones.get('ml')
             
-            if pred_ml['confianza'] >= pred_est['confianza']:
-                mejor_pred = pred_ml
-            else:
-                mejor_pred = pred_est
+            candidatos = [
+                {'numero': pred_est['numero'], 'confianza': pred_est['confianza'], 'tipo': 'Estadístico'}
+            ]
+            mejor_pred = pred_est
+            if pred_ml:
+                candidatos.append(
+                    {'numero': pred_ml['numero'], 'confianza': pred_ml['confianza'], 'tipo': 'ML'}
+                )
+                if pred_ml['confianza'] >= pred_est['confianza']:
+                    mejor_pred = pred_ml
                 
             predicciones['combinado'] = {
                 'numero': mejor_pred['numero'],
-                'confianza': max(pred_est['confianza'], pred_ml['confianza']),
+                'confianza': mejor_pred['confianza'],
                 'metodo': f"Optimizado ({mejor_pred['metodo']})",
-                'candidatos': [
-                    {'numero': pred_est['numero'], 'confianza': pred_est['confianza'], 'tipo': 'Estadístico'},
-                    {'numero': pred_ml['numero'], 'confianza': pred_ml['confianza'], 'tipo': 'ML'}
-                ]
+                'candidatos': candidatos
             }
         
         return predicciones
     
+    @staticmethod
+    def _prediccion_estadistica(numeros):
+        """Número más frecuente entre los últimos 50"""
+        numeros_recientes = numeros[-50:].tolist()
+        frecuencias = Counter(numeros_recientes)
+        prediccion_estadistica = frecuencias.most_common(1)[0][0]
+        confianza_estadistica = frecuencias.most_common(1)[0][1] / len(numeros_recientes)
+        
+        return {
+            'numero': prediccion_estadistica,
+            'confianza': confianza_estadistica,
+            'metodo': 'Análisis de frecuencias'
+        }
+    
     def guardar_prediccion(self, numero_predicho, confianza, metodo='combinado'):
         """Guardar una predicción en la base de datos"""
         session = get_session()
@@ -263,6 +461,8 @@ class PredictorNumeros:
                 fecha_prediccion=datetime.utcnow()
             )
             session.add(nueva_prediccion)
+            session.flush()
+            sumar_nueva(session.connection(), nueva_prediccion.fecha_prediccion, metodo)
             session.commit()
             print(f"✓ Predicción guardada: {numero_predicho} (confianza: {confianza:.2%})")
             return True
@@ -275,29 +475,195 @@ class PredictorNumeros:
             session.close()
     
     def evaluar_predicciones(self, dias=7):
-        """Evaluar la precisión de predicciones pasadas"""
-        session = get_session()
-        try:
-            fecha_inicio = datetime.utcnow() - timedelta(days=dias)
-            predicciones = session.query(Prediccion)\
-                .filter(Prediccion.fecha_prediccion >= fecha_inicio)\
-                .all()
-            
-            total = len(predicciones)
-            if total == 0:
-                return {'mensaje': 'No hay predicciones para evaluar'}
-            
-            acertadas = sum(1 for p in predicciones if p.acertado == True)
-            
-            return {
-                'total_predicciones': total,
-                'acertadas': acertadas,
-                'precision': acertadas / total if total > 0 else 0,
-                'periodo_dias': dias
-            }
-            
-        finally:
-            session.close()
+        """
+        Evaluar la precisión de predicciones pasadas (por días completos)
+        
+        Los conteos salen del resumen por día y método, sin cargar predicciones.
+        """
+        evaluacion = evaluar_resumen(dias)
+        if evaluacion['total_predicciones'] == 0:
+            return {'mensaje': 'No hay predicciones para evaluar'}
+        
+        evaluacion['periodo_dias'] = dias
+        return evaluacion
+
+
+def resolver_predicciones():
+    """
+    Completar numero_real y acertado de las predicciones pendientes con el
+    primer número extraído después de cada fecha_prediccion.
+    
+    Se hace con un UPDATE sobre todo el conjunto (subconsulta correlacionada),
+    sin cargar predicciones en Python. El RETURNING devuelve solo las filas
+    que esta transacción resolvió, y eso es lo que se suma al resumen.
+    
+    Returns:
+        Cantidad de predicciones resueltas
+    """
+    siguiente_numero = select(NumeroExtraido.numero)\
+        .where(NumeroExtraido.fecha_extraccion > Prediccion.fecha_prediccion)\
+        .order_by(NumeroExtraido.fecha_extraccion, NumeroExtraido.id)\
+        .limit(1)\
+        .correlate(Prediccion)\
+        .scalar_subquery()
+    hay_numero_posterior = exists()\
+        .where(NumeroExtraido.fecha_extraccion > Prediccion.fecha_prediccion)\
+        .correlate(Prediccion)
+    
+    columnas = (Prediccion.fecha_prediccion, Prediccion.modelo_usado, Prediccion.acertado)
+    with engine.begin() as conn:
+        filas = conn.execute(
+            update(Prediccion)
+            .where(Prediccion.numero_real.is_(None), hay_numero_posterior)
+            .values(
+                numero_real=siguiente_numero,
+                acertado=siguiente_numero == Prediccion.numero_predicho
+            )
+            .returning(*columnas)
+        ).all()
+        # Filas antiguas con numero_real cargado pero sin acertado
+        filas += conn.execute(
+            update(Prediccion)
+            .where(Prediccion.acertado.is_(None), Prediccion.numero_real.isnot(None))
+            .values(acertado=Prediccion.numero_real == Prediccion.numero_predicho)
+            .returning(*columnas)
+        ).all()
+        sumar_resueltas(conn, filas)
+    
+    resueltas = len(filas)
+    if resueltas:
+        print(f"✓ {resueltas} predicciones resueltas")
+    return resueltas
+
+
+def reentrenar_y_publicar(almacen=None):
+    """
+    Entrenar el modelo con los datos actuales y publicarlo como vigente.
+    Pensado para ejecutarse fuera de las peticiones web (clock.py / scheduler).
+    
+    Returns:
+        Clave del modelo publicado o None si no se pudo entrenar
+    """
+    almacen = almacen or AlmacenModelos()
+    # Se entrena con la configuración ganadora de la última búsqueda, si hay
+    configuracion = almacen.cargar_configuracion() or {}
+    predictor = PredictorNumeros(
+        almacen=almacen,
+        ventana=configuracion.get('ventana', 10),
+        hiperparametros=configuracion.get('hiperparametros')
+    )
+    ultimo_id = predictor.obtener_version_datos()
+    numeros, _ = predictor.obtener_datos_historicos()
+    
+    if len(numeros) < predictor.min_samples:
+        print(f"⚠ Datos insuficientes para entrenar: {len(numeros)}")
+        return None
+    
+    if not predictor.cargar_o_entrenar_modelo(numeros, ultimo_id):
+        return None
+    
+    if predictor.almacen.clave_publicada() != predictor.version_modelo:
+        predictor.almacen.publicar(predictor.version_modelo)
+    return predictor.version_modelo
+
+
+def actualizar_y_publicar(almacen=None):
+    """
+    Poner al día el modelo publicado con los números nuevos y publicarlo.
+    
+    Si el modelo publicado se puede actualizar de forma incremental (ver
+    PredictorNumeros.actualizar_modelo_ml) solo se entrenan unos pocos árboles
+    con los números recientes; si no, se reentrena con todo el historial
+    (reentrenar_y_publicar). Se reentrena completo cuando:
+    
+        - no hay modelo publicado o la actualización incremental está desactivada
+        - la búsqueda de hiperparámetros registró otra configuración
+        - ya se encadenaron ML_MAX_ACTUALIZACIONES actualizaciones
+        - llegaron más números nuevos que ML_EJEMPLOS_INCREMENTO
+        - los números nuevos son anteriores a los del modelo (carga de históricos)
+        - aparece un número que el modelo nunca vio
+    
+    Returns:
+        Clave del modelo publicado o None si no se pudo entrenar
+    """
+    almacen = almacen or AlmacenModelos()
+    if not ML_INCREMENTAL:
+        return reentrenar_y_publicar(almacen)
+    
+    clave, contenido = almacen.cargar_publicado()
+    if contenido is None:
+        return reentrenar_y_publicar(almacen)
+    
+    metadatos = contenido.get('metadatos', {})
+    ventana = metadatos.get('ventana', 10)
+    hiperparametros = metadatos.get('hiperparametros') or HIPERPARAMETROS_ML
+    actualizaciones = metadatos.get('actualizaciones', 0)
+    ultimo_id_modelo = metadatos.get('ultimo_id', 0)
+    
+    configuracion = almacen.cargar_configuracion()
+    if configuracion and (
+        configuracion.get('ventana') != ventana or
+        configuracion.get('hiperparametros') != hiperparametros
+    ):
+        return reentrenar_y_publicar(almacen)
+    if actualizaciones >= ML_MAX_ACTUALIZACIONES:
+        return reentrenar_y_publicar(almacen)
+    
+    predictor = PredictorNumeros(almacen=almacen, ventana=ventana, hiperparametros=hiperparametros)
+    ultimo_id = predictor.obtener_version_datos()
+    
+    with engine.connect() as conn:
+        nuevos, primera_fecha = conn.execute(
+            select(func.count(), func.min(NumeroExtraido.fecha_extraccion))
+            .where(NumeroExtraido.id > ultimo_id_modelo, NumeroExtraido.id <= ultimo_id)
+        ).one()
+        ultima_fecha_modelo = conn.execute(
+            select(NumeroExtraido.fecha_extraccion)
+            .where(NumeroExtraido.id <= ultimo_id_modelo)
+            .order_by(NumeroExtraido.fecha_extraccion.desc())
+            .limit(1)
+        ).scalar()
+    
+    if nuevos == 0:
+        return clave
+    if nuevos > ML_EJEMPLOS_INCREMENTO or (
+        ultima_fecha_modelo is not None and primera_fecha < ultima_fecha_modelo
+    ):
+        return reentrenar_y_publicar(almacen)
+    
+    # Ventanas de los últimos ML_EJEMPLOS_INCREMENTO números (incluye los nuevos)
+    numeros, _ = predictor.obtener_datos_historicos(limite=ML_EJEMPLOS_INCREMENTO + ventana)
+    predictor._usar_modelo(clave, contenido)
+    if not predictor.actualizar_modelo_ml(numeros, semilla=ultimo_id):
+        return reentrenar_y_publicar(almacen)
+    
+    # Clave propia: reentrenar_y_publicar con los mismos datos no la confunde
+    # con un modelo entrenado con todo el historial
+    actualizaciones += 1
+    nueva_clave = f"{almacen.clave(ultimo_id, ventana, hiperparametros)}-i{actualizaciones}"
+    almacen.guardar(nueva_clave, predictor.modelo_ml, predictor.scaler, {
+        **metadatos,
+        'ultimo_id': ultimo_id,
+        'actualizaciones': actualizaciones,
+        'fecha_actualizacion': datetime.utcnow().isoformat(),
+    })
+    almacen.publicar(nueva_clave)
+    return nueva_clave
+
+
+def solicitar_reentrenamiento(almacen=None):
+    """
+    Pedir una actualización del modelo sin entrenar en este proceso.
+    
+    La web solo carga y sirve modelos: deja la solicitud en el almacén y el
+    worker (clock.py o el scheduler integrado) la atiende en su próxima
+    revisión con actualizar_y_publicar. Varias solicitudes seguidas cuentan
+    como una.
+    
+    Returns:
+        True si se dejó una solicitud nueva
+    """
+    return (almacen or AlmacenModelos()).solicitar_entrenamiento()
 
 
 if __name__ == "__main__":
@@ -319,7 +685,7 @@ if __name__ == "__main__":
         
         # Hacer predicción
         print("🔮 Generando predicción...\n")
-        predicciones = predictor.predecir_proximo_numero(metodo='combinado')
+        predicciones = predictor.predecir_proximo_numero(metodo='combinado', entrenar_si_falta=True)
         
         for metodo, pred in predicciones.items():
             if 'error' not in pred:
@@ -0,0 +1,204 @@
+"""
+Resumen de predicciones por día y método
+
+La tabla resumen_predicciones guarda, para cada (día, modelo_usado), cuántas
+predicciones hubo, cuántas se resolvieron y cuántas acertaron. Se mantiene al
+escribir: al guardar una predicción y al resolverlas se suman, en la misma
+transacción, solo las filas que esa transacción modificó. Los incrementos
+(total = total + excluded.total) no se pisan entre transacciones
+concurrentes, a diferencia de recalcular el día y sobrescribirlo. Así la
+página principal y la evaluación de precisión leen unas pocas filas en vez
+de la tabla completa.
+
+Con RESUMEN_PREDICCIONES=false las consultas agregan directamente sobre la
+tabla de predicciones (mismo resultado, sin la tabla de resumen).
+"""
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, case, delete, func, select, update
+
+from database import engine, Prediccion, ResumenPrediccion
+from estadisticas import _insert_dialecto
+
+RESUMEN_PREDICCIONES = os.getenv('RESUMEN_PREDICCIONES', 'True').lower() == 'true'
+
+
+def _consulta_agregada(desde=None):
+    """SELECT (dia, modelo_usado, total, resueltas, acertadas) sobre predicciones"""
+    dia = func.date(Prediccion.fecha_prediccion, type_=Date)
+    modelo = func.coalesce(Prediccion.modelo_usado, '')
+    consulta = select(
+        dia.label('dia'),
+        modelo.label('modelo_usado'),
+        func.count(Prediccion.id).label('total'),
+        func.count(Prediccion.acertado).label('resueltas'),
+        func.coalesce(func.sum(case((Prediccion.acertado == True, 1), else_=0)), 0).label('acertadas'),
+    ).group_by(dia, modelo)
+    if desde is not None:
+        consulta = consulta.where(Prediccion.fecha_prediccion >= desde)
+    return consulta
+
+
+def _clave(fecha_prediccion, modelo_usado):
+    if isinstance(fecha_prediccion, datetime):
+        fecha_prediccion = fecha_prediccion.date()
+    return fecha_prediccion, modelo_usado or ''
+
+
+def sumar_nueva(conn, fecha_prediccion, modelo_usado):
+    """Sumar una predicción recién guardada al resumen"""
+    dia, modelo = _clave(fecha_prediccion, modelo_usado)
+    sumar_resumen(conn, [{'dia': dia, 'modelo_usado': modelo, 'total': 1, 'resueltas': 0, 'acertadas': 0}])
+
+
+def sumar_resueltas(conn, resueltas):
+    """
+    Sumar al resumen las predicciones que una transacción acaba de resolver
+
+    Args:
+        conn: Conexión dentro de la transacción que las resolvió
+        resueltas: Filas (fecha_prediccion, modelo_usado, acertado) devueltas
+            por el UPDATE ... RETURNING. Las que quedan con acertado NULL no
+            cuentan como resueltas (igual que COUNT(acertado)).
+    """
+    incrementos = {}
+    for fecha_prediccion, modelo_usado, acertado in resueltas:
+        if acertado is None:
+            continue
+        conteos = incrementos.setdefault(_clave(fecha_prediccion, modelo_usado), [0, 0])
+        conteos[0] += 1
+        conteos[1] += int(bool(acertado))
+
+    sumar_resumen(conn, [
+        {'dia': dia, 'modelo_usado': modelo, 'total': 0, 'resueltas': resueltas, 'acertadas': acertadas}
+        for (dia, modelo), (resueltas, acertadas) in incrementos.items()
+    ])
+
+
+def sumar_resumen(conn, filas):
+    """
+    Sumar conteos al resumen (INSERT ... ON CONFLICT DO UPDATE con incrementos)
+
+    Args:
+        conn: Conexión dentro de la transacción que modificó las predicciones
+        filas: dicts {dia, modelo_usado, total, resueltas, acertadas} con los
+            conteos a sumar
+    """
+    if not RESUMEN_PREDICCIONES or not filas:
+        return
+    tabla = ResumenPrediccion.__table__
+
+    insercion = _insert_dialecto(tabla)
+    if insercion is not None:
+        conn.execute(
+            insercion.on_conflict_do_update(
+                index_elements=['dia', 'modelo_usado'],
+                set_={
+                    'total': tabla.c.total + insercion.excluded.total,
+                    'resueltas': tabla.c.resueltas + insercion.excluded.resueltas,
+                    'acertadas': tabla.c.acertadas + insercion.excluded.acertadas,
+                }
+            ),
+            filas
+        )
+        return
+
+    for fila in filas:
+        resultado = conn.execute(
+            update(tabla)
+            .where(tabla.c.dia == fila['dia'], tabla.c.modelo_usado == fila['modelo_usado'])
+            .values(
+                total=tabla.c.total + fila['total'],
+                resueltas=tabla.c.resueltas + fila['resueltas'],
+                acertadas=tabla.c.acertadas + fila['acertadas'],
+            )
+        )
+        if resultado.rowcount == 0:
+            conn.execute(tabla.insert().values(**fila))
+
+
+def reconstruir_resumen():
+    """Borrar el resumen y recalcularlo desde todas las predicciones"""
+    tabla = ResumenPrediccion.__table__
+    with engine.begin() as conn:
+        conn.execute(delete(tabla))
+        filas = [dict(fila) for fila in conn.execute(_consulta_agregada()).mappings()]
+        if filas:
+            conn.execute(tabla.insert(), filas)
+
+
+def resumen_predicciones(desde=None):
+    """
+    Conteos de predicciones por día y método
+
+    Args:
+        desde: Primer día incluido (date/datetime) o None para todo el historial
+
+    Returns:
+        Lista de dicts {dia, modelo_usado, total, resueltas, acertadas}
+    """
+    if isinstance(desde, datetime):
+        desde = desde.date()
+
+    with engine.connect() as conn:
+        if RESUMEN_PREDICCIONES:
+            consulta = select(ResumenPrediccion.__table__)
+            if desde is not None:
+                consulta = consulta.where(ResumenPrediccion.dia >= desde)
+        else:
+            consulta = _consulta_agregada(
+                datetime.combine(desde, datetime.min.time()) if desde else None
+            )
+        filas = conn.execute(consulta).mappings().all()
+
+    return [dict(fila) for fila in filas]
+
+
+def _precision(acertadas, resueltas):
+    return acertadas / resueltas if resueltas > 0 else 0
+
+
+def evaluar_resumen(dias=7):
+    """
+    Precisión de las predicciones de los últimos `dias` días
+
+    Returns:
+        dict con los totales, el detalle por método y por día
+    """
+    filas = resumen_predicciones(datetime.utcnow().date() - timedelta(days=dias))
+
+    por_modelo = {}
+    por_dia = {}
+    for fila in filas:
+        for grupo, clave in ((por_modelo, fila['modelo_usado']), (por_dia, fila['dia'].isoformat())):
+            conteos = grupo.setdefault(clave, {'total': 0, 'resueltas': 0, 'acertadas': 0})
+            conteos['total'] += fila['total']
+            conteos['resueltas'] += fila['resueltas']
+            conteos['acertadas'] += fila['acertadas']
+
+    for grupo in (por_modelo, por_dia):
+        for conteos in grupo.values():
+            conteos['precision'] = _precision(conteos['acertadas'], conteos['resueltas'])
+
+    total = sum(c['total'] for c in por_modelo.values())
+    resueltas = sum(c['resueltas'] for c in por_modelo.values())
+    acertadas = sum(c['acertadas'] for c in por_modelo.values())
+    return {
+        'total_predicciones': total,
+        'resueltas': resueltas,
+        'acertadas': acertadas,
+        'precision': _precision(acertadas, resueltas),
+        'por_modelo': por_modelo,
+        'por_dia': dict(sorted(por_dia.items())),
+    }
+
+
+def total_predicciones():
+    """Cantidad de predicciones de todo el historial"""
+    if RESUMEN_PREDICCIONES:
+        consulta = select(func.coalesce(func.sum(ResumenPrediccion.total), 0))
+    else:
+        consulta = select(func.count(Prediccion.id))
+    with engine.connect() as conn:
+        return conn.execute(consulta).scalar()
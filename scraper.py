@@ -2,17 +2,237 @@
 Módulo de scraping para extraer números de páginas web
 """
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
 import re
-from datetime import datetime
-from database import get_session, NumeroExtraido, ConfiguracionScraper
+import os
+import hashlib
+import json
+import time
+import random
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from datetime import date, datetime, timedelta
+from database import get_session, insertar_numeros, clave_ingesta, NumeroExtraido, ConfiguracionScraper
+from metricas import cronometro, medir_tiempo, DURACION_SCRAPING, RESPUESTAS_NO_MODIFICADO
+
+# Límite global de descargas simultáneas y límite por sitio
+MAX_CONCURRENCIA = int(os.getenv('SCRAPER_CONCURRENCIA', 8))
+MAX_CONCURRENCIA_POR_HOST = int(os.getenv('SCRAPER_CONCURRENCIA_POR_HOST', 2))
+
+_semaforos_host = {}
+_lock_semaforos = threading.Lock()
+
+# Sesión HTTP compartida por proceso (keep-alive y pool de conexiones)
+_sesion_http = None
+_lock_sesion = threading.Lock()
+
+
+# Desfase aleatorio máximo sobre intervalo_minutos (fracción del intervalo)
+SCRAPER_JITTER = float(os.getenv('SCRAPER_JITTER', 0.1))
+
+# Pool de navegadores Selenium
+SELENIUM_POOL_MAX = int(os.getenv('SELENIUM_POOL_MAX', 2))
+SELENIUM_MAX_USOS = int(os.getenv('SELENIUM_MAX_USOS', 50))
+SELENIUM_INACTIVIDAD_SEG = int(os.getenv('SELENIUM_INACTIVIDAD_SEG', 1800))
+# Tiempo máximo de carga de una página: un navegador colgado falla y se descarta
+SELENIUM_TIMEOUT_CARGA_SEG = int(os.getenv('SELENIUM_TIMEOUT_CARGA_SEG', 60))
+
+# Fecha (AAAA-MM-DD o DD/MM/AAAA) y hora (HH:MM, con a.m./p.m. opcional) de un sorteo
+PATRON_FECHA = re.compile(r'\b(?:(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})/(\d{1,2})/(\d{4}))\b')
+PATRON_HORA = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)(?::[0-5]\d)?(?:\s*([ap])\.?\s*m\b\.?)?', re.IGNORECASE)
+
+
+def obtener_sesion_http():
+    """Obtener la sesión HTTP del proceso, creándola la primera vez"""
+    global _sesion_http
+    with _lock_sesion:
+        if _sesion_http is None:
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(
+                pool_connections=MAX_CONCURRENCIA,
+                pool_maxsize=MAX_CONCURRENCIA
+            )
+            sesion.mount('http://', adaptador)
+            sesion.mount('https://', adaptador)
+            _sesion_http = sesion
+        return _sesion_http
+
+
+class PoolNavegadores:
+    """
+    Pool acotado de navegadores Chrome headless reutilizables.
+    
+    Cada navegador se revisa antes de prestarse, se recicla después de
+    SELENIUM_MAX_USOS usos y se cierra si pasa SELENIUM_INACTIVIDAD_SEG
+    segundos sin usarse. Los inactivos los cierra un hilo vigilante, aunque
+    no se vuelva a pedir ningún navegador.
+    """
+    
+    def __init__(self, max_navegadores=SELENIUM_POOL_MAX, max_usos=SELENIUM_MAX_USOS,
+                 inactividad_seg=SELENIUM_INACTIVIDAD_SEG):
+        self.max_navegadores = max_navegadores
+        self.max_usos = max_usos
+        self.inactividad_seg = inactividad_seg
+        self._libres = []  # [driver, usos, ultimo_uso]
+        self._usos = {}    # id(driver) -> usos, de los navegadores prestados
+        self._total = 0
+        self._ruta_driver = None
+        self._condicion = threading.Condition()
+        self._vigilante = None
+    
+    def _crear(self):
+        """Lanzar un Chrome headless nuevo"""
+        # Selenium solo se importa si alguna fuente necesita un navegador
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')  # Ejecutar en modo headless
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        
+        # La descarga/verificación de ChromeDriver se hace una sola vez por proceso
+        if self._ruta_driver is None:
+            self._ruta_driver = ChromeDriverManager().install()
+        
+        service = Service(self._ruta_driver)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(SELENIUM_TIMEOUT_CARGA_SEG)
+        return driver
+    
+    @staticmethod
+    def _cerrar(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"⚠ Error al cerrar navegador: {e}")
+    
+    @staticmethod
+    def _esta_sano(driver):
+        """Comprobar que el navegador sigue respondiendo"""
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def _retirar_inactivos(self):
+        """Sacar del pool los navegadores inactivos (llamar con el lock tomado)"""
+        limite = time.monotonic() - self.inactividad_seg
+        vencidos = [n for n in self._libres if n[2] < limite]
+        self._libres = [n for n in self._libres if n[2] >= limite]
+        self._total -= len(vencidos)
+        return [n[0] for n in vencidos]
+    
+    def retirar_inactivos(self):
+        """Cerrar los navegadores libres que superaron el tiempo de inactividad"""
+        with self._condicion:
+            para_cerrar = self._retirar_inactivos()
+            if para_cerrar:
+                self._condicion.notify_all()
+        for driver in para_cerrar:
+            self._cerrar(driver)
+        return len(para_cerrar)
+    
+    def _iniciar_vigilante(self):
+        """Lanzar (una vez) el hilo que cierra los navegadores inactivos"""
+        with self._condicion:
+            if self._vigilante is not None:
+                return
+            self._vigilante = threading.Thread(
+                target=self._vigilar, name='vigilante-navegadores', daemon=True
+            )
+        self._vigilante.start()
+    
+    def _vigilar(self):
+        intervalo = max(self.inactividad_seg / 4, 1)
+        while True:
+            time.sleep(intervalo)
+            try:
+                self.retirar_inactivos()
+            except Exception as e:
+                print(f"⚠ Error al cerrar navegadores inactivos: {e}")
+    
+    def obtener(self, timeout=60):
+        """Prestar un navegador del pool, creando uno si hay cupo"""
+        fin = time.monotonic() + timeout
+        while True:
+            with self._condicion:
+                para_cerrar = self._retirar_inactivos()
+                navegador = self._libres.pop() if self._libres else None
+                crear = navegador is None and self._total < self.max_navegadores
+                if crear:
+                    self._total += 1
+                elif navegador is None:
+                    restante = fin - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError('No hay navegadores disponibles en el pool')
+                    self._condicion.wait(restante)
+            
+            for driver in para_cerrar:
+                self._cerrar(driver)
+            
+            if crear:
+                try:
+                    driver = self._crear()
+                except Exception:
+                    self._descontar()
+                    raise
+                with self._condicion:
+                    self._usos[id(driver)] = 0
+                self._iniciar_vigilante()
+                return driver
+            
+            if navegador is not None:
+                driver, usos, _ = navegador
+                if self._esta_sano(driver):
+                    with self._condicion:
+                        self._usos[id(driver)] = usos
+                    return driver
+                self._cerrar(driver)
+                self._descontar()
+    
+    def liberar(self, driver, descartar=False):
+        """Devolver un navegador al pool (o cerrarlo si hay que reciclarlo)"""
+        with self._condicion:
+            usos = self._usos.pop(id(driver), 0) + 1
+        
+        if not descartar and usos < self.max_usos:
+            try:
+                driver.get('about:blank')  # Liberar la memoria de la página
+            except Exception:
+                descartar = True
+        
+        if descartar or usos >= self.max_usos:
+            self._cerrar(driver)
+            self._descontar()
+            return
+        
+        with self._condicion:
+            self._libres.append([driver, usos, time.monotonic()])
+            self._condicion.notify()
+    
+    def _descontar(self):
+        with self._condicion:
+            self._total -= 1
+            self._condicion.notify()
+    
+    def cerrar_todos(self):
+        """Cerrar todos los navegadores libres"""
+        with self._condicion:
+            libres, self._libres = self._libres, []
+            self._total -= len(libres)
+        for driver, _, _ in libres:
+            self._cerrar(driver)
+
+
+pool_navegadores = PoolNavegadores()
+atexit.register(pool_navegadores.cerrar_todos)
 
 
 class WebScraper:
@@ -21,6 +241,13 @@ class WebScraper:
     def __init__(self, use_selenium=False):
         self.use_selenium = use_selenium
         self.driver = None
+        # Resultado de la última descarga condicional
+        self.no_modificado = False
+        self.validadores = {}
+        # Sorteos de la última extracción (ver extraer_sorteos)
+        self.sorteos = []
+        # El navegador falló (caído o colgado) y no debe volver al pool
+        self.navegador_roto = False
         
     def __enter__(self):
         if self.use_selenium:
@@ -29,19 +256,17 @@ class WebScraper:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.driver:
-            self.driver.quit()
+            # El navegador vuelve al pool; si hubo un error se descarta
+            pool_navegadores.liberar(
+                self.driver, descartar=exc_type is not None or self.navegador_roto
+            )
+            self.driver = None
     
     def _init_selenium(self):
-        """Inicializar Selenium WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')  # Ejecutar en modo headless
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        """Obtener un Selenium WebDriver del pool de navegadores"""
+        self.driver = pool_navegadores.obtener()
     
-    def extraer_numeros_simple(self, url, selector_css=None, selector_xpath=None):
+    def extraer_numeros_simple(self, url, selector_css=None, selector_xpath=None, validadores=None):
         """
         Extraer números de una página web usando requests + BeautifulSoup
         
@@ -49,33 +274,57 @@ class WebScraper:
             url: URL de la página web
             selector_css: Selector CSS para encontrar los números
             selector_xpath: Selector XPath alternativo
+            validadores: dict con 'etag' y 'ultima_modificacion' de la descarga
+                anterior. Si la página no cambió (304) no se parsea nada y
+                self.no_modificado queda en True.
             
         Returns:
-            Lista de números encontrados
+            Lista de números encontrados (el detalle por sorteo queda en self.sorteos)
         """
+        self.no_modificado = False
+        self.validadores = {}
+        self.sorteos = []
+        
+        headers = {}
+        if validadores:
+            if validadores.get('etag'):
+                headers['If-None-Match'] = validadores['etag']
+            if validadores.get('ultima_modificacion'):
+                headers['If-Modified-Since'] = validadores['ultima_modificacion']
+        
         try:
-            response = requests.get(url, timeout=10)
+            with cronometro(DURACION_SCRAPING, etapa='descarga'):
+                response = obtener_sesion_http().get(url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                RESPUESTAS_NO_MODIFICADO.incrementar()
+                self.no_modificado = True
+                self.validadores = dict(validadores)
+                return []
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            numeros = []
+            self.validadores = {
+                'etag': response.headers.get('ETag'),
+                'ultima_modificacion': response.headers.get('Last-Modified'),
+            }
             
-            if selector_css:
-                elementos = soup.select(selector_css)
-                for elemento in elementos:
-                    texto = elemento.get_text(strip=True)
-                    numeros.extend(self._extraer_numeros_de_texto(texto))
-            else:
-                # Extraer todos los números de la página
-                texto_completo = soup.get_text()
-                numeros = self._extraer_numeros_de_texto(texto_completo)
+            with cronometro(DURACION_SCRAPING, etapa='parseo'):
+                soup = BeautifulSoup(response.content, 'html.parser')
+                
+                if selector_css:
+                    # Cada elemento es un sorteo
+                    textos = [e.get_text(' ', strip=True) for e in soup.select(selector_css)]
+                else:
+                    # Toda la página: cada línea es un sorteo
+                    textos = soup.get_text('\n').splitlines()
+                self.sorteos = extraer_sorteos(textos)
             
-            return numeros
+            return numeros_de_sorteos(self.sorteos)
             
         except Exception as e:
             print(f"Error al extraer números: {e}")
             return []
     
+    @medir_tiempo(DURACION_SCRAPING, etapa='selenium')
     def extraer_numeros_selenium(self, url, selector_css=None, selector_xpath=None, wait_time=10):
         """
         Extraer números de una página web usando Selenium (para sitios con JavaScript)
@@ -87,108 +336,420 @@ class WebScraper:
             wait_time: Tiempo de espera para cargar elementos
             
         Returns:
-            Lista de números encontrados
+            Lista de números encontrados (el detalle por sorteo queda en self.sorteos)
         """
+        self.sorteos = []
         if not self.driver:
             self._init_selenium()
         
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
+        cargada = False
         try:
             self.driver.get(url)
-            numeros = []
+            cargada = True
             
             if selector_css:
                 wait = WebDriverWait(self.driver, wait_time)
                 elementos = wait.until(
                     EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector_css))
                 )
-                for elemento in elementos:
-                    texto = elemento.text
-                    numeros.extend(self._extraer_numeros_de_texto(texto))
+                textos = [elemento.text for elemento in elementos]
                     
             elif selector_xpath:
                 wait = WebDriverWait(self.driver, wait_time)
                 elementos = wait.until(
                     EC.presence_of_all_elements_located((By.XPATH, selector_xpath))
                 )
-                for elemento in elementos:
-                    texto = elemento.text
-                    numeros.extend(self._extraer_numeros_de_texto(texto))
+                textos = [elemento.text for elemento in elementos]
             else:
-                # Extraer todos los números de la página
-                texto_completo = self.driver.find_element(By.TAG_NAME, 'body').text
-                numeros = self._extraer_numeros_de_texto(texto_completo)
+                # Toda la página: cada línea es un sorteo
+                textos = self.driver.find_element(By.TAG_NAME, 'body').text.splitlines()
             
-            return numeros
+            self.sorteos = extraer_sorteos(textos)
+            return numeros_de_sorteos(self.sorteos)
             
         except Exception as e:
+            # Un error del navegador lo deja inutilizable, salvo que solo no
+            # aparecieran los elementos esperados en una página ya cargada
+            if isinstance(e, WebDriverException) and not (cargada and isinstance(e, TimeoutException)):
+                self.navegador_roto = True
             print(f"Error al extraer números con Selenium: {e}")
             return []
     
-    def _extraer_numeros_de_texto(self, texto):
-        """Extraer todos los números de un texto"""
-        # Buscar números enteros en el texto
-        numeros = re.findall(r'\b\d+\b', texto)
-        return [int(num) for num in numeros]
-    
-    def guardar_numeros(self, numeros, fuente_url):
-        """Guardar los números extraídos en la base de datos"""
-        session = get_session()
-        try:
-            for numero in numeros:
-                nuevo_registro = NumeroExtraido(
-                    numero=numero,
-                    fuente=fuente_url,
-                    fecha_extraccion=datetime.utcnow()
-                )
-                session.add(nuevo_registro)
+    @medir_tiempo(DURACION_SCRAPING, etapa='guardado')
+    def guardar_numeros(self, numeros, fuente_url, tamano_lote=None, sorteos=None):
+        """
+        Guardar los números extraídos en la base de datos con una inserción masiva.
+        
+        Cada número lleva una clave de ingesta con la identidad de su sorteo
+        (ver claves_ingesta_sorteos), así que los sorteos que ya estaban en una
+        extracción anterior no se vuelven a insertar aunque la página cambie.
+        
+        En una página sin fechas solo se insertan los números de arriba que no
+        estaban en la extracción anterior (ver nuevos_sin_fecha).
+        
+        Args:
+            numeros: Lista de números en el orden de la página
+            fuente_url: URL de origen
+            tamano_lote: Filas por lote de inserción
+            sorteos: Sorteos de la página (extraer_sorteos); por defecto, los
+                números como un único sorteo sin nombre ni fecha
             
-            session.commit()
-            print(f"✓ {len(numeros)} números guardados en la base de datos")
-            return True
+        Returns:
+            Cantidad de números nuevos insertados, o None si hubo un error
+        """
+        fecha = datetime.utcnow()
+        if sorteos is None:
+            sorteos = [{'nombre': None, 'fecha': None, 'hora': None, 'numeros': list(numeros)}]
+        # Sin nombre en la página, el sorteo se identifica por el sitio
+        sitio = urlparse(fuente_url).netloc or fuente_url
+        claves = claves_ingesta_sorteos(fuente_url, sorteos)
+        registros = [
+            {
+                'numero': numero,
+                'nombre_sorteo': (sorteo['nombre'] or sitio)[:100],
+                'hora_sorteo': sorteo['hora'],
+                'fuente': fuente_url,
+                'fecha_extraccion': fecha,
+                'clave_ingesta': clave,
+            }
+            for (sorteo, numero), clave in zip(
+                ((s, n) for s in sorteos for n in s['numeros']), claves
+            )
+        ]
+        
+        try:
+            if not any(sorteo['fecha'] for sorteo in sorteos):
+                registros = registros[:nuevos_sin_fecha(fuente_url, numeros_de_sorteos(sorteos))]
+            insertados = insertar_numeros(registros, tamano_lote)
+            print(f"✓ {insertados} números guardados en la base de datos")
+            if insertados < len(registros):
+                print(f"⏭ {len(registros) - insertados} números ya existían")
+            return insertados
             
         except Exception as e:
-            session.rollback()
             print(f"Error al guardar números: {e}")
-            return False
-        finally:
-            session.close()
+            return None
+
+
+def _fecha_iso(coincidencia):
+    """Fecha ISO de una coincidencia de PATRON_FECHA, o None si no es una fecha válida"""
+    anio, mes, dia, dia_b, mes_b, anio_b = coincidencia.groups()
+    try:
+        if anio:
+            return date(int(anio), int(mes), int(dia)).isoformat()
+        return date(int(anio_b), int(mes_b), int(dia_b)).isoformat()
+    except ValueError:
+        return None
+
+
+def _hora(coincidencia):
+    """Hora HH:MM (24 h) de una coincidencia de PATRON_HORA"""
+    hora, minutos, meridiano = coincidencia.groups()
+    hora = int(hora)
+    if meridiano and meridiano.lower() == 'p' and hora < 12:
+        hora += 12
+    elif meridiano and meridiano.lower() == 'a' and hora == 12:
+        hora = 0
+    return f"{hora:02d}:{minutos}"
+
+
+def extraer_sorteos(textos):
+    """
+    Separar los textos de una página en sorteos
+    
+    Cada texto (un elemento del selector o una línea de la página) es un
+    sorteo. La fecha y la hora que aparezcan en él son la identidad del
+    sorteo y no se cuentan como números; las palabras forman su nombre. Un
+    texto con fecha y sin números (p. ej. "Resultados del 17/10/2026") fija
+    la fecha de los sorteos que le siguen.
+    
+    Returns:
+        Lista de dicts {'nombre', 'fecha', 'hora', 'numeros'} en el orden de la página
+    """
+    sorteos = []
+    fecha_vigente = None
+    for texto in textos:
+        fecha = hora = None
+        coincidencia = PATRON_FECHA.search(texto)
+        if coincidencia and _fecha_iso(coincidencia):
+            fecha = _fecha_iso(coincidencia)
+            texto = f"{texto[:coincidencia.start()]} {texto[coincidencia.end():]}"
+        coincidencia = PATRON_HORA.search(texto)
+        if coincidencia:
+            hora = _hora(coincidencia)
+            texto = f"{texto[:coincidencia.start()]} {texto[coincidencia.end():]}"
+        
+        numeros = [int(numero) for numero in re.findall(r'\b\d+\b', texto)]
+        if not numeros:
+            if fecha:
+                fecha_vigente = fecha
+            continue
+        
+        nombre = ' '.join(re.findall(r'[^\W\d_]+', texto))
+        sorteos.append({
+            'nombre': nombre[:100] or None,
+            'fecha': fecha or fecha_vigente,
+            'hora': hora,
+            'numeros': numeros,
+        })
+    return sorteos
+
+
+def numeros_de_sorteos(sorteos):
+    """Todos los números de los sorteos, en el orden de la página"""
+    return [numero for sorteo in sorteos for numero in sorteo['numeros']]
+
+
+def claves_ingesta_sorteos(fuente, sorteos):
+    """
+    Clave de ingesta de cada número de los sorteos (en el orden de numeros_de_sorteos)
+    
+    Un sorteo con fecha se identifica por nombre + fecha + hora (y cuántos
+    sorteos iguales le siguen en la página, por si el mismo nombre se repite
+    en el día sin hora); cada número, por su posición dentro del sorteo.
+    Así, si la página agrega un sorteo arriba y quita el último de abajo, los
+    que ya estaban conservan su clave.
+    
+    En una página sin ninguna fecha cada número se identifica por su valor
+    y todos los que tiene debajo (huella del resto de la lista): solo sirve
+    para que dos extracciones simultáneas de la misma página no dupliquen.
+    Qué números son nuevos lo decide nuevos_sin_fecha.
+    
+    Los sorteos sin fecha de una página que sí tiene fechas se identifican
+    por su valor y su distancia al final de la página.
+    """
+    if not any(sorteo['fecha'] for sorteo in sorteos):
+        numeros = numeros_de_sorteos(sorteos)
+        return [
+            clave_ingesta(fuente, f"sin-fecha|{huella_sorteos(numeros[i:])}", 0)
+            for i in range(len(numeros))
+        ]
+    
+    total = sum(len(sorteo['numeros']) for sorteo in sorteos)
+    repeticiones = {}
+    claves_sorteo = [None] * len(sorteos)
+    for i in range(len(sorteos) - 1, -1, -1):
+        sorteo = sorteos[i]
+        if sorteo['fecha']:
+            identidad = f"{sorteo['nombre'] or ''}|{sorteo['fecha']}|{sorteo['hora'] or ''}"
+            ocurrencia = repeticiones.get(identidad, 0)
+            repeticiones[identidad] = ocurrencia + 1
+            claves_sorteo[i] = f"{identidad}|{ocurrencia}"
+    
+    claves = []
+    indice = 0
+    for sorteo, clave_sorteo in zip(sorteos, claves_sorteo):
+        for posicion, numero in enumerate(sorteo['numeros']):
+            if clave_sorteo:
+                claves.append(clave_ingesta(fuente, clave_sorteo, posicion))
+            else:
+                claves.append(clave_ingesta(fuente, f"fin-{total - 1 - indice}|{numero}", 0))
+            indice += 1
+    return claves
+
+
+def nuevos_sin_fecha(fuente, numeros):
+    """
+    Cuántos números de arriba de una página sin fechas son nuevos
+    
+    Los números nuevos entran arriba y la página puede perder los de abajo
+    ("últimos N"). Se busca el menor j tal que numeros[j:] coincide con el
+    principio de lo ya guardado de la fuente (del más nuevo al más antiguo:
+    por extracción, de la más reciente a la más antigua, y dentro de cada
+    una en el orden de la página).
+    
+    Returns:
+        j: se insertan numeros[:j]
+    """
+    session = get_session()
+    try:
+        guardados = [fila.numero for fila in session.query(NumeroExtraido.numero)
+                     .filter(NumeroExtraido.fuente == fuente)
+                     .order_by(NumeroExtraido.fecha_extraccion.desc(), NumeroExtraido.id.asc())
+                     .limit(len(numeros))]
+    finally:
+        session.close()
+    
+    for j in range(len(numeros) + 1):
+        resto = numeros[j:]
+        if resto == guardados[:len(resto)]:
+            return j
+
+
+def huella_sorteos(sorteos):
+    """Huella (SHA-1) de los sorteos extraídos de una página"""
+    return hashlib.sha1(json.dumps(sorteos, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _semaforo_host(url):
+    """Obtener el semáforo que limita las descargas simultáneas a un mismo sitio"""
+    host = urlparse(url).netloc.lower()
+    with _lock_semaforos:
+        if host not in _semaforos_host:
+            _semaforos_host[host] = threading.BoundedSemaphore(MAX_CONCURRENCIA_POR_HOST)
+        return _semaforos_host[host]
+
+
+def extraer_numeros_configuracion(url, selector_css=None, selector_xpath=None, validadores=None):
+    """
+    Descargar y parsear una configuración de scraping.
+    Es seguro llamarla desde varios hilos: no toca la sesión de base de datos.
+    
+    Returns:
+        dict con 'numeros', 'sorteos', 'no_modificado' y los 'validadores' HTTP nuevos
+    """
+    use_selenium = 'javascript' in url.lower() or bool(selector_xpath)
+    
+    with _semaforo_host(url):
+        print(f"\n🔍 Scraping: {url}")
+        with WebScraper(use_selenium=use_selenium) as scraper:
+            if use_selenium:
+                numeros = scraper.extraer_numeros_selenium(
+                    url,
+                    selector_css=selector_css,
+                    selector_xpath=selector_xpath
+                )
+            else:
+                numeros = scraper.extraer_numeros_simple(
+                    url,
+                    selector_css=selector_css,
+                    validadores=validadores
+                )
+            
+            return {
+                'numeros': numeros,
+                'sorteos': scraper.sorteos,
+                'no_modificado': scraper.no_modificado,
+                'validadores': scraper.validadores,
+            }
 
 
-def ejecutar_scraping_automatico():
-    """Ejecutar el scraping basado en la configuración de la base de datos"""
+def guardar_resultado(config, resultado):
+    """
+    Guardar lo extraído de una configuración y, si quedó guardado, sus
+    validadores HTTP y la huella de los sorteos. El llamador confirma la
+    sesión de `config`.
+    
+    Args:
+        resultado: dict devuelto por extraer_numeros_configuracion
+    
+    Returns:
+        Cantidad de números insertados (0 si la página no cambió o no tenía
+        números), o None si no se pudieron guardar
+    """
+    numeros = resultado['numeros']
+    huella = huella_sorteos(resultado['sorteos'])
+    if resultado['no_modificado']:
+        # 304: la página no cambió, no hay nada que parsear ni guardar
+        print(f"⏭ Sin cambios en {config.url_objetivo}")
+        return 0
+    if not numeros:
+        print(f"⚠ No se encontraron números en {config.url_objetivo}")
+        return 0
+    if huella == config.hash_contenido:
+        # La página cambió (o no admite 304) pero los sorteos son los mismos:
+        # con los validadores nuevos la próxima revisión puede recibir un 304
+        print(f"⏭ Números sin cambios en {config.url_objetivo}")
+        config.etag = resultado['validadores'].get('etag')
+        config.ultima_modificacion = resultado['validadores'].get('ultima_modificacion')
+        return 0
+    
+    insertados = WebScraper().guardar_numeros(
+        numeros, config.url_objetivo, sorteos=resultado['sorteos']
+    )
+    if insertados is not None:
+        config.hash_contenido = huella
+        config.etag = resultado['validadores'].get('etag')
+        config.ultima_modificacion = resultado['validadores'].get('ultima_modificacion')
+    return insertados
+
+
+def proxima_ejecucion(config):
+    """
+    Calcular cuándo le toca a una configuración: ultima_ejecucion + intervalo_minutos
+    más un desfase de hasta SCRAPER_JITTER del intervalo, para que las fuentes con
+    el mismo intervalo no se consulten todas en el mismo instante.
+    El desfase es estable para una misma ejecución (no cambia entre revisiones).
+    """
+    if config.ultima_ejecucion is None:
+        return None
+    
+    intervalo = timedelta(minutes=config.intervalo_minutos or 60)
+    semilla = f"{config.id}-{config.ultima_ejecucion.isoformat()}"
+    desfase = intervalo * random.Random(semilla).uniform(0, SCRAPER_JITTER)
+    return config.ultima_ejecucion + intervalo + desfase
+
+
+def configuracion_pendiente(config, ahora=None):
+    """Indicar si una configuración debe ejecutarse ahora"""
+    proxima = proxima_ejecucion(config)
+    return proxima is None or proxima <= (ahora or datetime.utcnow())
+
+
+def ejecutar_scraping_automatico(solo_pendientes=True):
+    """
+    Ejecutar el scraping basado en la configuración de la base de datos.
+    
+    Las configuraciones se leen en cada llamada, así que las altas y bajas se
+    aplican sin reiniciar. Con solo_pendientes solo se ejecutan las que ya
+    cumplieron su intervalo_minutos.
+    
+    Las configuraciones se descargan en paralelo (con límite global y por sitio)
+    y se guardan a medida que terminan, así que la duración total depende del
+    sitio más lento y no de la suma de todos.
+    
+    Returns:
+        Cantidad de números guardados
+    """
     session = get_session()
+    guardados = 0
     try:
         configuraciones = session.query(ConfiguracionScraper).filter_by(activo=True).all()
+        if solo_pendientes:
+            ahora = datetime.utcnow()
+            configuraciones = [c for c in configuraciones if configuracion_pendiente(c, ahora)]
+        if not configuraciones:
+            return 0
         
-        for config in configuraciones:
-            print(f"\n🔍 Scraping: {config.url_objetivo}")
-            
-            use_selenium = 'javascript' in config.url_objetivo.lower() or config.selector_xpath
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENCIA, len(configuraciones))) as executor:
+            futuros = {
+                executor.submit(
+                    extraer_numeros_configuracion,
+                    config.url_objetivo,
+                    config.selector_css,
+                    config.selector_xpath,
+                    {'etag': config.etag, 'ultima_modificacion': config.ultima_modificacion}
+                ): config
+                for config in configuraciones
+            }
             
-            with WebScraper(use_selenium=use_selenium) as scraper:
-                if use_selenium:
-                    numeros = scraper.extraer_numeros_selenium(
-                        config.url_objetivo,
-                        selector_css=config.selector_css,
-                        selector_xpath=config.selector_xpath
-                    )
+            for futuro in as_completed(futuros):
+                config = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    print(f"Error al extraer {config.url_objetivo}: {e}")
                 else:
-                    numeros = scraper.extraer_numeros_simple(
-                        config.url_objetivo,
-                        selector_css=config.selector_css
-                    )
+                    # Antes de modificar config: un UPDATE pendiente se enviaría
+                    # (autoflush) al releerla y en SQLite bloquearía la inserción
+                    guardados += guardar_resultado(config, resultado) or 0
                 
-                if numeros:
-                    scraper.guardar_numeros(numeros, config.url_objetivo)
-                    config.ultima_ejecucion = datetime.utcnow()
-                    session.commit()
-                else:
-                    print("⚠ No se encontraron números")
+                # Cada intento cuenta para el intervalo, aunque falle o no haya
+                # números: así una fuente caída no se reintenta en cada revisión
+                config.ultima_ejecucion = datetime.utcnow()
+                session.commit()
         
     except Exception as e:
         print(f"Error en scraping automático: {e}")
     finally:
         session.close()
+    
+    return guardados
 
 
 if __name__ == "__main__":
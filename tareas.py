@@ -0,0 +1,73 @@
+"""
+Tareas posteriores a cada ingesta de números
+
+Las usan el worker (clock.py), el scheduler integrado en la web
+(RUN_SCHEDULER=true) y las rutas que insertan números. Cada paso tiene su
+propio manejo de errores: si uno falla, los siguientes se ejecutan igual.
+"""
+import logging
+
+from almacen_modelos import AlmacenModelos
+from busqueda_modelos import ejecutar_busqueda
+from estadisticas import actualizar_estadisticas
+from instantanea import actualizar_instantanea
+from predictor import (
+    actualizar_y_publicar, reentrenar_y_publicar, resolver_predicciones, solicitar_reentrenamiento
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _ejecutar_paso(funcion, mensaje_error):
+    try:
+        return funcion()
+    except Exception as e:
+        logger.error(f"❌ {mensaje_error}: {e}")
+        return None
+
+
+def procesar_numeros_nuevos(entrenar=True):
+    """
+    Poner al día estadísticas, instantánea, predicciones pendientes y modelo
+    después de insertar números
+
+    Args:
+        entrenar: Actualizar el modelo en este proceso (worker o scheduler).
+            Las rutas web pasan False y solo solicitan el reentrenamiento.
+    """
+    _ejecutar_paso(actualizar_estadisticas, 'Error al actualizar estadísticas')
+    _ejecutar_paso(actualizar_instantanea, 'Error al actualizar la instantánea del historial')
+    _ejecutar_paso(resolver_predicciones, 'Error al resolver predicciones')
+
+    if not entrenar:
+        _ejecutar_paso(solicitar_reentrenamiento, 'Error al solicitar el reentrenamiento')
+        return
+
+    # Esta actualización también cubre una solicitud pendiente de la web
+    AlmacenModelos().tomar_solicitud()
+    _actualizar_modelo()
+
+
+def atender_solicitud_reentrenamiento():
+    """Actualizar el modelo si la web lo solicitó (en las revisiones sin números nuevos)"""
+    if not AlmacenModelos().tomar_solicitud():
+        return
+    logger.info("🧠 Reentrenamiento solicitado desde la web")
+    _actualizar_modelo()
+
+
+def buscar_y_reentrenar():
+    """Buscar la mejor configuración del modelo y reentrenar con ella"""
+    try:
+        if ejecutar_busqueda():
+            version = reentrenar_y_publicar()
+            logger.info(f"🧠 Modelo vigente tras la búsqueda: {version}")
+    except Exception as e:
+        logger.error(f"❌ Error en la búsqueda de hiperparámetros: {e}")
+
+
+def _actualizar_modelo():
+    # Con pocos números nuevos se actualiza el modelo sin reentrenarlo completo
+    version = _ejecutar_paso(actualizar_y_publicar, 'Error al actualizar el modelo')
+    if version:
+        logger.info(f"🧠 Modelo vigente: {version}")
@@ -0,0 +1,44 @@
+"""
+Configuración de las pruebas: base SQLite y carpetas temporales
+
+Las variables de entorno se fijan antes de importar los módulos del proyecto,
+porque database.py crea el motor al importarse.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+DIRECTORIO_PRUEBAS = tempfile.mkdtemp(prefix='prediccion-pruebas-')
+atexit.register(shutil.rmtree, DIRECTORIO_PRUEBAS, ignore_errors=True)
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DIRECTORIO_PRUEBAS, 'pruebas.db')}"
+os.environ['MODELOS_DIR'] = os.path.join(DIRECTORIO_PRUEBAS, 'modelos')
+os.environ['INSTANTANEA_DIR'] = os.path.join(DIRECTORIO_PRUEBAS, 'instantanea')
+os.environ['CACHE_BACKEND'] = 'memoria'
+os.environ['RUN_SCHEDULER'] = 'false'
+os.environ['METRICAS_ACTIVAS'] = 'false'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacen_modelos  # noqa: E402
+import instantanea  # noqa: E402
+from database import Base, engine, init_db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def base_datos():
+    """Base de datos vacía, carpetas limpias y cachés de proceso vacías en cada prueba"""
+    init_db()
+    yield
+    with engine.begin() as conn:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            conn.execute(tabla.delete())
+    for carpeta in (os.environ['MODELOS_DIR'], os.environ['INSTANTANEA_DIR']):
+        shutil.rmtree(carpeta, ignore_errors=True)
+    instantanea._abierta = (None, None, None)
+    almacen_modelos._cache_memoria.clear()
+    almacen_modelos._publicado = (None, None, None)
@@ -0,0 +1,73 @@
+"""Actualización incremental del modelo de ML"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from almacen_modelos import AlmacenModelos
+from database import insertar_numeros
+from predictor import PredictorNumeros, actualizar_y_publicar, reentrenar_y_publicar
+
+HIPERPARAMETROS = {'n_estimators': 12, 'max_depth': 4, 'random_state': 0}
+BASE = datetime(2026, 10, 17, 12, 0)
+
+
+def _serie(cantidad, semilla=5):
+    return np.random.default_rng(semilla).integers(0, 8, size=cantidad)
+
+
+def _insertar(numeros, desde):
+    insertar_numeros([
+        {'numero': int(numero), 'fuente': 'pruebas', 'fecha_extraccion': desde + timedelta(minutes=i)}
+        for i, numero in enumerate(numeros)
+    ])
+
+
+def test_clases_y_cantidad_de_arboles_estables():
+    predictor = PredictorNumeros(ventana=5, hiperparametros=HIPERPARAMETROS)
+    assert predictor.entrenar_modelo_ml(_serie(300))
+    original = predictor.modelo_ml
+    arboles_originales = list(original.estimators_)
+    clases = original.classes_.copy()
+
+    # Los números recientes no incluyen todas las clases del modelo
+    recientes = np.array([1, 2, 3, 2, 1, 2, 3, 1, 2, 3, 3, 2, 1, 1, 2, 3])
+    assert predictor.actualizar_modelo_ml(recientes, arboles=4, semilla=1)
+
+    actualizado = predictor.modelo_ml
+    np.testing.assert_array_equal(actualizado.classes_, clases)
+    assert len(actualizado.estimators_) == HIPERPARAMETROS['n_estimators']
+    assert actualizado.estimators_[:8] == arboles_originales[4:]
+    X = predictor.scaler.transform(predictor.features_prediccion(recientes, 5))
+    assert actualizado.predict_proba(X).shape == (1, len(clases))
+
+    # El modelo anterior (compartido en caché) no se modificó
+    assert original is not actualizado
+    assert original.estimators_ == arboles_originales
+
+
+def test_numero_nunca_visto_pide_entrenamiento_completo():
+    predictor = PredictorNumeros(ventana=5, hiperparametros=HIPERPARAMETROS)
+    assert predictor.entrenar_modelo_ml(_serie(300))
+    assert not predictor.actualizar_modelo_ml(np.array([1, 2, 3, 4, 5, 6, 99]))
+
+
+def test_actualizar_y_publicar():
+    almacen = AlmacenModelos()
+    almacen.guardar_configuracion({'ventana': 5, 'hiperparametros': HIPERPARAMETROS})
+    _insertar(_serie(300), BASE)
+    clave = reentrenar_y_publicar(almacen)
+    assert clave and '-i' not in clave
+
+    # Pocos números nuevos, posteriores al modelo: actualización incremental
+    _insertar(_serie(20, semilla=6), BASE + timedelta(days=1))
+    incremental = actualizar_y_publicar(almacen)
+    assert incremental.endswith('-i1')
+    assert almacen.cargar_publicado()[0] == incremental
+
+    # Sin números nuevos no cambia nada
+    assert actualizar_y_publicar(almacen) == incremental
+
+    # Una carga de históricos (fechas anteriores) obliga a reentrenar completo
+    _insertar(_serie(20, semilla=7), BASE - timedelta(days=1))
+    completo = actualizar_y_publicar(almacen)
+    assert completo and '-i' not in completo
@@ -0,0 +1,86 @@
+"""Almacén de modelos: claves por versión de datos, disco compartido y limpieza"""
+import os
+
+import numpy as np
+
+import almacen_modelos
+from almacen_modelos import AlmacenModelos
+from predictor import PredictorNumeros
+
+
+def _numeros(cantidad=120):
+    return np.random.default_rng(5).integers(0, 10, size=cantidad)
+
+
+def test_la_clave_depende_de_la_version_de_los_datos():
+    hiperparametros = {'n_estimators': 10, 'max_depth': 3}
+    clave = AlmacenModelos.clave(41, 10, hiperparametros)
+
+    assert clave == AlmacenModelos.clave(41, 10, dict(reversed(list(hiperparametros.items()))))
+    assert clave != AlmacenModelos.clave(42, 10, hiperparametros)
+    assert clave != AlmacenModelos.clave(41, 5, hiperparametros)
+    assert clave != AlmacenModelos.clave(41, 10, {**hiperparametros, 'max_depth': 4})
+
+
+def test_otro_proceso_carga_el_modelo_desde_disco(tmp_path):
+    almacen = AlmacenModelos(str(tmp_path))
+    almacen.guardar('7-v10-abc', {'arboles': 3}, {'escala': 1}, {'ventana': 10})
+
+    # Un worker nuevo no tiene la caché en memoria
+    almacen_modelos._cache_memoria.clear()
+    contenido = AlmacenModelos(str(tmp_path)).cargar('7-v10-abc')
+
+    assert contenido == {'modelo': {'arboles': 3}, 'scaler': {'escala': 1}, 'metadatos': {'ventana': 10}}
+    assert AlmacenModelos(str(tmp_path)).cargar('8-v10-abc') is None
+
+
+def test_no_reentrena_si_el_modelo_de_esa_version_existe(tmp_path, monkeypatch):
+    numeros = _numeros()
+    almacen = AlmacenModelos(str(tmp_path))
+    entrenamientos = []
+    entrenar = PredictorNumeros.entrenar_modelo_ml
+
+    def contar(self, *args, **kwargs):
+        entrenamientos.append(1)
+        return entrenar(self, *args, **kwargs)
+
+    monkeypatch.setattr(PredictorNumeros, 'entrenar_modelo_ml', contar)
+    hiperparametros = {'n_estimators': 5, 'random_state': 0}
+
+    assert PredictorNumeros(ventana=5, hiperparametros=hiperparametros, almacen=almacen).cargar_o_entrenar_modelo(numeros, ultimo_id=120)
+    almacen_modelos._cache_memoria.clear()
+    otro = PredictorNumeros(ventana=5, hiperparametros=hiperparametros, almacen=almacen)
+    assert otro.cargar_o_entrenar_modelo(numeros, ultimo_id=120)
+
+    assert len(entrenamientos) == 1
+    assert otro.version_modelo == AlmacenModelos.clave(120, 5, hiperparametros)
+    assert otro.modelo_ml is not None
+
+    # Datos nuevos: otra versión, se entrena de nuevo
+    assert otro.cargar_o_entrenar_modelo(numeros, ultimo_id=121)
+    assert len(entrenamientos) == 2
+
+
+def test_conserva_los_modelos_recientes_y_el_publicado(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen_modelos, 'MODELOS_A_CONSERVAR', 2)
+    almacen = AlmacenModelos(str(tmp_path))
+
+    almacen.guardar('1-v10-abc', 'modelo 1', None)
+    almacen.publicar('1-v10-abc')
+    for version in range(2, 6):
+        ruta = almacen._ruta(f"{version - 1}-v10-abc")
+        # Garantizar un orden de mtime aunque el sistema de archivos sea grueso
+        os.utime(ruta, (version, version))
+        almacen.guardar(f"{version}-v10-abc", f"modelo {version}", None)
+
+    guardados = sorted(n for n in os.listdir(tmp_path) if n.endswith('.joblib'))
+    assert guardados == ['1-v10-abc.joblib', '4-v10-abc.joblib', '5-v10-abc.joblib']
+
+    almacen_modelos._cache_memoria.clear()
+    clave, contenido = AlmacenModelos(str(tmp_path)).cargar_publicado()
+    assert clave == '1-v10-abc'
+    assert contenido['modelo'] == 'modelo 1'
+
+
+def test_sin_modelo_publicado(tmp_path):
+    assert AlmacenModelos(str(tmp_path)).cargar_publicado() == (None, None)
@@ -0,0 +1,9 @@
+"""Arranque en frío: las dependencias pesadas se importan recién al usarlas"""
+import pytest
+
+from medir_arranque import medir
+
+
+@pytest.mark.parametrize('modulo', ['app', 'clock'])
+def test_arranque_sin_dependencias_pesadas(modulo):
+    assert medir(modulo)['pesadas'] == []
@@ -0,0 +1,24 @@
+"""Backtesting: mismas predicciones que el método en producción"""
+import numpy as np
+
+import backtesting
+from predictor import PredictorNumeros
+
+
+def test_estadistico_igual_a_produccion(monkeypatch):
+    # Pocos valores distintos: muchos empates en el más frecuente
+    serie = np.random.default_rng(7).integers(0, 12, size=400)
+    inicio = 60
+    # Bloques chicos para cruzar varios bordes de bloque
+    monkeypatch.setattr(backtesting, 'TAMANO_BLOQUE_CONTEOS', 37)
+    predichos, confianzas, tops = backtesting.predicciones_estadisticas(
+        serie, inicio, ventana_frecuencia=50, top_k=5
+    )
+
+    predictor = PredictorNumeros()
+    for i, t in enumerate(range(inicio, len(serie))):
+        predictor.obtener_datos_historicos = lambda t=t: (np.array(serie[:t]), None)
+        esperado = predictor.predecir_proximo_numero(metodo='estadistico')['estadistico']
+        assert predichos[i] == esperado['numero'], f'paso {t}'
+        assert np.isclose(confianzas[i], esperado['confianza'])
+        assert tops[i][0] == predichos[i]
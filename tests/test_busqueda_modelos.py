@@ -0,0 +1,14 @@
+"""Búsqueda de hiperparámetros en procesos hijos (spawn)"""
+import numpy as np
+
+from busqueda_modelos import buscar_hiperparametros
+
+
+def test_busqueda_en_procesos_spawn():
+    numeros = np.random.default_rng(3).integers(0, 10, size=200)
+    resultados = buscar_hiperparametros(
+        numeros, ventanas=(5,), profundidades=(3, 5), arboles=(5,), n_divisiones=2, procesos=2
+    )
+    assert len(resultados) == 2
+    assert resultados[0]['puntaje'] >= resultados[1]['puntaje']
+    assert all(len(r['puntajes_divisiones']) == 2 for r in resultados)
@@ -0,0 +1,69 @@
+"""Caché de respuestas: claves por versión de los datos"""
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify, request
+
+from cache import CacheMemoria, CacheSQLite, cachear_respuesta
+from database import insertar_numeros
+
+
+def _app(cache):
+    app = Flask(__name__)
+    llamadas = []
+
+    @app.route('/vista')
+    @cachear_respuesta('vista', cache=cache)
+    def vista():
+        llamadas.append(request.full_path)
+        if request.args.get('falla'):
+            return jsonify({'error': 'falla'}), 500
+        return jsonify({'llamada': len(llamadas)})
+
+    return app.test_client(), llamadas
+
+
+@pytest.fixture(params=['memoria', 'sqlite'])
+def cache(request, tmp_path):
+    if request.param == 'sqlite':
+        return CacheSQLite(ruta=str(tmp_path / 'cache.db'))
+    return CacheMemoria()
+
+
+def test_un_numero_nuevo_invalida_la_respuesta(cache):
+    cliente, llamadas = _app(cache)
+
+    primera = cliente.get('/vista')
+    assert primera.headers['X-Cache'] == 'MISS'
+    segunda = cliente.get('/vista')
+    assert segunda.headers['X-Cache'] == 'HIT'
+    assert segunda.get_json() == primera.get_json()
+    assert segunda.mimetype == 'application/json'
+
+    # Otros parámetros: otra entrada
+    assert cliente.get('/vista?dias=3').headers['X-Cache'] == 'MISS'
+
+    insertar_numeros([{'numero': 7, 'fecha_extraccion': datetime(2026, 10, 17)}])
+    tercera = cliente.get('/vista')
+    assert tercera.headers['X-Cache'] == 'MISS'
+    assert tercera.get_json() == {'llamada': 3}
+    assert len(llamadas) == 3
+
+
+def test_los_errores_no_se_guardan(cache):
+    cliente, llamadas = _app(cache)
+    assert cliente.get('/vista?falla=1').status_code == 500
+    assert cliente.get('/vista?falla=1').headers['X-Cache'] == 'MISS'
+    assert len(llamadas) == 2
+
+
+def test_ttl_y_tamano_maximo():
+    cache = CacheMemoria(max_entradas=2, ttl=60)
+    for clave in ('a', 'b', 'c'):
+        cache.guardar(clave, clave)
+    assert cache.obtener('a') is None
+    assert cache.obtener('c') == 'c'
+
+    vencida = CacheMemoria(ttl=-1)
+    vencida.guardar('a', 'a')
+    assert vencida.obtener('a') is None
@@ -0,0 +1,84 @@
+"""Base de datos: configuración del motor, inicialización y migración (paso explícito)"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+import database
+from database import Base, engine
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _ejecutar(argumentos, tmp_path):
+    entorno = {
+        **os.environ,
+        'DATABASE_URL': f"sqlite:///{tmp_path / 'base.db'}",
+        'INSTANTANEA_DIR': str(tmp_path / 'instantanea'),
+        'MODELOS_DIR': str(tmp_path / 'modelos'),
+    }
+    return subprocess.run(
+        [sys.executable, *argumentos], cwd=RAIZ, env=entorno,
+        capture_output=True, text=True, check=True
+    )
+
+
+def _tablas(ruta):
+    with sqlite3.connect(ruta) as conn:
+        return {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_importar_app_no_crea_ni_migra(tmp_path):
+    _ejecutar(['-c', 'import app'], tmp_path)
+    ruta = tmp_path / 'base.db'
+    assert not ruta.exists() or _tablas(ruta) == set()
+
+
+def test_migrar_base_existente(tmp_path):
+    ruta = tmp_path / 'base.db'
+    # Esquema original, con un índice que la migración reemplaza
+    with sqlite3.connect(ruta) as conn:
+        conn.executescript('''
+            CREATE TABLE numeros_extraidos (
+                id INTEGER PRIMARY KEY, numero INTEGER NOT NULL, fecha_extraccion DATETIME,
+                nombre_sorteo VARCHAR(100), hora_sorteo VARCHAR(20), fuente VARCHAR(255),
+                metadata_extra VARCHAR(500)
+            );
+            CREATE INDEX ix_numeros_extraidos_fecha_extraccion ON numeros_extraidos (fecha_extraccion);
+            INSERT INTO numeros_extraidos (numero, fecha_extraccion) VALUES
+                (3, '2026-10-17 10:00:00'), (4, '2026-10-17 11:00:00');
+        ''')
+
+    _ejecutar(['database.py'], tmp_path)
+
+    assert _tablas(ruta) >= set(Base.metadata.tables)
+    with sqlite3.connect(ruta) as conn:
+        columnas = {fila[1] for fila in conn.execute('PRAGMA table_info(numeros_extraidos)')}
+        indices = {fila[1] for fila in conn.execute('PRAGMA index_list(numeros_extraidos)')}
+        total = conn.execute('SELECT total FROM estadisticas_agregadas').fetchone()[0]
+    assert 'clave_ingesta' in columnas
+    assert 'ix_numeros_extraidos_fecha_extraccion' not in indices
+    assert {i.name for i in Base.metadata.tables['numeros_extraidos'].indexes} <= indices
+    assert total == 2
+
+    # Una segunda ejecución no cambia nada
+    _ejecutar(['database.py'], tmp_path)
+
+
+def test_sqlite_en_modo_wal():
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+
+
+def test_opciones_del_pool_segun_el_motor(monkeypatch):
+    monkeypatch.setattr(database, 'DB_POOL_SIZE', 3)
+    monkeypatch.setattr(database, 'DB_MAX_OVERFLOW', 2)
+
+    opciones = database._opciones_motor('postgresql://usuario@servidor/base')
+    assert opciones['pool_size'] == 3
+    assert opciones['max_overflow'] == 2
+    assert opciones['pool_pre_ping'] == database.DB_POOL_PRE_PING
+    # SQLite no usa QueuePool: solo el tiempo de espera del bloqueo
+    assert set(database._opciones_motor('sqlite:///base.db')) == {'connect_args'}
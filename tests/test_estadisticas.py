@@ -0,0 +1,87 @@
+"""Estadísticas incrementales frente al análisis completo"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database import insertar_numeros
+from estadisticas import actualizar_estadisticas, obtener_estadisticas, total_numeros
+from historial import cargar_historial_bd
+from ingesta import ingerir_registros
+from predictor import PredictorNumeros
+
+CLAVES_EXACTAS = ('total_muestras', 'mediana', 'minimo', 'maximo', 'rango', 'numeros_recientes',
+                  'racha_maxima', 'porcentaje_pares', 'porcentaje_impares')
+CLAVES_APROXIMADAS = ('media', 'desviacion_estandar', 'diferencia_promedio', 'diferencia_std')
+
+
+def _serie():
+    # Rachas largas para que crucen los bordes de los bloques
+    rng = np.random.default_rng(11)
+    return np.repeat(rng.integers(0, 40, size=150), rng.integers(1, 6, size=150))
+
+
+def _insertar(numeros):
+    insertar_numeros([
+        {'numero': int(numero), 'fuente': 'pruebas', 'fecha_extraccion': datetime.utcnow()}
+        for numero in numeros
+    ])
+
+
+def _comparar(serie):
+    incrementales = obtener_estadisticas()
+    completas = PredictorNumeros().analisis_estadistico(serie)
+
+    for clave in CLAVES_EXACTAS:
+        assert incrementales[clave] == completas[clave], clave
+    for clave in CLAVES_APROXIMADAS:
+        assert incrementales[clave] == pytest.approx(float(completas[clave])), clave
+    frecuencias = dict(zip(*np.unique(serie, return_counts=True)))
+    assert all(frecuencias[numero] == veces for numero, veces in incrementales['frecuencias_top_10'])
+    assert incrementales['frecuencias_top_10'][0][1] == max(frecuencias.values())
+
+
+def test_bloques_igual_a_analisis_completo():
+    serie = _serie()
+    # Varias ingestas, cada una agregada en bloques chicos que no coinciden con ellas
+    for inicio in range(0, len(serie), 97):
+        _insertar(serie[inicio:inicio + 97])
+        actualizar_estadisticas(tamano_bloque=13)
+
+    _comparar(serie)
+
+
+def test_carga_de_historicos_recalcula_en_orden_cronologico():
+    ahora = datetime(2026, 10, 17, 12, 0)
+    insertar_numeros([
+        {'numero': 100 + i, 'fuente': 'pruebas', 'fecha_extraccion': ahora + timedelta(minutes=i)}
+        for i in range(60)
+    ])
+    actualizar_estadisticas(tamano_bloque=13)
+
+    # Históricos anteriores a todo lo agregado, por la carga masiva
+    ingerir_registros([
+        {'numero': i, 'fecha': (ahora - timedelta(days=1, minutes=-i)).isoformat()}
+        for i in range(60)
+    ])
+    actualizar_estadisticas(tamano_bloque=13)
+
+    cronologica, _ = cargar_historial_bd(limite=1000)
+    assert list(cronologica[-10:]) == list(range(150, 160))
+    _comparar(cronologica)
+    assert obtener_estadisticas()['numeros_recientes'] == list(range(150, 160))
+
+    # Después de recalcular, los números nuevos en orden se siguen agregando
+    insertar_numeros([{'numero': 7, 'fuente': 'pruebas', 'fecha_extraccion': ahora + timedelta(hours=2)}])
+    assert actualizar_estadisticas() == 1
+    _comparar(cargar_historial_bd(limite=1000)[0])
+
+
+def test_las_lecturas_no_escriben():
+    _insertar(_serie()[:80])
+    assert total_numeros() == 0
+    assert 'error' in obtener_estadisticas()
+
+    assert actualizar_estadisticas() == 80
+    assert total_numeros() == 80
+    assert actualizar_estadisticas() == 0
@@ -0,0 +1,63 @@
+"""Exportación en streaming de números extraídos"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import app
+import exportacion
+from database import insertar_numeros
+
+INICIO = datetime(2026, 10, 1)
+
+
+@pytest.fixture
+def numeros():
+    insertar_numeros([
+        {
+            'numero': i % 10,
+            'fecha_extraccion': INICIO + timedelta(hours=i),
+            'nombre_sorteo': 'Quiniela',
+            'fuente': 'https://a.test' if i % 2 else 'https://b.test',
+        }
+        for i in range(25)
+    ])
+
+
+def test_csv_por_bloques_con_todas_las_filas(numeros):
+    # Bloques chicos: la respuesta llega en varios fragmentos
+    partes = list(exportacion.exportar(exportacion.consulta_numeros(), 'csv', tamano_bloque=4))
+    assert len(partes) > 5
+
+    filas = list(csv.DictReader(io.StringIO(''.join(partes))))
+    assert [int(f['id']) for f in filas] == list(range(1, 26))
+    assert filas[3]['fecha_extraccion'] == (INICIO + timedelta(hours=3)).isoformat()
+
+
+def test_ndjson_con_filtros(numeros):
+    respuesta = app.app.test_client().get(
+        '/api/export/numeros?formato=ndjson&fuente=https://a.test&desde=2026-10-01T05:00&hasta=2026-10-01T11:00'
+    )
+    assert respuesta.status_code == 200
+    assert respuesta.mimetype == 'application/x-ndjson'
+    assert 'numeros.ndjson' in respuesta.headers['Content-Disposition']
+
+    filas = [json.loads(linea) for linea in respuesta.get_data(as_text=True).splitlines()]
+    assert [f['numero'] for f in filas] == [5, 7, 9]
+    assert all(f['fuente'] == 'https://a.test' for f in filas)
+
+
+def test_parquet(numeros):
+    pq = pytest.importorskip('pyarrow.parquet')
+    respuesta = app.app.test_client().get('/api/export/numeros?formato=parquet')
+    tabla = pq.read_table(io.BytesIO(respuesta.get_data()))
+    assert tabla.num_rows == 25
+    assert tabla.column('numero').to_pylist()[:3] == [0, 1, 2]
+
+
+def test_parametros_invalidos():
+    cliente = app.app.test_client()
+    assert cliente.get('/api/export/numeros?formato=xml').status_code == 400
+    assert cliente.get('/api/export/numeros?desde=ayer').status_code == 400
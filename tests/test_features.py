@@ -0,0 +1,50 @@
+"""Features vectorizadas: mismas matrices que el cálculo original fila por fila"""
+import numpy as np
+import pytest
+
+from predictor import PredictorNumeros
+
+
+def _features_originales(numeros, ventana):
+    X = []
+    y = []
+    for i in range(ventana, len(numeros)):
+        features = numeros[i-ventana:i]
+        features_extra = [
+            np.mean(features),
+            np.std(features),
+            max(features),
+            min(features),
+            sum(1 for n in features if n % 2 == 0),
+        ]
+        X.append(features + features_extra)
+        y.append(numeros[i])
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.parametrize('ventana', [1, 5, 10])
+def test_crear_features_igual_al_bucle_original(ventana):
+    numeros = np.random.default_rng(ventana).integers(0, 10, size=200).tolist()
+    predictor = PredictorNumeros()
+
+    X, y = predictor.crear_features(numeros, ventana)
+    X_original, y_original = _features_originales(numeros, ventana)
+
+    assert X.shape == (len(numeros) - ventana, ventana + 5)
+    np.testing.assert_allclose(X, X_original)
+    np.testing.assert_array_equal(y, y_original)
+
+
+def test_features_de_prediccion_usan_la_ultima_ventana():
+    numeros = np.random.default_rng(1).integers(0, 10, size=50).tolist()
+    predictor = PredictorNumeros()
+
+    # La ventana a predecir es la que tendría el próximo número como objetivo
+    X_siguiente, _ = _features_originales(numeros + [0], 10)
+    np.testing.assert_allclose(predictor.features_prediccion(numeros, 10), X_siguiente[-1:])
+
+
+def test_sin_datos_suficientes():
+    X, y = PredictorNumeros().crear_features([1, 2, 3], 10)
+    assert X.shape == (0, 15)
+    assert len(y) == 0
@@ -0,0 +1,87 @@
+"""GET condicional del scraper con los validadores guardados"""
+import scraper
+from database import get_session, ConfiguracionScraper, NumeroExtraido
+
+URL = 'https://resultados.example/quiniela'
+PAGINA = b'<ul><li class="sorteo">Quiniela 17/10/2026 10:00 - 1234</li></ul>'
+
+
+class RespuestaFalsa:
+    def __init__(self, status_code, headers=None, content=b''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = content
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class SesionFalsa:
+    """Responde 304 si el ETag pedido es el vigente"""
+
+    def __init__(self, etag):
+        self.etag = etag
+        self.pedidos = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.pedidos.append(dict(headers or {}))
+        if (headers or {}).get('If-None-Match') == self.etag:
+            return RespuestaFalsa(304)
+        return RespuestaFalsa(200, {'ETag': self.etag, 'Last-Modified': 'Sat, 17 Oct 2026 10:05:00 GMT'}, PAGINA)
+
+
+def _configuracion():
+    session = get_session()
+    try:
+        return session.query(ConfiguracionScraper).one()
+    finally:
+        session.close()
+
+
+def _cantidad_numeros():
+    session = get_session()
+    try:
+        return session.query(NumeroExtraido).count()
+    finally:
+        session.close()
+
+
+def test_pagina_sin_cambios_responde_304(monkeypatch):
+    session = get_session()
+    session.add(ConfiguracionScraper(url_objetivo=URL, selector_css='li.sorteo'))
+    session.commit()
+    session.close()
+
+    sesion_http = SesionFalsa('"v1"')
+    monkeypatch.setattr(scraper, '_sesion_http', sesion_http)
+
+    assert scraper.ejecutar_scraping_automatico(solo_pendientes=False) == 1
+    assert sesion_http.pedidos[0] == {}
+    assert _configuracion().etag == '"v1"'
+
+    # Segunda revisión: se mandan los validadores y el 304 no toca nada
+    assert scraper.ejecutar_scraping_automatico(solo_pendientes=False) == 0
+    assert sesion_http.pedidos[1] == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Sat, 17 Oct 2026 10:05:00 GMT',
+    }
+    assert _configuracion().etag == '"v1"'
+
+    # Nuevo ETag con los mismos sorteos: se descarga pero no se inserta nada
+    sesion_http.etag = '"v2"'
+    assert scraper.ejecutar_scraping_automatico(solo_pendientes=False) == 0
+    assert _cantidad_numeros() == 1
+    assert _configuracion().etag == '"v2"'
+    assert scraper.ejecutar_scraping_automatico(solo_pendientes=False) == 0
+    assert sesion_http.pedidos[3]['If-None-Match'] == '"v2"'
+
+
+def test_304_conserva_los_validadores(monkeypatch):
+    monkeypatch.setattr(scraper, '_sesion_http', SesionFalsa('"v1"'))
+    validadores = {'etag': '"v1"', 'ultima_modificacion': None}
+
+    web = scraper.WebScraper()
+    assert web.extraer_numeros_simple(URL, validadores=validadores) == []
+    assert web.no_modificado
+    assert web.validadores == validadores
@@ -0,0 +1,49 @@
+"""Carga del historial desde la base de datos con la consulta por columnas"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import instantanea
+from database import get_session, insertar_numeros, NumeroExtraido
+from historial import cargar_historial, cargar_historial_bd
+
+BASE = datetime(2026, 10, 17, 12, 0)
+
+
+def _historial_orm(limite):
+    """La consulta original: entidades ORM, de la más reciente a la más antigua"""
+    session = get_session()
+    try:
+        filas = session.query(NumeroExtraido)\
+            .order_by(NumeroExtraido.fecha_extraccion.desc(), NumeroExtraido.id.desc())\
+            .limit(limite).all()
+        return [f.numero for f in reversed(filas)], [f.fecha_extraccion for f in reversed(filas)]
+    finally:
+        session.close()
+
+
+def test_igual_a_la_consulta_orm():
+    fechas = [BASE + timedelta(minutes=i, microseconds=123456 * (i % 3)) for i in range(30)]
+    # Fuera de orden y con fechas repetidas: decide fecha_extraccion y luego el id
+    fechas[5] = fechas[20]
+    fechas[7] = BASE - timedelta(days=1)
+    insertar_numeros([
+        {'numero': i % 10, 'fecha_extraccion': fecha} for i, fecha in enumerate(fechas)
+    ])
+
+    for limite in (1, 12, 1000):
+        numeros, fechas_np = cargar_historial_bd(limite)
+        numeros_orm, fechas_orm = _historial_orm(limite)
+
+        assert numeros.dtype == np.int64
+        assert fechas_np.dtype == np.dtype('datetime64[us]')
+        assert numeros.tolist() == numeros_orm
+        assert fechas_np.tolist() == fechas_orm
+        assert len(numeros) == min(limite, 30)
+
+
+def test_historial_vacio(monkeypatch):
+    monkeypatch.setattr(instantanea, 'INSTANTANEA_ACTIVA', False)
+    numeros, fechas = cargar_historial()
+    assert numeros.shape == fechas.shape == (0,)
+    assert fechas.dtype == np.dtype('datetime64[us]')
@@ -0,0 +1,60 @@
+"""Carga masiva de números: claves de ingesta"""
+import json
+
+from sqlalchemy import func, select
+
+import app
+from database import engine, NumeroExtraido
+from ingesta import ingerir_registros, leer_registros
+
+
+def _numeros():
+    with engine.connect() as conn:
+        return conn.execute(select(NumeroExtraido.numero).order_by(NumeroExtraido.id)).scalars().all()
+
+
+def test_cargas_sin_fecha_el_mismo_dia_se_insertan_completas(monkeypatch):
+    monkeypatch.setattr(app, 'procesar_numeros_nuevos', lambda **kwargs: None)
+    cliente = app.app.test_client()
+
+    primera = cliente.post('/api/numeros/lote', json=[{'numero': 5}, {'numero': 6}]).get_json()
+    segunda = cliente.post('/api/numeros/lote', json=[{'numero': 7}, {'numero': 8}, {'numero': 9}]).get_json()
+
+    assert primera['total_insertados'] == 2
+    assert segunda['total_insertados'] == 3
+    assert segunda['lotes'][0]['duplicados'] == 0
+    assert _numeros() == [5, 6, 7, 8, 9]
+
+
+def test_registros_identificados_no_se_duplican():
+    registros = [
+        {'numero': 1, 'sorteo': 'Quiniela', 'fecha': '2026-10-17', 'hora': '10:30'},
+        {'numero': 2, 'sorteo': 'Quiniela', 'fecha': '2026-10-17', 'hora': '10:30'},
+        {'numero': 3, 'sorteo': 'Quiniela', 'fecha': '2026-10-17T12:00:00'},
+        {'numero': 4, 'id': 'ext-1'},
+        {'numero': 5, 'fecha': '2026-10-17'},
+    ]
+    assert ingerir_registros(registros)['total_insertados'] == 5
+
+    # La misma carga otra vez: solo entra el registro con fecha sin hora
+    repetida = ingerir_registros(leer_registros(json.dumps(registros), 'json'))
+    assert repetida['total_insertados'] == 1
+    assert repetida['lotes'][0]['duplicados'] == 4
+
+    # Otro sorteo a la misma hora es otro registro
+    assert ingerir_registros([
+        {'numero': 1, 'sorteo': 'Nocturna', 'fecha': '2026-10-17', 'hora': '10:30'}
+    ])['total_insertados'] == 1
+
+    with engine.connect() as conn:
+        sin_clave = conn.execute(
+            select(func.count()).where(NumeroExtraido.clave_ingesta.is_(None))
+        ).scalar()
+    assert sin_clave == 2
+
+
+def test_registros_invalidos_se_informan():
+    resultado = ingerir_registros([{'numero': 'x'}, {}, {'numero': 3, 'fecha': 'ayer'}, {'numero': 4}])
+    assert resultado['total_insertados'] == 1
+    assert resultado['total_rechazados'] == 3
+    assert [r['fila'] for r in resultado['rechazados']] == [1, 2, 3]
@@ -0,0 +1,39 @@
+"""Inserción en bloque de números (insertar_numeros)"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import engine, insertar_numeros, NumeroExtraido
+
+
+def _registro(numero, clave=None):
+    return {
+        'numero': numero,
+        'fecha_extraccion': datetime(2026, 10, 17, 10, numero),
+        'nombre_sorteo': 'Quiniela',
+        'fuente': 'https://ejemplo.test',
+        'clave_ingesta': clave,
+    }
+
+
+def test_insercion_por_lotes_ignora_claves_repetidas():
+    registros = [
+        _registro(1, 'a'), _registro(2, 'b'), _registro(3, 'a'),
+        _registro(4), _registro(5), _registro(6, 'c'), _registro(7, 'b'),
+    ]
+    # Lotes de 2: los duplicados caen en lotes distintos al original
+    assert insertar_numeros(registros, tamano_lote=2) == 5
+
+    # Repetir la carga solo agrega los registros sin clave
+    assert insertar_numeros(registros, tamano_lote=3) == 2
+
+    with engine.connect() as conn:
+        filas = conn.execute(
+            select(NumeroExtraido.numero, NumeroExtraido.clave_ingesta).order_by(NumeroExtraido.id)
+        ).all()
+    assert [f.numero for f in filas] == [1, 2, 4, 5, 6, 4, 5]
+    assert sorted(f.clave_ingesta for f in filas if f.clave_ingesta) == ['a', 'b', 'c']
+
+
+def test_insercion_vacia():
+    assert insertar_numeros([]) == 0
@@ -0,0 +1,76 @@
+"""Instantánea columnar del historial frente a la base de datos"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import instantanea
+from database import insertar_numeros
+from historial import cargar_historial, cargar_historial_bd
+
+BASE = datetime(2026, 10, 17, 12, 0)
+
+
+def _insertar(numeros, desde):
+    insertar_numeros([
+        {'numero': int(numero), 'fuente': f'fuente-{numero % 3}', 'fecha_extraccion': desde + timedelta(minutes=i)}
+        for i, numero in enumerate(numeros)
+    ])
+
+
+def _igual_a_bd():
+    numeros, fechas = instantanea.historial(limite=10000)
+    numeros_bd, fechas_bd = cargar_historial_bd(limite=10000)
+    np.testing.assert_array_equal(numeros, numeros_bd)
+    np.testing.assert_array_equal(fechas, fechas_bd)
+
+
+def _generacion():
+    return instantanea._leer_meta(instantanea.INSTANTANEA_DIR)['generacion']
+
+
+def test_agregar_en_orden_sin_reescribir():
+    _insertar(range(0, 30), BASE)
+    assert instantanea.actualizar_instantanea(tamano_bloque=7) == 30
+    generacion = _generacion()
+
+    _insertar(range(30, 45), BASE + timedelta(hours=1))
+    assert instantanea.actualizar_instantanea(tamano_bloque=7) == 15
+    assert _generacion() == generacion
+    _igual_a_bd()
+
+
+def test_carga_fuera_de_orden_reescribe_ordenada():
+    _insertar(range(100, 120), BASE)
+    instantanea.actualizar_instantanea()
+    generacion = _generacion()
+
+    # Históricos con fechas anteriores e intercaladas con las ya copiadas
+    _insertar(range(0, 10), BASE - timedelta(minutes=5))
+    assert instantanea.actualizar_instantanea() == 10
+    assert _generacion() > generacion
+    _igual_a_bd()
+
+    copia = instantanea.abrir()
+    assert copia.numeros[0] == 0
+    assert copia.diccionario_fuentes[copia.fuentes[0]] == 'fuente-0'
+    # Solo queda la generación vigente en disco
+    generaciones = [n for n in os.listdir(instantanea.INSTANTANEA_DIR) if n.startswith('g')]
+    assert generaciones == [f'g{_generacion()}']
+
+
+def test_lectura_atrasada_no_escribe():
+    _insertar(range(0, 10), BASE)
+    instantanea.actualizar_instantanea()
+    generacion = _generacion()
+
+    _insertar(range(10, 15), BASE + timedelta(hours=1))
+    # Atrasada: no se pone al día desde la lectura, se lee de la base de datos
+    assert instantanea.historial(limite=100) is None
+    assert instantanea._leer_meta(instantanea.INSTANTANEA_DIR)['filas'] == 10
+    numeros, _ = cargar_historial(limite=100)
+    assert list(numeros) == list(range(15))
+    assert _generacion() == generacion
+
+    instantanea.actualizar_instantanea()
+    _igual_a_bd()
@@ -0,0 +1,74 @@
+"""Servidor de métricas de los procesos sin Flask"""
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+from flask import Flask
+
+import metricas
+
+
+def test_servidor_expone_metricas(monkeypatch):
+    monkeypatch.setattr(metricas, 'METRICAS_ACTIVAS', True)
+    metricas.NUMEROS_INGERIDOS.incrementar(3)
+    servidor = metricas.iniciar_servidor_metricas(0, host='127.0.0.1')
+    try:
+        url = f'http://127.0.0.1:{servidor.server_address[1]}'
+        with urlopen(f'{url}/metrics') as respuesta:
+            assert respuesta.headers['Content-Type'].startswith('text/plain')
+            assert 'prediccion_numeros_ingeridos_total' in respuesta.read().decode('utf-8')
+        with pytest.raises(HTTPError):
+            urlopen(f'{url}/otra')
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def test_servidor_desactivado(monkeypatch):
+    monkeypatch.setattr(metricas, 'METRICAS_ACTIVAS', False)
+    assert metricas.iniciar_servidor_metricas(0) is None
+
+
+def test_formato_de_las_metricas(monkeypatch):
+    monkeypatch.setattr(metricas, 'METRICAS_ACTIVAS', True)
+    histograma = metricas.Histograma('prueba_segundos', 'Prueba', etiquetas=('etapa',), limites=(0.1, 1))
+    contador = metricas.Contador('prueba_total', 'Prueba', etiquetas=('ruta',))
+    try:
+        for valor in (0.05, 0.5, 0.5, 3):
+            histograma.observar(valor, etapa='descarga')
+        contador.incrementar(2, ruta='/a"b')
+
+        texto = metricas.exponer_metricas()
+    finally:
+        metricas._registro.remove(histograma)
+        metricas._registro.remove(contador)
+
+    lineas = texto.splitlines()
+    assert '# TYPE prediccion_prueba_segundos histogram' in lineas
+    # Intervalos acumulados, +Inf igual a la cantidad de observaciones
+    assert 'prediccion_prueba_segundos_bucket{etapa="descarga",le="0.1"} 1' in lineas
+    assert 'prediccion_prueba_segundos_bucket{etapa="descarga",le="1"} 3' in lineas
+    assert 'prediccion_prueba_segundos_bucket{etapa="descarga",le="+Inf"} 4' in lineas
+    assert 'prediccion_prueba_segundos_count{etapa="descarga"} 4' in lineas
+    assert 'prediccion_prueba_segundos_sum{etapa="descarga"} 4.05' in lineas
+    assert 'prediccion_prueba_total{ruta="/a\\"b"} 2' in lineas
+
+
+def test_ruta_metrics_de_flask(monkeypatch):
+    monkeypatch.setattr(metricas, 'METRICAS_ACTIVAS', True)
+    aplicacion = Flask(__name__)
+
+    @aplicacion.route('/hola/<nombre>')
+    def hola(nombre):
+        return 'hola'
+
+    metricas.instrumentar_app(aplicacion)
+    cliente = aplicacion.test_client()
+    assert cliente.get('/hola/ana').status_code == 200
+
+    respuesta = cliente.get('/metrics')
+    assert respuesta.mimetype == 'text/plain'
+    texto = respuesta.get_data(as_text=True)
+    # Las rutas se agrupan por regla, no por URL
+    assert 'prediccion_peticiones_total{ruta="/hola/<nombre>",metodo="GET",estado="200"} 1' in texto
+    assert 'prediccion_peticion_duracion_segundos_count{ruta="/hola/<nombre>",metodo="GET"} 1' in texto
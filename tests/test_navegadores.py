@@ -0,0 +1,96 @@
+"""Pool de navegadores: cierre de inactivos y descarte de navegadores rotos"""
+import time
+
+import pytest
+
+from selenium.common.exceptions import WebDriverException
+
+import scraper
+from scraper import PoolNavegadores, WebScraper
+
+
+class NavegadorFalso:
+    def __init__(self, falla=False):
+        self.falla = falla
+        self.cerrado = False
+        self.current_url = 'about:blank'
+
+    def get(self, url):
+        if self.falla:
+            raise WebDriverException('chrome not reachable')
+
+    def quit(self):
+        self.cerrado = True
+
+
+class PoolFalso(PoolNavegadores):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.creados = []
+
+    def _crear(self):
+        self.creados.append(NavegadorFalso())
+        return self.creados[-1]
+
+
+def test_el_vigilante_cierra_los_navegadores_inactivos():
+    pool = PoolFalso(max_navegadores=2, inactividad_seg=1)
+    driver = pool.obtener()
+    pool.liberar(driver)
+
+    # Nadie vuelve a pedir un navegador: lo cierra el hilo vigilante
+    limite = time.monotonic() + 5
+    while not driver.cerrado and time.monotonic() < limite:
+        time.sleep(0.1)
+
+    assert driver.cerrado
+    assert pool._libres == [] and pool._total == 0
+
+
+def test_un_navegador_roto_no_vuelve_al_pool(monkeypatch):
+    pool = PoolFalso(max_navegadores=1)
+    monkeypatch.setattr(scraper, 'pool_navegadores', pool)
+    roto = NavegadorFalso(falla=True)
+    pool.creados.append(roto)
+    monkeypatch.setattr(pool, '_crear', lambda: roto)
+
+    with WebScraper(use_selenium=True) as web:
+        # El extractor absorbe el error, pero deja marcado el navegador
+        assert web.extraer_numeros_selenium('https://caido.example') == []
+        assert web.navegador_roto
+
+    assert roto.cerrado
+    assert pool._libres == [] and pool._total == 0
+
+
+def test_reutiliza_navegadores_y_respeta_el_maximo():
+    pool = PoolFalso(max_navegadores=2)
+    primero = pool.obtener()
+    segundo = pool.obtener()
+
+    # Sin cupo: se espera a que se libere uno
+    with pytest.raises(TimeoutError):
+        pool.obtener(timeout=0.2)
+
+    pool.liberar(primero)
+    assert pool.obtener() is primero
+    assert len(pool.creados) == 2
+
+    pool.liberar(primero)
+    pool.liberar(segundo)
+    pool.cerrar_todos()
+    assert primero.cerrado and segundo.cerrado
+
+
+def test_recicla_el_navegador_despues_de_max_usos():
+    pool = PoolFalso(max_navegadores=1, max_usos=2)
+    driver = pool.obtener()
+    pool.liberar(driver)
+    assert pool.obtener() is driver
+    pool.liberar(driver)
+
+    # Segundo uso: se cierra y el siguiente pedido lanza uno nuevo
+    assert driver.cerrado
+    nuevo = pool.obtener()
+    assert nuevo is not driver
+    assert len(pool.creados) == 2
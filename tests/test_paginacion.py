@@ -0,0 +1,71 @@
+"""Paginación por cursor del historial de números"""
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import app
+from database import get_session, insertar_numeros
+from app import codificar_cursor, decodificar_cursor, paginar_numeros
+
+
+def _insertar(cantidad):
+    base = datetime(2026, 10, 17, 12, 0)
+    # De a tres números por minuto: hay empates de fecha_extraccion entre páginas
+    insertar_numeros([
+        {'numero': i, 'fuente': 'pruebas', 'fecha_extraccion': base + timedelta(minutes=i // 3)}
+        for i in range(cantidad)
+    ])
+
+
+def test_cursor_ida_y_vuelta():
+    fila = type('Fila', (), {'fecha_extraccion': datetime(2026, 10, 17, 12, 30, 15, 123), 'id': 42})
+    assert decodificar_cursor(codificar_cursor(fila)) == (fila.fecha_extraccion, 42)
+    with pytest.raises(ValueError):
+        decodificar_cursor('no-es-un-cursor')
+
+
+def test_recorrer_hacia_adelante_y_hacia_atras():
+    _insertar(23)
+    session = get_session()
+    try:
+        paginas = []
+        numeros, anterior, siguiente = paginar_numeros(session, 5)
+        assert anterior is None
+        paginas.append([n.numero for n in numeros])
+        cursores = [siguiente]
+        while siguiente:
+            numeros, anterior, siguiente = paginar_numeros(session, 5, despues=siguiente)
+            paginas.append([n.numero for n in numeros])
+            cursores.append(anterior)
+
+        # Todas las filas, de la más nueva a la más antigua, sin repetir ni saltear
+        assert sum(paginas, []) == list(range(22, -1, -1))
+        assert [len(p) for p in paginas] == [5, 5, 5, 5, 3]
+
+        # Hacia atrás desde la última página se recuperan las mismas páginas
+        antes = cursores[-1]
+        for esperada in reversed(paginas[:-1]):
+            numeros, antes, _ = paginar_numeros(session, 5, antes=antes)
+            assert [n.numero for n in numeros] == esperada
+        assert antes is None
+    finally:
+        session.close()
+
+
+def test_pagina_heredada_redirige_al_cursor():
+    _insertar(120)
+    cliente = app.app.test_client()
+
+    respuesta = cliente.get('/historial-resultados?pagina=2')
+    assert respuesta.status_code == 302
+    parametros = parse_qs(urlparse(respuesta.location).query)
+    assert parametros['pagina'] == ['2']
+
+    pagina = cliente.get(respuesta.location)
+    assert pagina.status_code == 200
+    # La página 2 empieza en la fila 51 (la número 69, contando desde la más nueva)
+    assert '>69<' in pagina.get_data(as_text=True).replace(' ', '').replace('\n', '')
+
+    fuera_de_rango = cliente.get('/historial-resultados?pagina=99')
+    assert urlparse(fuera_de_rango.location).query == ''
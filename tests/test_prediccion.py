@@ -0,0 +1,60 @@
+"""Generación de predicciones desde la web"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+import app
+from almacen_modelos import AlmacenModelos, ARCHIVO_SOLICITUD
+from database import engine, insertar_numeros, Prediccion
+from predictor import reentrenar_y_publicar
+
+
+def _insertar(cantidad):
+    base = datetime(2026, 10, 17, 12, 0)
+    numeros = np.random.default_rng(1).integers(0, 8, size=cantidad)
+    insertar_numeros([
+        {'numero': int(n), 'fuente': 'pruebas', 'fecha_extraccion': base + timedelta(minutes=i)}
+        for i, n in enumerate(numeros)
+    ])
+
+
+def _guardadas():
+    with engine.connect() as conn:
+        return conn.execute(select(Prediccion.modelo_usado)).scalars().all()
+
+
+def test_ml_sin_modelo_responde_con_la_estadistica():
+    _insertar(80)
+    respuesta = app.app.test_client().post('/api/prediccion/generar', json={'metodo': 'ml'}).get_json()
+
+    assert respuesta['success']
+    assert respuesta['metodo_usado'] == 'estadistico'
+    assert respuesta['modelo_pendiente']
+    assert list(respuesta['predicciones']) == ['estadistico']
+    assert _guardadas() == ['estadistico']
+    # La web no entrena: deja la solicitud para el worker
+    assert os.path.exists(os.path.join(AlmacenModelos().directorio, ARCHIVO_SOLICITUD))
+
+
+def test_ml_con_modelo_publicado():
+    _insertar(200)
+    almacen = AlmacenModelos()
+    almacen.guardar_configuracion({
+        'ventana': 5, 'hiperparametros': {'n_estimators': 5, 'max_depth': 3, 'random_state': 0}
+    })
+    assert reentrenar_y_publicar(almacen)
+
+    respuesta = app.app.test_client().post('/api/prediccion/generar', json={'metodo': 'ml'}).get_json()
+    assert respuesta['metodo_usado'] == 'ml'
+    assert not respuesta['modelo_pendiente']
+    assert list(respuesta['predicciones']) == ['ml']
+    assert _guardadas() == ['ml']
+
+
+def test_metodo_desconocido():
+    _insertar(80)
+    respuesta = app.app.test_client().post('/api/prediccion/generar', json={'metodo': 'otro'})
+    assert respuesta.status_code == 400
+    assert _guardadas() == []
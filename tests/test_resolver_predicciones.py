@@ -0,0 +1,49 @@
+"""Resolución de predicciones con un UPDATE ... RETURNING"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from database import engine, insertar_numeros, Prediccion
+from predictor import resolver_predicciones
+
+BASE = datetime(2026, 10, 17, 10, 0)
+
+
+def _predicciones():
+    with engine.connect() as conn:
+        return conn.execute(
+            select(Prediccion.numero_predicho, Prediccion.numero_real, Prediccion.acertado)
+            .order_by(Prediccion.id)
+        ).all()
+
+
+def test_cada_prediccion_se_resuelve_con_el_primer_numero_posterior():
+    with engine.begin() as conn:
+        conn.execute(insert(Prediccion), [
+            {'numero_predicho': 3, 'numero_real': None, 'fecha_prediccion': BASE, 'modelo_usado': 'ml'},
+            {'numero_predicho': 4, 'numero_real': None, 'fecha_prediccion': BASE + timedelta(minutes=5), 'modelo_usado': 'ml'},
+            {'numero_predicho': 8, 'numero_real': None, 'fecha_prediccion': BASE + timedelta(minutes=30), 'modelo_usado': 'estadistico'},
+            # Fila antigua: numero_real cargado pero sin acertado
+            {'numero_predicho': 6, 'numero_real': 6, 'fecha_prediccion': BASE, 'modelo_usado': 'estadistico'},
+        ])
+    insertar_numeros([
+        # Misma fecha: desempata el id
+        {'numero': 3, 'fecha_extraccion': BASE + timedelta(minutes=10)},
+        {'numero': 9, 'fecha_extraccion': BASE + timedelta(minutes=10)},
+        {'numero': 4, 'fecha_extraccion': BASE + timedelta(minutes=20)},
+        # Anterior a todas las predicciones: no cuenta
+        {'numero': 8, 'fecha_extraccion': BASE - timedelta(minutes=1)},
+    ])
+
+    assert resolver_predicciones() == 3
+    assert _predicciones() == [
+        (3, 3, True),
+        (4, 3, False),
+        (8, None, None),
+        (6, 6, True),
+    ]
+    assert resolver_predicciones() == 0
+
+    insertar_numeros([{'numero': 8, 'fecha_extraccion': BASE + timedelta(minutes=40)}])
+    assert resolver_predicciones() == 1
+    assert _predicciones()[2] == (8, 8, True)
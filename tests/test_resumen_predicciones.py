@@ -0,0 +1,43 @@
+"""Resumen de predicciones mantenido con incrementos"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from database import engine, insertar_numeros, Prediccion
+from predictor import PredictorNumeros, resolver_predicciones
+from resumen_predicciones import reconstruir_resumen, resumen_predicciones
+
+
+def _resumen():
+    return sorted(
+        (f['dia'], f['modelo_usado'], f['total'], f['resueltas'], f['acertadas'])
+        for f in resumen_predicciones()
+    )
+
+
+def test_incrementos_igual_a_reconstruir():
+    predictor = PredictorNumeros()
+    for numero, metodo in [(5, 'estadistico'), (7, 'estadistico'), (5, 'ml'), (9, None)]:
+        assert predictor.guardar_prediccion(numero, 0.5, metodo)
+
+    # Predicciones de días anteriores, para que haya más de una fila por método
+    ayer = datetime.utcnow() - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(update(Prediccion).where(Prediccion.numero_predicho == 7).values(fecha_prediccion=ayer))
+    reconstruir_resumen()
+
+    assert resolver_predicciones() == 0
+    insertar_numeros([{'numero': 5, 'fuente': 'pruebas', 'fecha_extraccion': datetime.utcnow() + timedelta(seconds=1)}])
+    assert resolver_predicciones() == 4
+    # Una segunda resolución no vuelve a sumar las mismas filas
+    assert resolver_predicciones() == 0
+
+    incremental = _resumen()
+    reconstruir_resumen()
+    assert incremental == _resumen()
+
+    totales = {(modelo, total, resueltas, acertadas) for _, modelo, total, resueltas, acertadas in incremental}
+    assert ('ml', 1, 1, 1) in totales
+    assert ('', 1, 1, 0) in totales
+    assert sum(fila[2] for fila in incremental) == 4
+    assert sum(fila[4] for fila in incremental) == 2
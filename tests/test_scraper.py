@@ -0,0 +1,139 @@
+"""Identidad de los sorteos extraídos y deduplicación al guardarlos"""
+from database import get_session, ConfiguracionScraper, NumeroExtraido
+from scraper import WebScraper, extraer_sorteos, numeros_de_sorteos
+
+FUENTE = 'https://resultados.example/quiniela'
+
+
+def _guardar(textos):
+    sorteos = extraer_sorteos(textos)
+    return WebScraper().guardar_numeros(numeros_de_sorteos(sorteos), FUENTE, sorteos=sorteos)
+
+
+def _numeros_guardados():
+    session = get_session()
+    try:
+        return session.query(NumeroExtraido).order_by(NumeroExtraido.id).all()
+    finally:
+        session.close()
+
+
+def test_fecha_y_hora_son_identidad_y_no_numeros():
+    sorteos = extraer_sorteos([
+        'Resultados del 17/10/2026',
+        'Quiniela Nacional 3:00 p.m. - 4521',
+        'Sorteo 2026-10-16 21:00 12 34',
+    ])
+
+    assert sorteos == [
+        {'nombre': 'Quiniela Nacional', 'fecha': '2026-10-17', 'hora': '15:00', 'numeros': [4521]},
+        {'nombre': 'Sorteo', 'fecha': '2026-10-16', 'hora': '21:00', 'numeros': [12, 34]},
+    ]
+
+
+def test_pagina_desplazada_inserta_solo_el_sorteo_nuevo():
+    # "Últimos 4 resultados": el sorteo nuevo entra arriba y el más antiguo sale
+    pagina = [f'Quiniela 17/10/2026 {hora}:00 - {numero}' for hora, numero in
+              ((14, 11), (13, 22), (12, 33), (11, 44))]
+    assert _guardar(pagina) == 4
+
+    desplazada = ['Quiniela 17/10/2026 15:00 - 55'] + pagina[:3]
+    assert _guardar(desplazada) == 1
+
+    guardados = _numeros_guardados()
+    assert [n.numero for n in guardados] == [11, 22, 33, 44, 55]
+    assert guardados[-1].nombre_sorteo == 'Quiniela'
+    assert guardados[-1].hora_sorteo == '15:00'
+
+
+def test_lista_sin_fecha_que_crece_inserta_solo_lo_nuevo():
+    assert _guardar(['3', '1', '4']) == 3
+    assert _guardar(['9', '3', '1', '4']) == 1
+
+    guardados = _numeros_guardados()
+    assert [n.numero for n in guardados] == [3, 1, 4, 9]
+    # Sin nombre en la página, el sorteo lleva el nombre del sitio
+    assert {n.nombre_sorteo for n in guardados} == {'resultados.example'}
+
+
+def test_lista_sin_fecha_de_largo_fijo_inserta_solo_lo_nuevo():
+    # "Últimos 3": cada número nuevo entra arriba y el de abajo sale
+    assert _guardar(['5', '4', '3']) == 3
+    assert _guardar(['6', '5', '4']) == 1
+    assert _guardar(['6', '5', '4']) == 0
+    assert _guardar(['8', '7', '6']) == 2
+    # Sin coincidencia con lo guardado (p. ej. se perdieron extracciones): todo es nuevo
+    assert _guardar(['2', '1', '9']) == 3
+
+    assert [n.numero for n in _numeros_guardados()] == [5, 4, 3, 6, 8, 7, 2, 1, 9]
+
+
+def test_misma_pagina_no_duplica():
+    pagina = ['Quiniela 17/10/2026 12:00 - 33', 'Quiniela 17/10/2026 11:00 - 44']
+    assert _guardar(pagina) == 2
+    assert _guardar(pagina) == 0
+    assert len(_numeros_guardados()) == 2
+
+
+def _configuracion():
+    session = get_session()
+    try:
+        config = ConfiguracionScraper(url_objetivo=FUENTE, activo=True)
+        session.add(config)
+        session.commit()
+        return config.id
+    finally:
+        session.close()
+
+
+def _resultado(textos):
+    sorteos = extraer_sorteos(textos)
+    return {
+        'numeros': numeros_de_sorteos(sorteos),
+        'sorteos': sorteos,
+        'no_modificado': False,
+        'validadores': {'etag': '"v1"', 'ultima_modificacion': None},
+    }
+
+
+def test_scraping_manual_guarda_y_procesa_la_ingesta(monkeypatch):
+    import app
+    config_id = _configuracion()
+    monkeypatch.setattr(app, 'extraer_numeros_configuracion',
+                        lambda *args: _resultado(['Quiniela 17/10/2026 12:00 - 33']))
+    procesados = []
+    monkeypatch.setattr(app, 'procesar_numeros_nuevos', lambda **kwargs: procesados.append(kwargs))
+
+    respuesta = app.app.test_client().post(f'/api/scraper/ejecutar/{config_id}').get_json()
+
+    assert respuesta['success'] and respuesta['insertados'] == 1
+    assert procesados == [{'entrenar': False}]
+    session = get_session()
+    try:
+        config = session.get(ConfiguracionScraper, config_id)
+        assert config.etag == '"v1"' and config.hash_contenido and config.ultima_ejecucion
+    finally:
+        session.close()
+
+
+def test_scraping_manual_informa_el_error_al_guardar(monkeypatch):
+    import app
+    import scraper
+    config_id = _configuracion()
+    monkeypatch.setattr(app, 'extraer_numeros_configuracion',
+                        lambda *args: _resultado(['Quiniela 17/10/2026 12:00 - 33']))
+
+    def fallar(*args, **kwargs):
+        raise RuntimeError('base de datos caída')
+    monkeypatch.setattr(scraper, 'insertar_numeros', fallar)
+
+    respuesta = app.app.test_client().post(f'/api/scraper/ejecutar/{config_id}')
+
+    assert respuesta.status_code == 500
+    assert respuesta.get_json()['success'] is False
+    session = get_session()
+    try:
+        config = session.get(ConfiguracionScraper, config_id)
+        assert config.ultima_ejecucion is None and config.hash_contenido is None
+    finally:
+        session.close()
@@ -0,0 +1,98 @@
+"""Scraping automático de las configuraciones activas"""
+import threading
+from datetime import datetime, timedelta
+
+import scraper
+from database import get_session, ConfiguracionScraper, NumeroExtraido
+
+
+def _configurar(*urls, **columnas):
+    session = get_session()
+    try:
+        for url in urls:
+            session.add(ConfiguracionScraper(url_objetivo=url, selector_css='.numero', **columnas))
+        session.commit()
+    finally:
+        session.close()
+
+
+def _resultado(numero):
+    return {
+        'numeros': [numero],
+        'sorteos': [{'nombre': 'Quiniela', 'fecha': '2026-10-17', 'hora': f'{numero}:00', 'numeros': [numero]}],
+        'no_modificado': False,
+        'validadores': {'etag': f'"v{numero}"', 'ultima_modificacion': None},
+    }
+
+
+def test_configuraciones_en_paralelo_y_una_falla(monkeypatch):
+    _configurar('https://a.test/', 'https://b.test/', 'https://c.test/')
+    _configurar('https://inactiva.test/', activo=False)
+
+    # Las tres descargas tienen que estar en curso a la vez para pasar la barrera
+    barrera = threading.Barrier(3, timeout=10)
+    numeros = {'https://a.test/': 11, 'https://c.test/': 13}
+
+    def extraer(url, selector_css=None, selector_xpath=None, validadores=None):
+        barrera.wait()
+        if url == 'https://b.test/':
+            raise ConnectionError('sitio caído')
+        return _resultado(numeros[url])
+
+    monkeypatch.setattr(scraper, 'extraer_numeros_configuracion', extraer)
+
+    assert scraper.ejecutar_scraping_automatico() == 2
+
+    session = get_session()
+    try:
+        assert sorted(n.numero for n in session.query(NumeroExtraido)) == [11, 13]
+        configuraciones = {c.url_objetivo: c for c in session.query(ConfiguracionScraper)}
+    finally:
+        session.close()
+
+    # El intento fallido también cuenta para el intervalo
+    assert all(configuraciones[url].ultima_ejecucion for url in numeros)
+    assert configuraciones['https://b.test/'].ultima_ejecucion is not None
+    assert configuraciones['https://b.test/'].etag is None
+    assert configuraciones['https://a.test/'].etag == '"v11"'
+    assert configuraciones['https://inactiva.test/'].ultima_ejecucion is None
+
+
+def test_proxima_ejecucion_con_desfase_estable(monkeypatch):
+    monkeypatch.setattr(scraper, 'SCRAPER_JITTER', 0.1)
+    ultima = datetime(2026, 10, 17, 10, 0)
+    config = ConfiguracionScraper(id=1, intervalo_minutos=60, ultima_ejecucion=ultima)
+
+    proxima = scraper.proxima_ejecucion(config)
+    assert ultima + timedelta(minutes=60) <= proxima <= ultima + timedelta(minutes=66)
+    assert scraper.proxima_ejecucion(config) == proxima
+
+    assert not scraper.configuracion_pendiente(config, ultima + timedelta(minutes=59))
+    assert scraper.configuracion_pendiente(config, ultima + timedelta(minutes=67))
+    assert scraper.configuracion_pendiente(ConfiguracionScraper(id=2, intervalo_minutos=60))
+
+
+def test_solo_se_ejecutan_las_configuraciones_pendientes(monkeypatch):
+    ahora = datetime.utcnow()
+    _configurar('https://nueva.test/')
+    _configurar('https://vencida.test/', intervalo_minutos=5, ultima_ejecucion=ahora - timedelta(minutes=10))
+    _configurar('https://reciente.test/', intervalo_minutos=60, ultima_ejecucion=ahora - timedelta(minutes=10))
+
+    consultadas = []
+
+    def extraer(url, selector_css=None, selector_xpath=None, validadores=None):
+        consultadas.append(url)
+        return {'numeros': [], 'sorteos': [], 'no_modificado': False, 'validadores': {}}
+
+    monkeypatch.setattr(scraper, 'extraer_numeros_configuracion', extraer)
+
+    scraper.ejecutar_scraping_automatico()
+    assert sorted(consultadas) == ['https://nueva.test/', 'https://vencida.test/']
+
+    # Recién ejecutadas: en la siguiente revisión no le toca a ninguna
+    consultadas.clear()
+    scraper.ejecutar_scraping_automatico()
+    assert consultadas == []
+
+    scraper.ejecutar_scraping_automatico(solo_pendientes=False)
+    assert len(consultadas) == 3